@@ -0,0 +1,393 @@
+# benchmarks/api_benchmark.py
+"""
+Benchmark de carga y latencia de la API.
+
+Levanta src/api/app.py en un proceso uvicorn aparte con un modelo de
+reemplazo: un pipeline sklearn chico, registrado en un store de MLflow local
+en un directorio temporal, así no hace falta red ni DagsHub. Luego reenvía
+payloads estilo requests.jsonl a /predict con la concurrencia indicada y
+escribe un reporte JSON con throughput, latencias p50/p95/p99 y pico de
+memoria (RSS) del proceso de la API (sin el cliente de carga), comparándolo
+opcionalmente contra un baseline.
+
+Uso:
+
+    python -m benchmarks.api_benchmark --concurrency 8 --requests 2000
+    python -m benchmarks.api_benchmark --payloads requests.jsonl --baseline benchmarks/baseline.json
+    python -m benchmarks.api_benchmark --save-baseline benchmarks/baseline.json
+
+La configuración de la API se toma de las mismas variables de entorno que en
+producción (MICROBATCH_ENABLED, FAST_PATH_ENABLED, MODEL_BACKEND, ...). El
+caché de predicciones se deshabilita salvo que PREDICTION_CACHE_SIZE esté
+definido, para medir el modelo y no el caché.
+"""
+
+import argparse
+import http.client
+import json
+import os
+import platform
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+MODEL_NAME = "telco-churn-prediction"
+
+CATEGORICAL_VALUES = {
+    "gender": ["Male", "Female"],
+    "region": ["North", "South", "East", "West"],
+    "contract_type": ["Month-to-Month", "One Year", "Two Year"],
+    "internet_service": ["DSL", "Fiber optic", "No"],
+    "phone_service": ["Yes", "No"],
+    "multiple_lines": ["Yes", "No", "No phone service"],
+    "payment_method": ["Electronic check", "Mailed check", "Bank transfer", "Credit card"],
+}
+NUMERIC_COLUMNS = ["age", "tenure_months", "monthly_charges", "total_charges"]
+
+# Variables de entorno de la API que se guardan en el reporte
+REPORTED_ENV = [
+    "MICROBATCH_ENABLED", "MICROBATCH_MAX_SIZE", "MICROBATCH_MAX_WAIT_MS",
+    "FAST_PATH_ENABLED", "FAST_PATH_MAX_ROWS", "MODEL_BACKEND", "PREDICTION_CACHE_SIZE",
+]
+
+# Métricas comparadas contra el baseline: True si más alto es mejor
+COMPARED_METRICS = {
+    "throughput_rps": True,
+    "latency_ms.p50": False,
+    "latency_ms.p95": False,
+    "latency_ms.p99": False,
+    "api_peak_rss_mb": False,
+}
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def synthetic_customers(n: int, seed: int = 42) -> pd.DataFrame:
+    """Genera clientes sintéticos con el esquema de CustomerData"""
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({"customer_id": [f"BENCH-{i:06d}" for i in range(n)]})
+    df["age"] = rng.integers(18, 80, n)
+    df["tenure_months"] = rng.integers(0, 72, n)
+    df["monthly_charges"] = rng.uniform(20, 120, n).round(2)
+    df["total_charges"] = (df["monthly_charges"] * df["tenure_months"].clip(lower=1)).round(2)
+    for column, values in CATEGORICAL_VALUES.items():
+        df[column] = rng.choice(values, n)
+    return df
+
+
+def register_stand_in_model(tracking_uri: str, seed: int = 42) -> str:
+    """Entrena y registra en Production un pipeline sklearn chico con el esquema de la API"""
+    import mlflow
+    import mlflow.sklearn
+    from mlflow.tracking import MlflowClient
+    from sklearn.compose import ColumnTransformer
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.pipeline import Pipeline
+    from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+    mlflow.set_tracking_uri(tracking_uri)
+
+    df = synthetic_customers(2000, seed)
+    y = ((df["contract_type"] == "Month-to-Month") & (df["tenure_months"] < 24)).astype(int)
+
+    pipeline = Pipeline([
+        ("preprocess", ColumnTransformer([
+            ("categorical", OneHotEncoder(handle_unknown="ignore"), list(CATEGORICAL_VALUES)),
+            ("numeric", StandardScaler(), NUMERIC_COLUMNS),
+        ])),
+        ("actual_estimator", LogisticRegression(max_iter=1000)),
+    ])
+    pipeline.fit(df, y)
+
+    mlflow.set_experiment("benchmark")
+    with mlflow.start_run() as run:
+        mlflow.sklearn.log_model(pipeline, "model")
+
+    model_version = mlflow.register_model(f"runs:/{run.info.run_id}/model", MODEL_NAME)
+    MlflowClient().transition_model_version_stage(MODEL_NAME, model_version.version, "Production")
+    return str(model_version.version)
+
+
+def load_payloads(path: Optional[str], n: int, seed: int) -> List[bytes]:
+    """Lee payloads de un JSONL (un CustomerData por línea) o los genera"""
+    if path:
+        with open(path) as f:
+            records = [json.loads(line) for line in f if line.strip()]
+    else:
+        records = synthetic_customers(n, seed).to_dict(orient="records")
+    return [json.dumps(record, default=int).encode() for record in records]
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(port: int, log_path: str) -> subprocess.Popen:
+    """Levanta la API en otro proceso (con las variables de entorno del benchmark) y espera a que responda"""
+    # Los logs por request de la API se siguen generando con la misma
+    # configuración que en producción (cola de fondo, formato, muestreo: son
+    # parte del costo real), pero van a un archivo para no mezclarse con el reporte
+    env = {**os.environ, "LOG_FILE": log_path}
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "src.api.app:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT,
+        env=env,
+    )
+
+    deadline = time.time() + 120
+    while True:
+        if process.poll() is not None:
+            raise RuntimeError(f"La API no pudo iniciar (código {process.returncode})")
+        if time.time() > deadline:
+            stop_server(process)
+            raise RuntimeError("La API no pudo iniciar")
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1) as response:
+                health = json.load(response)
+        except (OSError, urllib.error.URLError, ValueError):
+            time.sleep(0.1)
+            continue
+
+        # /health responde recién después del startup: el modelo ya cargó o falló
+        if health.get("status") != "healthy":
+            stop_server(process)
+            raise RuntimeError(f"La API inició sin modelo: {health.get('model')}")
+        return process
+
+
+def _proc_peak_rss_mb(pid: int) -> Optional[float]:
+    """Pico de memoria residente de un proceso vivo según /proc (solo Linux)"""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return None
+
+
+def stop_server(process: subprocess.Popen) -> float:
+    """
+    Detiene la API y devuelve el pico de memoria residente de su proceso (MB).
+
+    En Linux se lee de /proc antes de detenerla. En otros sistemas se usa
+    getrusage(RUSAGE_CHILDREN) al terminar: el máximo entre los procesos
+    hijos ya esperados (la API, salvo que algún subproceso del registro del
+    modelo de reemplazo haya usado más memoria).
+    """
+    peak_mb = _proc_peak_rss_mb(process.pid)
+    process.terminate()
+    try:
+        process.wait(timeout=15)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+    if peak_mb is None:
+        peak = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+        # Linux informa KB y macOS bytes
+        peak_mb = round(peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024, 1)
+    return peak_mb
+
+
+def run_load(port: int, path: str, payloads: List[bytes], total: int, concurrency: int) -> Dict[str, Any]:
+    """Envía `total` requests con `concurrency` conexiones keep-alive"""
+    latencies: List[float] = []
+    errors = {"count": 0}
+    lock = threading.Lock()
+    counter = iter(range(total))
+
+    def worker():
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+        local = []
+        failed = 0
+        for i in counter:
+            body = payloads[i % len(payloads)]
+            started = time.perf_counter()
+            try:
+                conn.request("POST", path, body=body, headers={"Content-Type": "application/json"})
+                response = conn.getresponse()
+                response.read()
+                if response.status != 200:
+                    failed += 1
+            except (OSError, http.client.HTTPException):
+                failed += 1
+                conn.close()
+                conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+            local.append(time.perf_counter() - started)
+        conn.close()
+        with lock:
+            latencies.extend(local)
+            errors["count"] += failed
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for future in [executor.submit(worker) for _ in range(concurrency)]:
+            future.result()
+    elapsed = time.perf_counter() - started
+
+    latencies_ms = np.asarray(latencies) * 1000
+    return {
+        "requests": len(latencies),
+        "errors": errors["count"],
+        "duration_seconds": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 2),
+        "latency_ms": {
+            "mean": round(float(latencies_ms.mean()), 3),
+            "p50": round(float(np.percentile(latencies_ms, 50)), 3),
+            "p95": round(float(np.percentile(latencies_ms, 95)), 3),
+            "p99": round(float(np.percentile(latencies_ms, 99)), 3),
+            "max": round(float(latencies_ms.max()), 3),
+        },
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return None
+
+
+def _get(report: Dict[str, Any], dotted: str) -> Optional[float]:
+    value: Any = report
+    for key in dotted.split("."):
+        if not isinstance(value, dict) or key not in value:
+            return None
+        value = value[key]
+    return value
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> Dict[str, Any]:
+    """Compara el reporte contra un baseline; una métrica empeora si lo hace más que `tolerance`"""
+    metrics = {}
+    for name, higher_is_better in COMPARED_METRICS.items():
+        current, reference = _get(report, name), _get(baseline, name)
+        if current is None or not reference:
+            continue
+
+        change = (current - reference) / reference
+        regressed = change < -tolerance if higher_is_better else change > tolerance
+        metrics[name] = {
+            "baseline": reference,
+            "current": current,
+            "change": round(change, 4),
+            "regressed": regressed,
+        }
+
+    return {
+        "baseline_commit": baseline.get("commit"),
+        "tolerance": tolerance,
+        "metrics": metrics,
+        "regressed": any(m["regressed"] for m in metrics.values()),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de carga y latencia de la API con un modelo local")
+    parser.add_argument("--payloads", help="JSONL con un CustomerData por línea (default: clientes sintéticos)")
+    parser.add_argument("--endpoint", default="/predict", help="Endpoint a medir (default: /predict)")
+    parser.add_argument("--concurrency", type=int, default=8, help="Conexiones concurrentes (default: 8)")
+    parser.add_argument("--requests", type=int, default=2000, help="Requests medidos (default: 2000)")
+    parser.add_argument("--warmup", type=int, default=200, help="Requests de calentamiento no medidos (default: 200)")
+    parser.add_argument("--seed", type=int, default=42, help="Semilla de los datos sintéticos (default: 42)")
+    parser.add_argument("--output", default="benchmark_report.json", help="Reporte JSON de salida")
+    parser.add_argument("--baseline", help="Reporte previo contra el cual comparar")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="Empeoramiento relativo tolerado (default: 0.10)")
+    parser.add_argument("--save-baseline", help="Guarda además el reporte como baseline en esta ruta")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="telco-bench-")
+    tracking_uri = f"file://{os.path.join(workdir, 'mlruns')}"
+
+    # Configuración de la API (el proceso la hereda al iniciarse)
+    os.environ["MLFLOW_TRACKING_URI"] = tracking_uri
+    os.environ["MLFLOW_MODEL_NAME"] = MODEL_NAME
+    os.environ["MLFLOW_MODEL_STAGE"] = "Production"
+    os.environ["MODEL_CACHE_DIR"] = os.path.join(workdir, "model_cache")
+    os.environ["MODEL_RELOAD_INTERVAL"] = "0"
+    os.environ.setdefault("PREDICTION_CACHE_SIZE", "0")
+
+    print(f"📦 Registrando modelo de reemplazo en {tracking_uri}")
+    model_version = register_stand_in_model(tracking_uri, args.seed)
+    payloads = load_payloads(args.payloads, max(args.requests, 1000), args.seed)
+
+    port = _free_port()
+    started = time.perf_counter()
+    log_path = os.path.join(workdir, "api.log")
+    server = start_server(port, log_path)
+    startup_seconds = time.perf_counter() - started
+    print(f"🚀 API iniciada en {startup_seconds:.2f} s (pid {server.pid}, puerto {port}, logs en {log_path})")
+
+    try:
+        if args.warmup:
+            run_load(port, args.endpoint, payloads, args.warmup, args.concurrency)
+        print(f"⏱  Enviando {args.requests} requests a {args.endpoint} con concurrencia {args.concurrency}...")
+        results = run_load(port, args.endpoint, payloads, args.requests, args.concurrency)
+    finally:
+        api_peak_rss_mb = stop_server(server)
+
+    report = {
+        "commit": _git_commit(),
+        "timestamp": time.time(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {
+            "endpoint": args.endpoint,
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "warmup": args.warmup,
+            "payloads": args.payloads or f"synthetic(seed={args.seed})",
+            "model_version": model_version,
+            "env": {name: os.environ[name] for name in REPORTED_ENV if name in os.environ},
+        },
+        "startup_seconds": round(startup_seconds, 3),
+        **results,
+        "api_peak_rss_mb": api_peak_rss_mb,
+    }
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            report["comparison"] = compare(report, json.load(f), args.tolerance)
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(report, f, indent=2)
+
+    latency = report["latency_ms"]
+    print(f"\n   Throughput: {report['throughput_rps']} req/s ({report['errors']} errores)")
+    print(f"   Latencia:   p50 {latency['p50']} ms | p95 {latency['p95']} ms | p99 {latency['p99']} ms")
+    print(f"   Pico RSS:   {report['api_peak_rss_mb']} MB (proceso de la API)")
+    print(f"   Reporte:    {args.output}")
+
+    if "comparison" in report:
+        print(f"\n📊 Comparación contra {args.baseline} (tolerancia {args.tolerance:.0%})")
+        for name, metric in report["comparison"]["metrics"].items():
+            flag = "❌" if metric["regressed"] else "✓"
+            print(f"   {flag} {name}: {metric['baseline']} -> {metric['current']} ({metric['change']:+.1%})")
+
+        if report["comparison"]["regressed"]:
+            print("\n❌ Hay métricas que empeoraron más que la tolerancia")
+            raise SystemExit(1)
+
+    raise SystemExit(1 if report["errors"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,16 @@
 
 # Script para ejecutar la API localmente
 # Proyecto: resolucion/telco_prod
+#
+# Uso:
+#   ./run_api.sh               # un proceso uvicorn (desarrollo)
+#   ./run_api.sh --workers 4   # servidor pre-fork: el modelo se carga una vez
+#                              # y lo comparten 4 workers (src/api/server.py)
+
+WORKERS=""
+if [ "$1" == "--workers" ]; then
+    WORKERS="$2"
+fi
 
 echo "🚀 Iniciando TelcoVision API..."
 echo ""
@@ -25,6 +35,11 @@ echo "Endpoints disponibles:"
 echo "  - GET  /          : Health check básico"
 echo "  - GET  /health    : Health check detallado"
 echo "  - POST /predict   : Predicción de churn"
+echo "  - POST /predict/batch : Predicción de churn por lotes"
+echo "  - POST /predict/stream : Predicción de churn en streaming (NDJSON)"
+echo "  - GET  /score/{id} : Score precalculado (score store)"
+echo "  - GET  /metrics   : Métricas (Prometheus)"
+echo "  - GET  /shadow    : Scoring en sombra champion / challenger (CHALLENGER_STAGE)"
 echo "  - GET  /docs      : Documentación interactiva"
 echo ""
 echo "Presiona CTRL+C para detener el servidor"
@@ -32,6 +47,10 @@ echo ""
 
 # Ejecutar con conda
 cd "$(dirname "$0")"
+if [ -n "$WORKERS" ]; then
+    echo "✓ Servidor pre-fork con $WORKERS workers (SIGHUP al master: reinicio gradual)"
+    exec conda run --no-capture-output -n pycaret-env python -m src.api.server --workers "$WORKERS" --port 8000
+fi
 conda run -n pycaret-env python -c "
 import sys
 sys.path.insert(0, '.')
@@ -1,18 +1,40 @@
 # src/app.py
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
-import mlflow
-import pandas as pd
+import time
+
+# Inicio de la importación de dependencias (fase "imports" del arranque en frío)
+_imports_started = time.perf_counter()
+
+from fastapi import FastAPI, HTTPException, Body, Header, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, PlainTextResponse
+from pydantic import BaseModel, ValidationError
+from typing import Any, Dict, List, Optional
 import os
+import hmac
+import signal
+import threading
 from dotenv import load_dotenv
-import uvicorn
 import logging
 
-# Configurar logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+from src.api.batching import MicroBatcher
+from src.api.limiter import ConcurrencyLimiter, Overloaded
+from src.api.logs import sample_success, setup_logging
+from src.api.metrics import REGISTRY, STAGE_DURATION, MetricsMiddleware, StageTimer, merge_expositions, read_snapshots, sample_lines
+from src.api.model_cache import resolve_version
+from src.api.prediction_cache import PredictionCache
+from src.api.score_store import fingerprint, open_store, stale_reason
+from src.api.serving import format_phases, load_serving_model
+from src.api.shadow import ShadowScorer, read_log, summarize
+from src.api.streaming import BodyStreamingResponse, LineTooLongError, iter_ndjson, ndjson_line
+
+# MLflow, pandas, mangum y uvicorn se importan recién cuando se usan: el
+# handler de Lambda no los carga al importarse y el backend ONNX nunca
+# importa pandas ni PyCaret
+IMPORTS_SECONDS = time.perf_counter() - _imports_started
+
+# Configurar logging: escritura en un hilo de fondo, texto o JSON y muestreo
+# de los logs de éxito (ver src/api/logs.py)
+setup_logging()
 logger = logging.getLogger(__name__)
 
 # Cargar variables de entorno
@@ -23,21 +45,154 @@ app = FastAPI(
     description="API para predecir la retención de clientes (Churn) usando el modelo productivo de MLflow.",
     version="1.0.0"
 )
+app.add_middleware(MetricsMiddleware)
 
 # Configuración de MLflow
 MODEL_NAME = os.getenv("MLFLOW_MODEL_NAME", "telco-churn-prediction")
 MODEL_STAGE = os.getenv("MLFLOW_MODEL_STAGE", "Production")
 
-# Variable global para el modelo
+# Tamaño máximo de lote aceptado por /predict/batch
+MAX_BATCH_SIZE = int(os.getenv("MAX_BATCH_SIZE", "1000"))
+
+# /predict/stream: filas por bloque interno y tamaño máximo de cada línea NDJSON
+STREAM_CHUNK_SIZE = int(os.getenv("STREAM_CHUNK_SIZE", "500"))
+STREAM_MAX_LINE_BYTES = int(os.getenv("STREAM_MAX_LINE_BYTES", "65536"))
+
+# Micro-batching opcional de /predict: los pedidos concurrentes se agrupan
+# hasta MICROBATCH_MAX_SIZE filas o MICROBATCH_MAX_WAIT_MS milisegundos; como
+# máximo MICROBATCH_QUEUE_SIZE pedidos esperan lote (el resto recibe 429)
+MICROBATCH_ENABLED = os.getenv("MICROBATCH_ENABLED", "false").lower() == "true"
+MICROBATCH_MAX_SIZE = int(os.getenv("MICROBATCH_MAX_SIZE", "32"))
+MICROBATCH_MAX_WAIT_MS = float(os.getenv("MICROBATCH_MAX_WAIT_MS", "5"))
+MICROBATCH_QUEUE_SIZE = int(os.getenv("MICROBATCH_QUEUE_SIZE", "1024"))
+
+# Límite de inferencias concurrentes: como máximo INFERENCE_CONCURRENCY
+# pedidos ejecutan el modelo a la vez y hasta INFERENCE_QUEUE_SIZE esperan
+# INFERENCE_QUEUE_TIMEOUT_MS; el resto se rechaza con 429/503 y Retry-After
+# (INFERENCE_CONCURRENCY=0 lo deshabilita). El default es la cantidad de
+# CPUs; con el servidor pre-fork el master lo divide entre los workers
+INFERENCE_CONCURRENCY = int(os.getenv("INFERENCE_CONCURRENCY", str(os.cpu_count() or 1)))
+INFERENCE_QUEUE_SIZE = int(os.getenv("INFERENCE_QUEUE_SIZE", "64"))
+INFERENCE_QUEUE_TIMEOUT_MS = float(os.getenv("INFERENCE_QUEUE_TIMEOUT_MS", "1000"))
+
+# Camino rápido sin DataFrame para lotes chicos (ver src/api/fast_path.py)
+FAST_PATH_ENABLED = os.getenv("FAST_PATH_ENABLED", "true").lower() == "true"
+FAST_PATH_MAX_ROWS = int(os.getenv("FAST_PATH_MAX_ROWS", "64"))
+
+# Backend de inferencia: "pyfunc" (default) u "onnx" (artefacto compiled/
+# exportado por src/promote_best_model.py; si falta se usa pyfunc)
+MODEL_BACKEND = os.getenv("MODEL_BACKEND", "pyfunc").lower()
+
+# Caché local de artefactos (ver src/api/model_cache.py)
+MODEL_CACHE_ENABLED = os.getenv("MODEL_CACHE_ENABLED", "true").lower() == "true"
+
+# Recarga del modelo sin reiniciar: cada MODEL_RELOAD_INTERVAL segundos
+# (0 = deshabilitado) y/o vía POST /admin/reload con el header X-Admin-Token
+MODEL_RELOAD_INTERVAL = float(os.getenv("MODEL_RELOAD_INTERVAL", "0"))
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+# Caché de predicciones por features + versión del modelo
+# (PREDICTION_CACHE_SIZE=0 lo deshabilita)
+PREDICTION_CACHE_SIZE = int(os.getenv("PREDICTION_CACHE_SIZE", "10000"))
+PREDICTION_CACHE_TTL = float(os.getenv("PREDICTION_CACHE_TTL", "300"))
+
+# Predicciones sintéticas de calentamiento antes de reportar la API como
+# lista: la primera inicializa el pipeline y el resto estabiliza cachés
+# internos (0 = sin calentamiento)
+WARMUP_PREDICTIONS = int(os.getenv("WARMUP_PREDICTIONS", "3"))
+
+# Score store precalculado por customer_id (src/build_score_store.py) para
+# /score/{customer_id}; los scores vistos hace más de SCORE_STORE_MAX_AGE_HOURS
+# en la tabla de clientes se consideran vencidos (0 = sin vencimiento)
+SCORE_STORE_PATH = os.getenv("SCORE_STORE_PATH", "outputs/score_store.sqlite")
+SCORE_STORE_MAX_AGE_HOURS = float(os.getenv("SCORE_STORE_MAX_AGE_HOURS", "24"))
+
+# Scoring en sombra (ver src/api/shadow.py): con CHALLENGER_STAGE definido
+# (ej: Staging), una fracción SHADOW_SAMPLE_RATE de los pedidos a /predict
+# se vuelve a predecir con ese stage en SHADOW_WORKERS hilos de fondo, sin
+# demorar la respuesta. Con más de SHADOW_MAX_PENDING comparaciones
+# pendientes se descartan las nuevas; SHADOW_LOG_PATH agrega cada
+# comparación como una línea JSON (vacío = solo en memoria, GET /shadow).
+# Con el servidor pre-fork hace falta el log para ver el tráfico de todos
+# los workers en GET /shadow
+CHALLENGER_STAGE = os.getenv("CHALLENGER_STAGE", "")
+SHADOW_SAMPLE_RATE = float(os.getenv("SHADOW_SAMPLE_RATE", "0.1"))
+SHADOW_MAX_PENDING = int(os.getenv("SHADOW_MAX_PENDING", "100"))
+SHADOW_WORKERS = int(os.getenv("SHADOW_WORKERS", "1"))
+SHADOW_LOG_PATH = os.getenv("SHADOW_LOG_PATH", "")
+
+# Métricas con el servidor pre-fork: cada worker escribe las suyas en
+# METRICS_DIR cada METRICS_SNAPSHOT_INTERVAL segundos y GET /metrics une las
+# de todos (el master crea un directorio temporal si no está definido)
+METRICS_DIR = os.getenv("METRICS_DIR", "")
+METRICS_SNAPSHOT_INTERVAL = float(os.getenv("METRICS_SNAPSHOT_INTERVAL", "5"))
+
+# Modelo activo (ServingModel). Se reemplaza de una sola vez al recargar,
+# así los pedidos en curso terminan con el modelo anterior.
 model = None
 model_info = {}
+batcher = None
+limiter = (
+    ConcurrencyLimiter(INFERENCE_CONCURRENCY, INFERENCE_QUEUE_SIZE, INFERENCE_QUEUE_TIMEOUT_MS)
+    if INFERENCE_CONCURRENCY > 0 else None
+)
+score_store = None
+shadow = None
+prediction_cache = PredictionCache(PREDICTION_CACHE_SIZE, PREDICTION_CACHE_TTL) if PREDICTION_CACHE_SIZE > 0 else None
+
+_reload_lock = threading.Lock()
+_watcher_stop = threading.Event()
+
+# PID del proceso master cuando la API corre en el servidor pre-fork
+# (src/api/server.py); el master carga el modelo y coordina las recargas
+prefork_master = None
+
+def _load_and_warm_up(stage: str = MODEL_STAGE):
+    """
+    Carga el modelo del stage y lo calienta con predicciones de ejemplo.
+    
+    Las fases first_predict (primera predicción) y warmup (el resto del
+    calentamiento) se agregan a `info["phases"]` del modelo.
+    """
+    serving = load_serving_model(
+        MODEL_NAME,
+        stage,
+        SAMPLE_CUSTOMERS,
+        use_cache=MODEL_CACHE_ENABLED,
+        fast_path_enabled=FAST_PATH_ENABLED,
+        fast_path_max_rows=FAST_PATH_MAX_ROWS,
+        backend=MODEL_BACKEND
+    )
+    
+    phases = serving.info["phases"]
+    if WARMUP_PREDICTIONS > 0:
+        started = time.perf_counter()
+        serving.predict_records(SAMPLE_CUSTOMERS[:1])
+        phases["first_predict"] = round(time.perf_counter() - started, 3)
+        
+        # Alternar filas sueltas y el lote completo para calentar ambos caminos
+        started = time.perf_counter()
+        for i in range(1, WARMUP_PREDICTIONS):
+            serving.predict_records(SAMPLE_CUSTOMERS if i % 2 else [SAMPLE_CUSTOMERS[i % len(SAMPLE_CUSTOMERS)]])
+        phases["warmup"] = round(time.perf_counter() - started, 3)
+    
+    return serving
 
 @app.on_event("startup")
 def load_model():
     """Carga el modelo desde MLflow con manejo robusto de errores"""
     global model, model_info
     
+    # Ya cargado por el master del servidor pre-fork antes del fork
+    if model is not None:
+        return
+    
     try:
+        # Importación diferida de MLflow (cuenta como fase "imports")
+        started = time.perf_counter()
+        import mlflow
+        imports_seconds = IMPORTS_SECONDS + time.perf_counter() - started
+        
         # Configurar MLflow
         tracking_uri = os.getenv("MLFLOW_TRACKING_URI")
         if tracking_uri:
@@ -46,22 +201,15 @@ def load_model():
         else:
             logger.warning("MLFLOW_TRACKING_URI no configurado, usando configuración local")
         
-        # Construir URI del modelo
-        model_uri = f"models:/{MODEL_NAME}/{MODEL_STAGE}"
-        logger.info(f"Intentando cargar modelo desde: {model_uri}")
+        logger.info(f"Intentando cargar modelo desde: models:/{MODEL_NAME}/{MODEL_STAGE}")
         
-        # Cargar modelo
-        model = mlflow.pyfunc.load_model(model_uri)
-        
-        # Guardar información del modelo
-        model_info = {
-            "name": MODEL_NAME,
-            "stage": MODEL_STAGE,
-            "uri": model_uri,
-            "status": "loaded"
-        }
+        model = _load_and_warm_up()
+        cold_start = {"imports": round(imports_seconds, 3), **model.info["phases"]}
+        cold_start["total"] = round(IMPORTS_SECONDS + time.perf_counter() - started, 3)
+        model_info = {**model.info, "status": "loaded", "cold_start": cold_start}
         
-        logger.info(f"✅ Modelo cargado exitosamente: {MODEL_NAME} ({MODEL_STAGE})")
+        logger.info(f"✅ Modelo cargado exitosamente: {MODEL_NAME} ({MODEL_STAGE}) v{model_info['version']} desde {model_info['source']}")
+        logger.info(f"⏱ Arranque en frío: {format_phases(cold_start)}")
         
     except Exception as e:
         logger.error(f"❌ Error al cargar modelo '{MODEL_NAME}' en stage '{MODEL_STAGE}': {e}")
@@ -74,6 +222,192 @@ def load_model():
             "error": str(e)
         }
 
+def reload_model(force: bool = False) -> Dict[str, Any]:
+    """
+    Carga la versión actual del stage junto al modelo activo, la calienta y
+    la activa con un único reemplazo de referencia.
+    
+    Si la versión del registry no cambió (y no se fuerza), no se recarga.
+    """
+    global model, model_info
+    
+    with _reload_lock:
+        started = time.time()
+        previous_version = model.info.get("version") if model is not None else None
+        
+        try:
+            if not force and model is not None:
+                latest = resolve_version(MODEL_NAME, MODEL_STAGE)
+                if str(latest.version) == previous_version:
+                    status = {"status": "unchanged", "version": previous_version, "at": started}
+                    model_info = {**model_info, "last_reload": status}
+                    return status
+            
+            candidate = _load_and_warm_up()
+            model = candidate
+            if prediction_cache is not None:
+                prediction_cache.clear()
+            
+            status = {
+                "status": "reloaded",
+                "previous_version": previous_version,
+                "version": candidate.info.get("version"),
+                "load_seconds": candidate.info["load_seconds"],
+                "at": started
+            }
+            model_info = {**candidate.info, "status": "loaded", "cold_start": model_info.get("cold_start"), "last_reload": status}
+            logger.info(f"🔄 Modelo recargado: v{previous_version} -> v{status['version']}")
+        
+        except Exception as e:
+            status = {"status": "error", "error": str(e), "version": previous_version, "at": started}
+            model_info = {**model_info, "last_reload": status}
+            logger.error(f"❌ Error al recargar modelo, se mantiene v{previous_version}: {e}")
+        
+        return status
+
+def reload_challenger(force: bool = False) -> Optional[Dict[str, Any]]:
+    """
+    Carga (o recarga si cambió de versión) el challenger del scoring en
+    sombra. Si falla, se mantiene el challenger anterior (o sigue sin
+    scoring en sombra).
+    """
+    global shadow
+    
+    if not CHALLENGER_STAGE:
+        return None
+    
+    with _reload_lock:
+        previous_version = shadow.challenger.info.get("version") if shadow is not None else None
+        try:
+            if not force and shadow is not None:
+                latest = resolve_version(MODEL_NAME, CHALLENGER_STAGE)
+                if str(latest.version) == previous_version:
+                    return {"status": "unchanged", "version": previous_version}
+        
+            challenger = _load_and_warm_up(CHALLENGER_STAGE)
+        except Exception as e:
+            logger.error(f"❌ Error al cargar el challenger '{MODEL_NAME}' ({CHALLENGER_STAGE}), se mantiene v{previous_version}: {e}")
+            return {"status": "error", "error": str(e), "version": previous_version}
+        
+        if shadow is None:
+            shadow = ShadowScorer(
+                challenger,
+                SHADOW_SAMPLE_RATE,
+                max_pending=SHADOW_MAX_PENDING,
+                workers=SHADOW_WORKERS,
+                log_path=SHADOW_LOG_PATH or None
+            )
+        else:
+            shadow.challenger = challenger
+        
+        version = challenger.info.get("version")
+        logger.info(f"🌓 Challenger en sombra: {MODEL_NAME} ({CHALLENGER_STAGE}) v{version}, muestra {SHADOW_SAMPLE_RATE:.0%} de /predict")
+        return {"status": "reloaded", "previous_version": previous_version, "version": version}
+
+def _watch_model():
+    """Revisa periódicamente si cambió la versión del stage (y del challenger) y la recarga"""
+    while not _watcher_stop.wait(MODEL_RELOAD_INTERVAL):
+        reload_model()
+        reload_challenger()
+
+@app.on_event("startup")
+def load_challenger():
+    """Carga el challenger del scoring en sombra si está configurado"""
+    if shadow is None:
+        reload_challenger(force=True)
+
+@app.on_event("shutdown")
+def stop_shadow():
+    """Termina las comparaciones en sombra pendientes"""
+    if shadow is not None:
+        shadow.shutdown()
+
+@app.on_event("startup")
+def load_score_store():
+    """Abre el score store si existe"""
+    global score_store
+    
+    try:
+        score_store = open_store(SCORE_STORE_PATH)
+    except Exception as e:
+        logger.error(f"❌ No se pudo abrir el score store {SCORE_STORE_PATH}: {e}")
+        return
+    
+    if score_store is None:
+        logger.info(f"Score store no encontrado en {SCORE_STORE_PATH}, /score usará solo inferencia en línea")
+    else:
+        meta = score_store.meta()
+        logger.info(f"Score store: {meta.get('rows')} clientes, modelo v{meta.get('model_version')}")
+
+@app.on_event("startup")
+def start_model_watcher():
+    """Inicia el watcher de recarga si está configurado (en pre-fork lo hace el master)"""
+    if MODEL_RELOAD_INTERVAL > 0 and prefork_master is None:
+        _watcher_stop.clear()
+        threading.Thread(target=_watch_model, name="model-watcher", daemon=True).start()
+        logger.info(f"Recarga automática del modelo cada {MODEL_RELOAD_INTERVAL} s")
+
+@app.on_event("shutdown")
+def stop_model_watcher():
+    """Detiene el watcher de recarga"""
+    _watcher_stop.set()
+
+@app.on_event("startup")
+async def start_batcher():
+    """Inicia el micro-batcher si está habilitado"""
+    global batcher
+    
+    if MICROBATCH_ENABLED:
+        # Cada lote ocupa un lugar del límite de concurrencia como un pedido más
+        batcher = MicroBatcher(
+            infer_records,
+            max_batch_size=MICROBATCH_MAX_SIZE,
+            max_wait_ms=MICROBATCH_MAX_WAIT_MS,
+            max_queue=MICROBATCH_QUEUE_SIZE,
+            run=run_inference
+        )
+        await batcher.start()
+        logger.info(f"Micro-batching habilitado: hasta {MICROBATCH_MAX_SIZE} filas o {MICROBATCH_MAX_WAIT_MS} ms")
+
+@app.on_event("shutdown")
+async def stop_batcher():
+    """Detiene el micro-batcher"""
+    global batcher
+    
+    if batcher is not None:
+        await batcher.stop()
+        batcher = None
+
+def cached_prediction(record: Dict[str, Any]) -> Optional[int]:
+    """Busca la predicción de un cliente en el caché para la versión activa del modelo"""
+    if prediction_cache is None or model is None:
+        return None
+    return prediction_cache.get(PredictionCache.key(record, model.info.get("version")))
+
+def infer_records(records: List[Dict[str, Any]]) -> List[int]:
+    """Predice con el modelo activo al momento de la llamada y guarda los resultados en el caché"""
+    active = model
+    predictions = active.predict_records(records)
+    
+    if prediction_cache is not None:
+        version = active.info.get("version")
+        for record, prediction in zip(records, predictions):
+            prediction_cache.put(PredictionCache.key(record, version), prediction)
+    
+    return predictions
+
+def predict_records(records: List[Dict[str, Any]]) -> List[int]:
+    """Predice un lote de clientes; solo los que no están en el caché pasan por el modelo"""
+    results = [cached_prediction(record) for record in records]
+    missing = [i for i, result in enumerate(results) if result is None]
+    
+    if missing:
+        predictions = infer_records([records[i] for i in missing])
+        for i, prediction in zip(missing, predictions):
+            results[i] = prediction
+    
+    return results
+
 class CustomerData(BaseModel):
     customer_id: str
     age: int
@@ -106,6 +440,72 @@ class CustomerData(BaseModel):
             }
         }
 
+# Clientes de ejemplo usados para compilar y verificar el camino rápido
+SAMPLE_CUSTOMERS = [
+    CustomerData.Config.schema_extra["example"],
+    {
+        "customer_id": "TEST-001",
+        "age": 35,
+        "gender": "Male",
+        "region": "North",
+        "contract_type": "Month-to-Month",
+        "tenure_months": 6,
+        "monthly_charges": 65.5,
+        "total_charges": 393.0,
+        "internet_service": "Fiber optic",
+        "phone_service": "Yes",
+        "multiple_lines": "No",
+        "payment_method": "Electronic check"
+    },
+    {
+        "customer_id": "TEST-002",
+        "age": 58,
+        "gender": "Female",
+        "region": "South",
+        "contract_type": "Two Year",
+        "tenure_months": 60,
+        "monthly_charges": 89.9,
+        "total_charges": 5394.0,
+        "internet_service": "No",
+        "phone_service": "No",
+        "multiple_lines": "No",
+        "payment_method": "Credit card"
+    }
+]
+
+async def run_inference(fn, *args, shed: bool = True):
+    """Ejecuta `fn` en el threadpool respetando el límite de inferencias concurrentes"""
+    if limiter is None:
+        return await run_in_threadpool(fn, *args)
+    
+    async with limiter.slot(shed):
+        return await run_in_threadpool(fn, *args)
+
+@app.exception_handler(Overloaded)
+async def overloaded_handler(request: Request, exc: Overloaded):
+    """Respuesta rápida cuando el pedido se descarta por exceso de carga"""
+    logger.warning("Pedido descartado por sobrecarga (%s) en %s", exc.reason, request.url.path, extra={"reason": exc.reason, "path": request.url.path})
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={
+            "error": "Servicio sobrecargado",
+            "reason": exc.reason,
+            "message": f"Reintentar en {exc.retry_after} s"
+        },
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
+def build_prediction(customer_id: str, result: int) -> Dict[str, Any]:
+    """Arma la respuesta de predicción para un cliente"""
+    churn_risk = "HIGH" if result == 1 else "LOW"
+    
+    return {
+        "customer_id": customer_id,
+        "churn_prediction": result,
+        "churn_risk": churn_risk,
+        "interpretation": "Cliente con riesgo de abandono" if result == 1 else "Cliente sin riesgo de abandono"
+    }
+
 @app.get("/")
 def read_root():
     """Endpoint de health check"""
@@ -128,11 +528,111 @@ def health_check():
     return {
         "status": "healthy",
         "model": model_info,
+        "batching": batcher.stats() if batcher is not None else {"enabled": False},
+        "limiter": limiter.stats() if limiter is not None else {"enabled": False},
+        "score_store": score_store.stats() if score_store is not None else {"enabled": False},
+        "prediction_cache": prediction_cache.stats() if prediction_cache is not None else {"enabled": False},
+        "shadow": shadow.report() if shadow is not None else {"enabled": False},
         "message": "API lista para predicciones"
     }
 
+@app.get("/metrics")
+def metrics():
+    """Métricas en formato de texto de Prometheus"""
+    text = REGISTRY.render()
+    if prefork_master is not None and METRICS_DIR:
+        # Las series propias al momento y las de los demás workers según su última escritura
+        text = merge_expositions([text, *read_snapshots(METRICS_DIR, os.getpid())])
+    return PlainTextResponse(text, media_type="text/plain; version=0.0.4")
+
+def _collect_service_metrics() -> List[str]:
+    """Métricas del modelo activo, del caché y del micro-batcher (se calculan en cada /metrics)"""
+    info = model_info
+    lines = sample_lines(
+        "telco_model_info",
+        "Modelo activo (el valor es 1 si está cargado)",
+        [({
+            "name": str(info.get("name")),
+            "stage": str(info.get("stage")),
+            "version": str(info.get("version")),
+            "backend": str(info.get("backend")),
+            "source": str(info.get("source"))
+        }, 1 if model is not None else 0)]
+    )
+    lines += sample_lines(
+        "telco_model_load_seconds",
+        "Duración de la última carga del modelo",
+        [({}, info.get("load_seconds") or 0.0)]
+    )
+    lines += sample_lines(
+        "telco_cold_start_phase_seconds",
+        "Duración de cada fase del arranque en frío",
+        [({"phase": phase}, seconds) for phase, seconds in (info.get("cold_start") or {}).items()]
+    )
+    
+    if prediction_cache is not None:
+        stats = prediction_cache.stats()
+        lines += sample_lines("telco_prediction_cache_entries", "Entradas en el caché de predicciones", [({}, stats["entries"])])
+        lines += sample_lines(
+            "telco_prediction_cache_lookups_total",
+            "Búsquedas en el caché de predicciones por resultado",
+            [({"result": "hit"}, stats["hits"]), ({"result": "miss"}, stats["misses"])],
+            "counter"
+        )
+    
+    if limiter is not None:
+        stats = limiter.stats()
+        lines += sample_lines("telco_inference_active", "Inferencias en ejecución", [({}, stats["active"])])
+        lines += sample_lines("telco_inference_queue_depth", "Pedidos esperando un lugar para ejecutar el modelo", [({}, stats["queue_depth"])])
+        lines += sample_lines("telco_inference_admitted_total", "Pedidos admitidos por el limitador", [({}, stats["admitted"])], "counter")
+        lines += sample_lines(
+            "telco_inference_shed_total",
+            "Pedidos descartados por sobrecarga, por motivo",
+            [({"reason": reason}, stats["shed"].get(reason, 0)) for reason in ("queue_full", "queue_timeout")],
+            "counter"
+        )
+    
+    if score_store is not None:
+        lines += sample_lines(
+            "telco_score_store_lookups_total",
+            "Búsquedas en el score store por resultado",
+            [({"result": result}, count) for result, count in sorted(score_store.lookups.items())],
+            "counter"
+        )
+    
+    if shadow is not None:
+        report = shadow.report()
+        lines += sample_lines(
+            "telco_shadow_info",
+            "Challenger del scoring en sombra (el valor es 1)",
+            [({"stage": str(report["challenger"]["stage"]), "version": str(report["challenger"]["version"])}, 1)]
+        )
+        lines += sample_lines(
+            "telco_shadow_comparisons_total",
+            "Pedidos comparados en sombra por resultado (desde el último cambio de versiones)",
+            [({"result": "agree"}, report["agreed"]), ({"result": "disagree"}, report["comparisons"] - report["agreed"])],
+            "counter"
+        )
+        lines += sample_lines(
+            "telco_shadow_skipped_total",
+            "Pedidos de la muestra no comparados, por motivo",
+            [({"reason": "dropped"}, report["dropped"]), ({"reason": "error"}, report["errors"])],
+            "counter"
+        )
+    
+    if batcher is not None:
+        stats = batcher.stats()
+        lines += sample_lines("telco_microbatch_batches_total", "Lotes despachados por el micro-batcher", [({}, stats["batches_flushed"])], "counter")
+        lines += sample_lines("telco_microbatch_rows_total", "Filas despachadas por el micro-batcher", [({}, stats["rows_flushed"])], "counter")
+        lines += sample_lines("telco_microbatch_queue_depth", "Pedidos esperando lote en el micro-batcher", [({}, stats["queue_depth"])])
+        lines += sample_lines("telco_microbatch_rejected_total", "Pedidos rechazados con la cola del micro-batcher llena", [({}, stats["rejected"])], "counter")
+    
+    return lines
+
+REGISTRY.register_collector(_collect_service_metrics)
+
 @app.post("/predict")
-def predict(data: CustomerData):
+async def predict(data: CustomerData, request: Request):
     """
     Realiza una predicción de churn para un cliente.
     
@@ -153,33 +653,56 @@ def predict(data: CustomerData):
             }
         )
     
+    # Lectura y validación del body (desde que llegó el request)
+    received_at = request.scope.get("state", {}).get("received_at")
+    if received_at is not None:
+        STAGE_DURATION.labels("validation").observe(time.perf_counter() - received_at)
+    
     try:
-        # Convertir input a DataFrame
         input_data = data.dict()
         customer_id = input_data.get("customer_id")
         
-        logger.info(f"Procesando predicción para cliente: {customer_id}")
+        # Las dos líneas de éxito del pedido se loguean juntas o ninguna
+        log_success = sample_success()
+        if log_success:
+            logger.info("Procesando predicción para cliente: %s", customer_id, extra={"customer_id": customer_id})
         
-        df = pd.DataFrame([input_data])
+        # Realizar predicción: desde el caché si ya se predijo con la misma
+        # versión del modelo; si no, vía micro-batcher si está habilitado o
+        # directamente en el threadpool (con límite de concurrencia) para no
+        # bloquear el event loop
+        champion = model
+        inference_ms = None
+        result = cached_prediction(input_data)
+        if result is None:
+            started = time.perf_counter()
+            if batcher is not None:
+                result = await batcher.submit(input_data)
+            else:
+                result = (await run_inference(infer_records, [input_data]))[0]
+            inference_ms = (time.perf_counter() - started) * 1000
         
-        # Realizar predicción
-        prediction = model.predict(df)
-        result = int(prediction[0])
+        with StageTimer("serialization"):
+            prediction = build_prediction(customer_id, result)
+            response = JSONResponse(prediction)
         
-        # Interpretar resultado
-        churn_risk = "HIGH" if result == 1 else "LOW"
+        # Comparación con el challenger en segundo plano (solo una muestra)
+        if shadow is not None:
+            shadow.submit(input_data, result, champion)
         
-        logger.info(f"Predicción completada para {customer_id}: {result} ({churn_risk})")
+        if log_success:
+            logger.info(
+                "Predicción completada para %s: %s (%s)", customer_id, result, prediction["churn_risk"],
+                extra={"customer_id": customer_id, "prediction": result, "inference_ms": None if inference_ms is None else round(inference_ms, 3)}
+            )
         
-        return {
-            "customer_id": customer_id,
-            "churn_prediction": result,
-            "churn_risk": churn_risk,
-            "interpretation": "Cliente con riesgo de abandono" if result == 1 else "Cliente sin riesgo de abandono"
-        }
+        return response
+    
+    except Overloaded:
+        raise
         
     except Exception as e:
-        logger.error(f"Error en predicción: {str(e)}")
+        logger.error("Error en predicción: %s", e, extra={"customer_id": data.customer_id})
         raise HTTPException(
             status_code=500,
             detail={
@@ -189,9 +712,362 @@ def predict(data: CustomerData):
             }
         )
 
-# Handler para AWS Lambda
-from mangum import Mangum
-handler = Mangum(app)
+@app.post("/predict/batch")
+async def predict_batch(customers: List[Any] = Body(...)):
+    """
+    Realiza predicciones de churn para una lista de clientes en una sola
+    llamada al modelo.
+    
+    Cada fila se valida por separado: las filas inválidas se devuelven con
+    su error y no impiden que se predigan las demás. Los resultados se
+    devuelven en el mismo orden que la entrada.
+    """
+    if model is None:
+        logger.error("Intento de predicción batch sin modelo cargado")
+        raise HTTPException(
+            status_code=503,
+            detail={
+                "error": "Modelo no disponible",
+                "message": "El modelo no pudo ser cargado desde MLflow",
+                "model_info": model_info
+            }
+        )
+    
+    if len(customers) > MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail={
+                "error": "Lote demasiado grande",
+                "message": f"Se recibieron {len(customers)} clientes, el máximo es {MAX_BATCH_SIZE}",
+                "max_batch_size": MAX_BATCH_SIZE
+            }
+        )
+    
+    # Validación y predicción en el threadpool, con límite de concurrencia
+    return await run_inference(score_batch, customers)
+
+def score_batch(customers: List[Any]) -> JSONResponse:
+    """Valida y predice un lote de clientes (se ejecuta en el threadpool)"""
+    results: List[Dict[str, Any]] = [None] * len(customers)
+    
+    # Validar fila por fila, guardando las posiciones válidas
+    valid_positions = []
+    valid_rows = []
+    with StageTimer("validation"):
+        for i, raw in enumerate(customers):
+            if not isinstance(raw, dict):
+                results[i] = {"index": i, "customer_id": None, "error": "Datos inválidos", "message": "Se esperaba un objeto JSON"}
+                continue
+            try:
+                valid_rows.append(CustomerData(**raw).dict())
+                valid_positions.append(i)
+            except ValidationError as e:
+                results[i] = {
+                    "index": i,
+                    "customer_id": raw.get("customer_id"),
+                    "error": "Datos inválidos",
+                    "details": e.errors()
+                }
+    
+    log_success = sample_success()
+    if log_success:
+        logger.info("Procesando predicción batch: %d válidos de %d", len(valid_rows), len(customers))
+    
+    if valid_rows:
+        try:
+            predictions = predict_records(valid_rows)
+            
+            for i, row, prediction in zip(valid_positions, valid_rows, predictions):
+                results[i] = {"index": i, **build_prediction(row["customer_id"], prediction)}
+        
+        except Exception as e:
+            logger.error("Error en predicción batch: %s", e, extra={"rows": len(valid_rows)})
+            for i, row in zip(valid_positions, valid_rows):
+                results[i] = {
+                    "index": i,
+                    "customer_id": row["customer_id"],
+                    "error": "Error en predicción",
+                    "message": str(e)
+                }
+    
+    failed = sum(1 for r in results if "error" in r)
+    if failed:
+        logger.warning("Predicción batch completada: %d ok, %d con error", len(customers) - failed, failed, extra={"rows": len(customers), "failed": failed})
+    elif log_success:
+        logger.info("Predicción batch completada: %d ok", len(customers), extra={"rows": len(customers), "failed": 0})
+    
+    with StageTimer("serialization"):
+        return JSONResponse({
+            "count": len(customers),
+            "succeeded": len(customers) - failed,
+            "failed": failed,
+            "results": results
+        })
+
+@app.post("/predict/stream")
+async def predict_stream(request: Request):
+    """
+    Predicciones para un flujo NDJSON de clientes (un CustomerData por línea).
+    
+    Los clientes se validan igual que en /predict y se predicen en bloques
+    de STREAM_CHUNK_SIZE a medida que llegan; cada resultado se devuelve como
+    una línea NDJSON en el orden de la entrada, con su error si lo hubo.
+    """
+    if model is None:
+        logger.error("Intento de predicción stream sin modelo cargado")
+        raise HTTPException(
+            status_code=503,
+            detail={
+                "error": "Modelo no disponible",
+                "message": "El modelo no pudo ser cargado desde MLflow",
+                "model_info": model_info
+            }
+        )
+    
+    async def score_chunk(chunk):
+        """Predice las filas válidas de un bloque y arma sus líneas de salida en orden"""
+        valid = [item for item in chunk if "row" in item]
+        if valid:
+            try:
+                # El stream ya empezó a responder: esperar lugar sin descartar
+                predictions = await run_inference(predict_records, [item["row"] for item in valid], shed=False)
+                for item, prediction in zip(valid, predictions):
+                    item["result"] = {"line": item["line"], **build_prediction(item["row"]["customer_id"], prediction)}
+            except Exception as e:
+                logger.error("Error en predicción stream: %s", e, extra={"rows": len(valid)})
+                for item in valid:
+                    item["result"] = {
+                        "line": item["line"],
+                        "customer_id": item["row"]["customer_id"],
+                        "error": "Error en predicción",
+                        "message": str(e)
+                    }
+        
+        return b"".join(ndjson_line(item["result"]) for item in chunk)
+    
+    # Lectura y validación de cada bloque, como la etapa "validation" de
+    # /predict: desde que llegó el request o terminó de enviarse el bloque
+    # anterior hasta que el bloque está completo
+    chunk_started = request.scope.get("state", {}).get("received_at") or time.perf_counter()
+    
+    def chunk_validated():
+        STAGE_DURATION.labels("validation").observe(time.perf_counter() - chunk_started)
+    
+    async def results():
+        nonlocal chunk_started
+        chunk = []
+        scored = 0
+        
+        try:
+            async for line_number, raw in iter_ndjson(request.stream(), STREAM_MAX_LINE_BYTES):
+                if isinstance(raw, ValueError):
+                    chunk.append({"line": line_number, "result": {"line": line_number, "error": "JSON inválido", "message": str(raw)}})
+                elif not isinstance(raw, dict):
+                    chunk.append({"line": line_number, "result": {"line": line_number, "error": "Datos inválidos", "message": "Se esperaba un objeto JSON"}})
+                else:
+                    try:
+                        chunk.append({"line": line_number, "row": CustomerData(**raw).dict()})
+                    except ValidationError as e:
+                        chunk.append({"line": line_number, "result": {
+                            "line": line_number,
+                            "customer_id": raw.get("customer_id"),
+                            "error": "Datos inválidos",
+                            "details": e.errors()
+                        }})
+                
+                if len(chunk) >= STREAM_CHUNK_SIZE:
+                    chunk_validated()
+                    yield await score_chunk(chunk)
+                    scored += len(chunk)
+                    chunk = []
+                    chunk_started = time.perf_counter()
+            
+            if chunk:
+                chunk_validated()
+                yield await score_chunk(chunk)
+                scored += len(chunk)
+        
+        except LineTooLongError as e:
+            if chunk:
+                chunk_validated()
+                yield await score_chunk(chunk)
+            yield ndjson_line({"error": "Línea demasiado larga", "message": str(e)})
+        
+        if sample_success():
+            logger.info("Predicción stream completada: %d líneas", scored, extra={"rows": scored})
+    
+    return BodyStreamingResponse(results(), media_type="application/x-ndjson")
+
+def _store_lookup(customer_id: str):
+    """Busca un cliente en el score store; devuelve (entrada, motivo si no sirve)"""
+    if score_store is None:
+        return None, "disabled"
+    
+    entry = score_store.get(customer_id)
+    if entry is None:
+        return None, "unknown"
+    
+    active_version = model.info.get("version") if model is not None else entry["model_version"]
+    return entry, stale_reason(entry, active_version, SCORE_STORE_MAX_AGE_HOURS * 3600)
+
+def _store_response(entry: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        **build_prediction(entry["customer_id"], entry["prediction"]),
+        "source": "store",
+        "model_version": entry["model_version"],
+        "scored_at": entry["scored_at"]
+    }
+
+@app.get("/score/{customer_id}")
+async def get_score(customer_id: str):
+    """
+    Devuelve el score precalculado de un cliente.
+    
+    Responde 404 si el cliente no está en el score store o si su score está
+    vencido (otra versión del modelo o no visto recientemente); en ese caso
+    usar POST /score/{customer_id} con las features del cliente.
+    """
+    entry, reason = _store_lookup(customer_id)
+    
+    if reason is not None:
+        if score_store is not None:
+            score_store.lookups[reason] += 1
+        raise HTTPException(
+            status_code=404,
+            detail={
+                "error": "Score no disponible",
+                "reason": reason,
+                "customer_id": customer_id,
+                "message": "Enviar las features del cliente a POST /score/{customer_id} para obtener el score en línea"
+            }
+        )
+    
+    score_store.lookups["hit"] += 1
+    return _store_response(entry)
+
+@app.post("/score/{customer_id}")
+async def post_score(customer_id: str, data: CustomerData):
+    """
+    Devuelve el score precalculado si sigue vigente para las features
+    recibidas; si no (cliente desconocido, score vencido o features
+    distintas), lo calcula en línea como /predict.
+    """
+    if data.customer_id != customer_id:
+        raise HTTPException(
+            status_code=422,
+            detail={"error": "Datos inválidos", "message": "customer_id del body no coincide con el de la URL"}
+        )
+    
+    input_data = data.dict()
+    entry, reason = _store_lookup(customer_id)
+    if reason is None and entry["fingerprint"] != fingerprint(input_data):
+        reason = "changed"
+    
+    if score_store is not None:
+        score_store.lookups["hit" if reason is None else reason] += 1
+    
+    if reason is None:
+        return _store_response(entry)
+    
+    if model is None:
+        raise HTTPException(
+            status_code=503,
+            detail={
+                "error": "Modelo no disponible",
+                "message": "El cliente no tiene score vigente y el modelo no está cargado",
+                "model_info": model_info
+            }
+        )
+    
+    result = cached_prediction(input_data)
+    if result is None:
+        result = (await run_inference(infer_records, [input_data]))[0]
+    
+    return {
+        **build_prediction(customer_id, result),
+        "source": "live",
+        "reason": reason,
+        "model_version": model.info.get("version")
+    }
+
+@app.get("/shadow")
+def shadow_report():
+    """
+    Reporte del scoring en sombra: tasa de acuerdo entre champion y
+    challenger, matriz champion/challenger y percentiles de latencia de cada
+    uno. promote_best_model.py puede leerlo (promotion.shadow en params.yaml).
+    
+    Con el servidor pre-fork los contadores de cada worker cubren solo su
+    parte del tráfico: si hay SHADOW_LOG_PATH el reporte se arma con el log
+    que escriben todos los workers; si no, se devuelve el del worker que
+    atendió el pedido marcado con `"scope": "worker"` (evidencia parcial).
+    """
+    if shadow is None:
+        return {"enabled": False, "challenger_stage": CHALLENGER_STAGE or None}
+    if prefork_master is None:
+        return shadow.report()
+    
+    if not SHADOW_LOG_PATH:
+        return {**shadow.report(), "scope": "worker"}
+    
+    records = read_log(SHADOW_LOG_PATH) if os.path.exists(SHADOW_LOG_PATH) else []
+    return {
+        **summarize(records),
+        "enabled": True,
+        "scope": "all_workers",
+        "source": SHADOW_LOG_PATH,
+        "sample_rate": SHADOW_SAMPLE_RATE,
+    }
+
+@app.post("/admin/reload")
+def admin_reload(force: bool = False, x_admin_token: Optional[str] = Header(None)):
+    """
+    Recarga el modelo del stage configurado sin reiniciar la API.
+    
+    Requiere el header X-Admin-Token igual a la variable ADMIN_TOKEN.
+    Con force=true recarga aunque la versión no haya cambiado.
+    
+    En el servidor pre-fork se le pide al master un reinicio gradual de los
+    workers (SIGHUP), que recarga el modelo una sola vez para todos.
+    """
+    if not ADMIN_TOKEN:
+        raise HTTPException(
+            status_code=403,
+            detail={"error": "Recarga deshabilitada", "message": "ADMIN_TOKEN no configurado"}
+        )
+    
+    if x_admin_token is None or not hmac.compare_digest(x_admin_token, ADMIN_TOKEN):
+        raise HTTPException(status_code=401, detail={"error": "Token de administración inválido"})
+    
+    if prefork_master is not None:
+        os.kill(prefork_master, signal.SIGHUP)
+        return {"reload": {"status": "restart_requested", "master_pid": prefork_master}, "model": model_info}
+    
+    status = reload_model(force=force)
+    challenger_status = reload_challenger(force=force)
+    if challenger_status is not None:
+        status = {**status, "challenger": challenger_status}
+    if status["status"] == "error":
+        raise HTTPException(
+            status_code=500,
+            detail={"error": "Error al recargar modelo", "reload": status, "model_info": model_info}
+        )
+    
+    return {"reload": status, "model": model_info}
+
+# Handler para AWS Lambda (Mangum se crea en la primera invocación)
+_mangum_handler = None
+
+def handler(event, context):
+    global _mangum_handler
+    
+    if _mangum_handler is None:
+        from mangum import Mangum
+        _mangum_handler = Mangum(app)
+    
+    return _mangum_handler(event, context)
 
+# Un solo proceso (desarrollo); en producción: python -m src.api.server --workers N
 if __name__ == "__main__":
+    import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,178 @@
+# src/api/batching.py
+"""
+Micro-batching de predicciones individuales.
+
+Las llamadas concurrentes a /predict se encolan y se envían al modelo como
+un único lote cuando se juntan `max_batch_size` pedidos o cuando pasan
+`max_wait_ms` milisegundos desde el primero, lo que ocurra antes. Cada
+llamador recibe su propio resultado.
+
+Cada lote se ejecuta con `run(predict_fn, rows)`; la API pasa una función que
+respeta el límite de inferencias concurrentes, así un lote descartado por
+sobrecarga le devuelve el mismo error (429/503) a todos sus pedidos. La
+cola tiene como máximo `max_queue` pedidos esperando lote: con la cola llena
+el pedido se rechaza de inmediato con 429.
+"""
+
+import asyncio
+import threading
+from collections import Counter
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from src.api.limiter import Overloaded
+
+
+class MicroBatcher:
+    """Agrupa predicciones concurrentes en lotes para una sola llamada al modelo"""
+
+    def __init__(
+        self,
+        predict_fn: Callable[[List[Dict[str, Any]]], List[int]],
+        max_batch_size: int = 32,
+        max_wait_ms: float = 5.0,
+        max_queue: int = 1024,
+        run: Optional[Callable[..., Awaitable[List[int]]]] = None,
+    ):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_queue = max_queue
+        self.run = run or self._run_in_executor
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._pending_get: Optional[asyncio.Future] = None
+
+        # Estadísticas de lotes despachados
+        self._stats_lock = threading.Lock()
+        self.batches_flushed = 0
+        self.rows_flushed = 0
+        self.batch_sizes: Counter = Counter()
+        self.rejected = 0
+
+    @staticmethod
+    async def _run_in_executor(fn, rows):
+        return await asyncio.get_running_loop().run_in_executor(None, fn, rows)
+
+    async def start(self):
+        """Inicia la tarea que despacha los lotes (requiere un event loop activo)"""
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Detiene el despachador; los pedidos pendientes reciben un error"""
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+        if self._pending_get is not None:
+            if self._pending_get.done() and not self._pending_get.cancelled():
+                _, future = self._pending_get.result()
+                if not future.done():
+                    future.set_exception(RuntimeError("Micro-batcher detenido"))
+            self._pending_get.cancel()
+            self._pending_get = None
+
+        while self._queue is not None and not self._queue.empty():
+            _, future = self._queue.get_nowait()
+            if not future.done():
+                future.set_exception(RuntimeError("Micro-batcher detenido"))
+
+    async def submit(self, row: Dict[str, Any]) -> int:
+        """Encola una fila y espera su predicción (Overloaded si la cola está llena)"""
+        if self._worker is None:
+            raise RuntimeError("Micro-batcher no iniciado")
+
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self._queue.put_nowait((row, future))
+        except asyncio.QueueFull:
+            with self._stats_lock:
+                self.rejected += 1
+            raise Overloaded(429, "queue_full", 1)
+        return await future
+
+    async def _next(self, timeout: Optional[float]):
+        """
+        Obtiene el próximo pedido de la cola esperando como máximo `timeout`.
+
+        Si vence el tiempo, la lectura pendiente se conserva para la próxima
+        vuelta en lugar de cancelarse, así no se pierde un pedido que llegue
+        justo en el límite.
+        """
+        if self._pending_get is None:
+            self._pending_get = asyncio.ensure_future(self._queue.get())
+
+        done, _ = await asyncio.wait({self._pending_get}, timeout=timeout)
+        if not done:
+            return None
+
+        item = self._pending_get.result()
+        self._pending_get = None
+        return item
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+
+        batch = []
+        try:
+            while True:
+                batch = [await self._next(None)]
+                deadline = loop.time() + self.max_wait
+
+                while len(batch) < self.max_batch_size:
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    item = await self._next(remaining)
+                    if item is None:
+                        break
+                    batch.append(item)
+
+                await self._flush(batch)
+                batch = []
+        except asyncio.CancelledError:
+            # stop(): el lote que se estaba juntando (o ejecutando) ya salió de la cola
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(RuntimeError("Micro-batcher detenido"))
+            raise
+
+    async def _flush(self, batch):
+        rows = [row for row, _ in batch]
+
+        try:
+            predictions = await self.run(self.predict_fn, rows)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+        else:
+            for (_, future), prediction in zip(batch, predictions):
+                if not future.done():
+                    future.set_result(prediction)
+
+        with self._stats_lock:
+            self.batches_flushed += 1
+            self.rows_flushed += len(batch)
+            self.batch_sizes[len(batch)] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Resumen de lotes despachados"""
+        with self._stats_lock:
+            return {
+                "enabled": True,
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000.0,
+                "max_queue": self.max_queue,
+                "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+                "rejected": self.rejected,
+                "batches_flushed": self.batches_flushed,
+                "rows_flushed": self.rows_flushed,
+                "avg_batch_size": (self.rows_flushed / self.batches_flushed) if self.batches_flushed else 0.0,
+                "batch_sizes": dict(sorted(self.batch_sizes.items())),
+            }
@@ -0,0 +1,128 @@
+# src/api/compiled.py
+"""
+Preprocesamiento compilado y backend ONNX.
+
+`CompiledPreprocessor` codifica clientes a la matriz de features del
+estimador usando solo NumPy: una transformación afín por columna numérica y
+una tabla valor -> contribución por columna categórica. Las tablas se
+generan con src/api/fast_path.py y se pueden serializar a JSON.
+
+`CompiledModel` combina esas tablas con el estimador exportado a ONNX por
+src/promote_best_model.py, de modo que la API puede predecir sin cargar
+PyCaret, sklearn ni pandas (MODEL_BACKEND=onnx).
+"""
+
+import json
+import os
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+# Entrada de las tablas categóricas usada para valores no vistos
+UNKNOWN = "__unknown__"
+
+# Archivos del artefacto `compiled/` de cada run
+PREPROCESSOR_FILE = "preprocessor.json"
+ONNX_FILE = "model.onnx"
+
+
+class CompiledPreprocessor:
+    """Codificación de clientes a features con tablas precalculadas"""
+
+    def __init__(
+        self,
+        base: np.ndarray,
+        numeric_columns: List[str],
+        numeric_reference: np.ndarray,
+        numeric_slopes: np.ndarray,
+        categorical_tables: Dict[str, Dict[Any, np.ndarray]],
+    ):
+        self.base = base
+        self.numeric_columns = numeric_columns
+        self.numeric_reference = numeric_reference
+        self.numeric_slopes = numeric_slopes
+        self.categorical_columns = list(categorical_tables)
+        self.categorical_tables = categorical_tables
+
+    def _contribution(self, column: str, value: Any) -> Optional[np.ndarray]:
+        table = self.categorical_tables[column]
+        delta = table.get(value)
+        if delta is None:
+            delta = table.get(UNKNOWN)
+        return delta
+
+    def encode(self, rows: List[Dict[str, Any]]) -> Optional[np.ndarray]:
+        """Codifica filas directamente a la matriz de features del estimador"""
+        X = np.tile(self.base, (len(rows), 1))
+
+        if self.numeric_columns:
+            values = np.array([[row[c] for c in self.numeric_columns] for row in rows], dtype=np.float64)
+            X += (values - self.numeric_reference) @ self.numeric_slopes
+
+        for i, row in enumerate(rows):
+            for column in self.categorical_columns:
+                delta = self._contribution(column, row[column])
+                if delta is None:
+                    return None
+                X[i] += delta
+
+        return X
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Representación JSON de las tablas (los ceros se omiten)"""
+        return {
+            "base": self.base.tolist(),
+            "numeric_columns": self.numeric_columns,
+            "numeric_reference": self.numeric_reference.tolist(),
+            "numeric_slopes": self.numeric_slopes.tolist(),
+            "categorical_tables": {
+                column: {str(value): delta.tolist() for value, delta in table.items()}
+                for column, table in self.categorical_tables.items()
+            },
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "CompiledPreprocessor":
+        n_features = len(data["base"])
+        return cls(
+            base=np.asarray(data["base"], dtype=np.float64),
+            numeric_columns=data["numeric_columns"],
+            numeric_reference=np.asarray(data["numeric_reference"], dtype=np.float64),
+            numeric_slopes=np.asarray(data["numeric_slopes"], dtype=np.float64).reshape(-1, n_features),
+            categorical_tables={
+                column: {value: np.asarray(delta, dtype=np.float64) for value, delta in table.items()}
+                for column, table in data["categorical_tables"].items()
+            },
+        )
+
+
+class CompiledModel:
+    """Tablas de preprocesamiento + estimador ONNX"""
+
+    def __init__(self, preprocessor: CompiledPreprocessor, onnx_bytes: bytes):
+        import onnxruntime as ort
+
+        self.preprocessor = preprocessor
+        self.session = ort.InferenceSession(onnx_bytes, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+        # skl2onnx/onnxmltools exponen la etiqueta como primera salida
+        self.label_name = self.session.get_outputs()[0].name
+
+    @classmethod
+    def load(cls, path: str) -> "CompiledModel":
+        """Carga el artefacto `compiled/` exportado al promover el modelo"""
+        with open(os.path.join(path, PREPROCESSOR_FILE)) as f:
+            preprocessor = CompiledPreprocessor.from_dict(json.load(f))
+        with open(os.path.join(path, ONNX_FILE), "rb") as f:
+            onnx_bytes = f.read()
+        return cls(preprocessor, onnx_bytes)
+
+    def predict_features(self, X: np.ndarray) -> List[int]:
+        labels = self.session.run([self.label_name], {self.input_name: X.astype(np.float32)})[0]
+        return [int(label) for label in np.ravel(labels)]
+
+    def predict(self, rows: List[Dict[str, Any]]) -> Optional[List[int]]:
+        X = self.preprocessor.encode(rows)
+        if X is None:
+            return None
+        return self.predict_features(X)
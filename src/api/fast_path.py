@@ -0,0 +1,261 @@
+# src/api/fast_path.py
+"""
+Camino rápido de inferencia sin DataFrame.
+
+Al cargar el modelo se "compila" el preprocesamiento ajustado del pipeline
+(PyCaret / sklearn) en tablas y arrays de NumPy:
+
+- cada columna numérica se reduce a una transformación afín (pendiente e
+  intercepto por feature de salida), que cubre escalado e imputación;
+- cada columna categórica se reduce a una tabla valor -> vector de
+  contribución, que cubre one-hot, ordinal o target encoding.
+
+Las tablas se obtienen sondeando el propio pipeline, por lo que no dependen
+de la implementación interna de cada transformador. Los valores categóricos
+nuevos se aprenden la primera vez que aparecen (una sola pasada por el
+pipeline). La compilación se verifica contra el pipeline original y, si no
+coincide, se descarta y la API sigue usando el modelo pyfunc.
+
+Uso para verificar la paridad con el modelo en Production:
+
+    python -m src.api.fast_path --input requests.jsonl
+"""
+
+import argparse
+import copy
+import json
+import logging
+import numbers
+import os
+import warnings
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from src.api.compiled import UNKNOWN, CompiledPreprocessor
+
+logger = logging.getLogger(__name__)
+
+# Aviso de sklearn al predecir con arrays un estimador ajustado con DataFrame
+_FEATURE_NAMES_WARNING = "X does not have valid feature names"
+
+# Valores centinela para detectar columnas categóricas que el pipeline ignora
+_PROBE_VALUES = ("__fast_path_probe_a__", "__fast_path_probe_b__")
+
+
+def unwrap_pipeline(pyfunc_model):
+    """Obtiene el pipeline sklearn subyacente de un modelo pyfunc de MLflow"""
+    impl = getattr(pyfunc_model, "_model_impl", pyfunc_model)
+    pipeline = getattr(impl, "sklearn_model", impl)
+
+    if not hasattr(pipeline, "steps"):
+        raise TypeError(f"El modelo no es un pipeline sklearn: {type(pipeline).__name__}")
+
+    return pipeline
+
+
+def _array_estimator(estimator):
+    """
+    Copia superficial del estimador sin `feature_names_in_`, para predecir
+    con arrays sin el aviso de sklearn en cada llamada (el filtro de avisos
+    es global al proceso). Los parámetros ajustados se comparten.
+    """
+    if "feature_names_in_" not in vars(estimator):
+        return estimator
+    estimator = copy.copy(estimator)
+    del estimator.feature_names_in_
+    return estimator
+
+
+def _to_array(X) -> np.ndarray:
+    if hasattr(X, "toarray"):
+        X = X.toarray()
+    return np.asarray(X, dtype=np.float64)
+
+
+class FastPath(CompiledPreprocessor):
+    """Preprocesamiento compilado + estimador final del pipeline"""
+
+    def __init__(self, pipeline, reference_row: Dict[str, Any], max_categories: int = 256):
+        self.preprocessors = [step for _, step in pipeline.steps[:-1]]
+        self.estimator = _array_estimator(pipeline.steps[-1][1])
+        self.reference_row = dict(reference_row)
+        self.max_categories = max_categories
+
+        base = self.transform([self.reference_row])[0]
+        super().__init__(base, [], np.empty(0), np.empty((0, base.size)), {})
+
+        self._compile()
+
+    def transform(self, rows: List[Dict[str, Any]]) -> np.ndarray:
+        """Aplica el preprocesamiento original del pipeline (camino lento)"""
+        X = pd.DataFrame(rows)
+        for step in self.preprocessors:
+            X = step.transform(X)
+        return _to_array(X)
+
+    def _probe(self, column: str, values: List[Any]) -> np.ndarray:
+        rows = [{**self.reference_row, column: value} for value in values]
+        return self.transform(rows)
+
+    def _compile(self):
+        slopes = []
+        reference = []
+
+        for column, value in self.reference_row.items():
+            if isinstance(value, numbers.Number) and not isinstance(value, bool):
+                probes = [value, value + 1, value + 37]
+                out = self._probe(column, probes)
+                slope = out[1] - out[0]
+                intercept = out[0] - slope * value
+
+                if not np.allclose(out[2], intercept + slope * probes[2], rtol=1e-6, atol=1e-9):
+                    raise ValueError(f"La columna numérica '{column}' no tiene un preprocesamiento afín")
+
+                if np.any(slope != 0):
+                    self.numeric_columns.append(column)
+                    reference.append(value)
+                    slopes.append(slope)
+            else:
+                out = self._probe(column, list(_PROBE_VALUES))
+                if np.allclose(out, self.base, rtol=0, atol=0):
+                    # El pipeline no usa esta columna (ej: customer_id)
+                    continue
+
+                self.categorical_columns.append(column)
+                self.categorical_tables[column] = {value: np.zeros_like(self.base)}
+
+        if slopes:
+            self.numeric_reference = np.asarray(reference, dtype=np.float64)
+            self.numeric_slopes = np.vstack(slopes)
+
+    def _contribution(self, column: str, value: Any) -> Optional[np.ndarray]:
+        table = self.categorical_tables[column]
+        delta = table.get(value)
+
+        if delta is None:
+            if len(table) >= self.max_categories:
+                return None
+            delta = self._probe(column, [value])[0] - self.base
+            table[value] = delta
+
+        return delta
+
+    def add_unknown(self):
+        """Registra la codificación del pipeline para valores no vistos (para exportar las tablas)"""
+        for column in self.categorical_columns:
+            self.categorical_tables[column][UNKNOWN] = self._probe(column, [_PROBE_VALUES[0]])[0] - self.base
+
+    def predict(self, rows: List[Dict[str, Any]]) -> Optional[List[int]]:
+        """Predice sin construir DataFrames; devuelve None si hay que usar el camino lento"""
+        X = self.encode(rows)
+        if X is None:
+            return None
+        return [int(prediction) for prediction in self.estimator.predict(X)]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "n_features": int(self.base.size),
+            "numeric_columns": self.numeric_columns,
+            "categorical_columns": {c: len(t) for c, t in self.categorical_tables.items()},
+        }
+
+
+def _mixed_rows(samples: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Combina columnas de distintas muestras para verificar que las contribuciones son aditivas"""
+    rows = list(samples)
+    columns = list(samples[0])
+
+    for k in range(len(samples)):
+        row = {}
+        for j, column in enumerate(columns):
+            value = samples[(k + j) % len(samples)][column]
+            if isinstance(value, numbers.Number) and not isinstance(value, bool):
+                value = type(value)(value * (1 + 0.5 * j))
+            row[column] = value
+        rows.append(row)
+
+    return rows
+
+
+def check_parity(fast_path: FastPath, pyfunc_model, rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Compara las predicciones del camino rápido contra el modelo pyfunc"""
+    with warnings.catch_warnings():
+        warnings.filterwarnings("ignore", message=_FEATURE_NAMES_WARNING)
+        expected = [int(p) for p in pyfunc_model.predict(pd.DataFrame(rows))]
+        actual = fast_path.predict(rows)
+
+    if actual is None:
+        return {"rows": len(rows), "mismatches": len(rows), "ok": False}
+
+    mismatches = [i for i, (a, b) in enumerate(zip(actual, expected)) if a != b]
+    return {
+        "rows": len(rows),
+        "mismatches": len(mismatches),
+        "mismatch_indices": mismatches[:20],
+        "ok": not mismatches,
+    }
+
+
+def compile_fast_path(pyfunc_model, samples: List[Dict[str, Any]]) -> Optional[FastPath]:
+    """
+    Compila el camino rápido a partir del modelo cargado.
+
+    Devuelve None (y la API sigue usando pyfunc) si el pipeline no se puede
+    compilar o si el resultado no coincide con el pipeline original.
+    """
+    try:
+        # El sondeo pasa arrays por los pasos del pipeline ajustados con DataFrame
+        with warnings.catch_warnings():
+            warnings.filterwarnings("ignore", message=_FEATURE_NAMES_WARNING)
+            fast_path = FastPath(unwrap_pipeline(pyfunc_model), samples[0])
+
+            rows = _mixed_rows(samples)
+            encoded = fast_path.encode(rows)
+            if encoded is None or not np.allclose(encoded, fast_path.transform(rows), rtol=1e-6, atol=1e-9):
+                raise ValueError("Las features compiladas no coinciden con el preprocesamiento del pipeline")
+
+        parity = check_parity(fast_path, pyfunc_model, rows)
+        if not parity["ok"]:
+            raise ValueError(f"Las predicciones compiladas no coinciden con pyfunc: {parity}")
+
+        return fast_path
+
+    except Exception as e:
+        logger.warning(f"Camino rápido deshabilitado, se usará el modelo pyfunc: {e}")
+        return None
+
+
+def main():
+    import mlflow
+    from dotenv import load_dotenv
+
+    parser = argparse.ArgumentParser(description="Verifica la paridad del camino rápido contra el modelo pyfunc")
+    parser.add_argument("--input", required=True, help="Archivo JSONL con un CustomerData por línea")
+    args = parser.parse_args()
+
+    load_dotenv()
+    tracking_uri = os.getenv("MLFLOW_TRACKING_URI")
+    if tracking_uri:
+        mlflow.set_tracking_uri(tracking_uri)
+
+    model_name = os.getenv("MLFLOW_MODEL_NAME", "telco-churn-prediction")
+    model_stage = os.getenv("MLFLOW_MODEL_STAGE", "Production")
+    pyfunc_model = mlflow.pyfunc.load_model(f"models:/{model_name}/{model_stage}")
+
+    with open(args.input) as f:
+        rows = [json.loads(line) for line in f if line.strip()]
+
+    fast_path = compile_fast_path(pyfunc_model, rows[:8])
+    if fast_path is None:
+        print("❌ No se pudo compilar el camino rápido para este modelo")
+        raise SystemExit(1)
+
+    parity = check_parity(fast_path, pyfunc_model, rows)
+    print(json.dumps(parity, indent=2))
+    raise SystemExit(0 if parity["ok"] else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+# src/api/limiter.py
+"""
+Límite de inferencias concurrentes con cola acotada (load shedding).
+
+Como máximo `max_concurrent` pedidos ejecutan el modelo a la vez; el resto
+espera en una cola FIFO de hasta `max_queue` lugares. Si la cola está llena
+el pedido se rechaza de inmediato (429) y si espera más de
+`queue_timeout_ms` se rechaza por timeout (503), en ambos casos con un
+`Retry-After`. Así, ante un pico, los pedidos aceptados mantienen su
+latencia en lugar de competir todos por la CPU.
+
+Todo el estado se modifica desde el event loop, por lo que no usa locks.
+"""
+
+import asyncio
+import math
+from collections import Counter, deque
+from contextlib import asynccontextmanager
+from typing import Any, Deque, Dict
+
+
+class Overloaded(Exception):
+    """El pedido se descartó por exceso de carga"""
+
+    def __init__(self, status_code: int, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.status_code = status_code
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class ConcurrencyLimiter:
+    """Semáforo con cola acotada y timeout de espera"""
+
+    def __init__(self, max_concurrent: int, max_queue: int = 64, queue_timeout_ms: float = 1000.0):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout_ms / 1000.0
+        self.retry_after = max(1, math.ceil(self.queue_timeout))
+
+        self.active = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+        self.admitted = 0
+        self.shed: Counter = Counter()
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self, shed: bool = True):
+        """
+        Espera un lugar para ejecutar el modelo.
+
+        Con `shed=False` (ej: /predict/stream, que ya envió la respuesta) se
+        espera sin límite de cola ni timeout.
+        """
+        if self.active < self.max_concurrent and not self._waiters:
+            self.active += 1
+            self.admitted += 1
+            return
+
+        if shed and len(self._waiters) >= self.max_queue:
+            self.shed["queue_full"] += 1
+            raise Overloaded(429, "queue_full", self.retry_after)
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            if shed:
+                await asyncio.wait_for(waiter, self.queue_timeout)
+            else:
+                await waiter
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done() and not waiter.cancelled():
+                # El lugar se asignó justo al vencer el timeout: devolverlo
+                self.release()
+            else:
+                self._remove(waiter)
+
+            if isinstance(e, asyncio.TimeoutError):
+                self.shed["queue_timeout"] += 1
+                raise Overloaded(503, "queue_timeout", self.retry_after)
+            raise
+
+        self.admitted += 1
+
+    def release(self):
+        """Libera un lugar y lo pasa directamente al primero de la cola"""
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+    def _remove(self, waiter: asyncio.Future):
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            pass
+
+    @asynccontextmanager
+    async def slot(self, shed: bool = True):
+        await self.acquire(shed)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": True,
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "queue_timeout_ms": self.queue_timeout * 1000,
+            "active": self.active,
+            "queue_depth": self.queue_depth,
+            "admitted": self.admitted,
+            "shed": dict(self.shed),
+        }
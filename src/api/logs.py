@@ -0,0 +1,132 @@
+# src/api/logs.py
+"""
+Logging de la API fuera del camino de los pedidos.
+
+- Los handlers del logger raíz se reemplazan por un QueueHandler: el hilo
+  del pedido solo encola el LogRecord y un QueueListener en un hilo de fondo
+  lo formatea y lo escribe. El mensaje se arma (`msg % args`) recién en ese
+  hilo, por eso en el camino caliente se loguea con `%s` y argumentos en
+  lugar de f-strings: si el nivel está deshabilitado no se arma nada, y si
+  está habilitado el costo de formatear no lo paga el pedido.
+- LOG_FORMAT=json escribe un objeto JSON por línea con nivel, logger,
+  mensaje y los campos pasados en `extra` (ej: customer_id, prediction).
+- `sample_success()` decide una vez por pedido si se loguean sus líneas de
+  éxito (LOG_SUCCESS_SAMPLE_RATE); los warnings y errores no pasan por el
+  muestreo y se loguean siempre.
+
+En AWS Lambda (AWS_LAMBDA_FUNCTION_NAME definido) el entorno se congela
+apenas termina la invocación, así que por defecto se escribe de forma
+sincrónica (LOG_ASYNC=false).
+
+Los argumentos de un log encolado no deben modificarse después de la
+llamada (se formatean más tarde en otro hilo).
+"""
+
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import sys
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower()
+LOG_ASYNC = os.getenv("LOG_ASYNC", "false" if os.getenv("AWS_LAMBDA_FUNCTION_NAME") else "true").lower() == "true"
+LOG_SUCCESS_SAMPLE_RATE = float(os.getenv("LOG_SUCCESS_SAMPLE_RATE", "1.0"))
+# Archivo de salida (vacío = stderr)
+LOG_FILE = os.getenv("LOG_FILE", "")
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Atributos propios de LogRecord: el resto son campos de `extra`
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+_handler: Optional["_DeferredQueueHandler"] = None
+_listener: Optional[QueueListener] = None
+
+
+class JsonFormatter(logging.Formatter):
+    """Un objeto JSON por línea con los campos de `extra`"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 6),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class _DeferredQueueHandler(QueueHandler):
+    """
+    QueueHandler que encola el LogRecord sin formatearlo: el listener está
+    en el mismo proceso, no hace falta convertirlo a texto antes de encolar.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def sample_success() -> bool:
+    """True si las líneas de éxito de este pedido se loguean (errores: siempre)"""
+    return LOG_SUCCESS_SAMPLE_RATE >= 1.0 or random.random() < LOG_SUCCESS_SAMPLE_RATE
+
+
+def _output_handler() -> logging.Handler:
+    handler = logging.FileHandler(LOG_FILE) if LOG_FILE else logging.StreamHandler(sys.stderr)
+    handler.setFormatter(JsonFormatter() if LOG_FORMAT == "json" else logging.Formatter(TEXT_FORMAT))
+    return handler
+
+
+def _start_listener():
+    """Cola nueva y su hilo de escritura (también en cada proceso hijo después de un fork)"""
+    global _listener
+
+    log_queue = queue.SimpleQueue()
+    _handler.queue = log_queue
+    _listener = QueueListener(log_queue, _output_handler(), respect_handler_level=True)
+    _listener.start()
+
+
+def setup_logging():
+    """Configura el logger raíz (una sola vez por proceso)"""
+    global _handler
+
+    root = logging.getLogger()
+    if _handler is not None and _handler in root.handlers:
+        return
+
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.setLevel(LOG_LEVEL)
+
+    if not LOG_ASYNC:
+        root.addHandler(_output_handler())
+        return
+
+    _handler = _DeferredQueueHandler(None)
+    _start_listener()
+    root.addHandler(_handler)
+
+    atexit.register(stop_logging)
+    # El hilo del listener no sobrevive al fork (ej: src/api/server.py): el
+    # hijo arranca el suyo con una cola nueva; lo pendiente lo escribe el padre
+    os.register_at_fork(after_in_child=_start_listener)
+
+
+def stop_logging():
+    """Escribe lo pendiente y detiene el hilo de escritura"""
+    global _listener
+
+    if _listener is not None:
+        listener, _listener = _listener, None
+        listener.stop()
@@ -0,0 +1,355 @@
+# src/api/metrics.py
+"""
+Métricas en formato de texto de Prometheus para GET /metrics.
+
+Implementación mínima sin dependencias: contadores, gauges e histogramas con
+labels. Cada serie tiene su propio lock y la sección crítica es una suma, así
+el costo por observación es de unos pocos microsegundos y se puede dejar
+habilitado en producción.
+
+Con el servidor pre-fork (src/api/server.py) cada worker tiene sus propios
+contadores: todas sus series llevan el label `worker` (su pid) y cada worker
+escribe periódicamente su exposición en un directorio compartido, así
+/metrics en cualquier worker devuelve las series de todos (ver
+`write_snapshot`, `read_snapshots` y `merge_expositions`).
+"""
+
+import glob
+import os
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+# Buckets de latencia en segundos (de 100 µs a 10 s)
+LATENCY_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+    0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _add_labels(line: str, labels: str) -> str:
+    """Agrega labels ya formateados a una línea de muestra (los comentarios no cambian)"""
+    if not labels or line.startswith("#"):
+        return line
+    brace = line.find("{")
+    space = line.find(" ")
+    if brace != -1 and brace < space:
+        return f"{line[:brace + 1]}{labels},{line[brace + 1:]}"
+    return f"{line[:space]}{{{labels}}}{line[space:]}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values):
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        for key, child in sorted(self._children.items()):
+            lines.extend(self._render_child(key, child))
+        return lines
+
+
+class _Value:
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1.0):
+        with self._lock:
+            self.value -= amount
+
+    def set(self, value: float):
+        self.value = value
+
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount: float = 1.0):
+        self.labels().inc(amount)
+
+    def _render_child(self, key, child):
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(child.value)}"]
+
+
+class Gauge(Counter):
+    type_name = "gauge"
+
+    def dec(self, amount: float = 1.0):
+        self.labels().dec(amount)
+
+    def set(self, value: float):
+        self.labels().set(value)
+
+
+class _HistogramValue:
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value: float):
+        self.labels().observe(value)
+
+    def _render_child(self, key, child):
+        with child._lock:
+            counts = list(child.counts)
+            total_sum = child.sum
+
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += count
+            le = 'le="' + _format_value(bound) + '"'
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+        lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total_sum)}")
+        lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+class Registry:
+    """Conjunto de métricas y funciones que generan métricas al momento de exportar"""
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        self._collectors: List[Callable[[], List[str]]] = []
+        self._const_labels = ""
+
+    def set_const_labels(self, **labels: str):
+        """Labels que se agregan a todas las series (ej: worker=<pid> en el servidor pre-fork)"""
+        self._const_labels = ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items())
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, collector: Callable[[], List[str]]):
+        """`collector` devuelve líneas de texto ya formateadas (se evalúa en cada /metrics)"""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collector in self._collectors:
+            lines.extend(collector())
+        if self._const_labels:
+            lines = [_add_labels(line, self._const_labels) for line in lines]
+        return "\n".join(lines) + "\n"
+
+
+def snapshot_path(directory: str, pid: int) -> str:
+    return os.path.join(directory, f"worker-{pid}.prom")
+
+
+def write_snapshot(registry: Registry, directory: str):
+    """Escribe la exposición del proceso en `directory` (reemplazo atómico)"""
+    path = snapshot_path(directory, os.getpid())
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(registry.render())
+    os.replace(tmp_path, path)
+
+
+def read_snapshots(directory: str, exclude_pid: int) -> List[str]:
+    """Exposiciones escritas por los demás workers (un worker que salió puede faltar)"""
+    texts = []
+    for path in sorted(glob.glob(os.path.join(directory, "worker-*.prom"))):
+        if path == snapshot_path(directory, exclude_pid):
+            continue
+        try:
+            with open(path) as f:
+                texts.append(f.read())
+        except FileNotFoundError:
+            continue
+    return texts
+
+
+def merge_expositions(texts: Iterable[str]) -> str:
+    """
+    Une varias exposiciones (ej: una por worker) en una sola: las series de
+    cada métrica quedan juntas, bajo un único # HELP / # TYPE.
+    """
+    families: Dict[str, Tuple[List[str], List[str]]] = {}
+    for text in texts:
+        family = None
+        for line in text.splitlines():
+            if not line:
+                continue
+            if line.startswith("#"):
+                parts = line.split(" ", 3)
+                if len(parts) < 3:
+                    continue
+                family = families.setdefault(parts[2], ([], []))
+                if parts[1] not in (h.split(" ", 2)[1] for h in family[0]):
+                    family[0].append(line)
+            elif family is not None:
+                family[1].append(line)
+
+    lines = []
+    for header, samples in families.values():
+        lines.extend(header)
+        lines.extend(samples)
+    return "\n".join(lines) + "\n"
+
+
+def sample_lines(
+    name: str,
+    documentation: str,
+    samples: List[Tuple[Dict[str, str], float]],
+    metric_type: str = "gauge",
+) -> List[str]:
+    """Formatea una métrica calculada al momento de exportar"""
+    lines = [f"# HELP {name} {documentation}", f"# TYPE {name} {metric_type}"]
+    for labels, value in samples:
+        lines.append(f"{name}{_format_labels(list(labels), list(labels.values()))} {_format_value(value)}")
+    return lines
+
+
+REGISTRY = Registry()
+
+REQUESTS = REGISTRY.register(Counter(
+    "telco_api_requests_total", "Requests HTTP atendidos", ["handler", "method", "status"]
+))
+REQUEST_ERRORS = REGISTRY.register(Counter(
+    "telco_api_request_errors_total", "Requests HTTP con status >= 400", ["handler", "status"]
+))
+IN_FLIGHT = REGISTRY.register(Gauge(
+    "telco_api_requests_in_flight", "Requests HTTP en curso"
+))
+REQUEST_DURATION = REGISTRY.register(Histogram(
+    "telco_api_request_duration_seconds", "Latencia total de cada request", ["handler"]
+))
+STAGE_DURATION = REGISTRY.register(Histogram(
+    "telco_api_stage_duration_seconds",
+    "Latencia por etapa: validation, dataframe_build, model_predict, serialization",
+    ["stage"]
+))
+
+
+# Hilos cuyas etapas no se registran (ej: el modelo challenger en sombra,
+# para no mezclar su latencia con la del modelo que responde)
+_untimed = threading.local()
+
+
+def disable_stage_timing():
+    """Deshabilita StageTimer en el hilo actual"""
+    _untimed.active = True
+
+
+class StageTimer:
+    """Mide una etapa y la registra en STAGE_DURATION"""
+
+    __slots__ = ("stage", "started")
+
+    def __init__(self, stage: str):
+        self.stage = stage
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        if not getattr(_untimed, "active", False):
+            STAGE_DURATION.labels(self.stage).observe(time.perf_counter() - self.started)
+        return False
+
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI que cuenta requests, errores y latencia por handler.
+
+    Guarda en `scope["state"]["received_at"]` el instante de llegada, que los
+    handlers usan para medir la etapa de lectura y validación del body.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        scope.setdefault("state", {})["received_at"] = started
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            IN_FLIGHT.dec()
+            endpoint = scope.get("endpoint")
+            handler = getattr(endpoint, "__name__", "unmatched")
+            code = status["code"]
+
+            REQUESTS.labels(handler, scope["method"], code).inc()
+            if code >= 400:
+                REQUEST_ERRORS.labels(handler, code).inc()
+            REQUEST_DURATION.labels(handler).observe(time.perf_counter() - started)
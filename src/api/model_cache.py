@@ -0,0 +1,259 @@
+# src/api/model_cache.py
+"""
+Caché local de artefactos del Model Registry.
+
+Al iniciar, el stage (ej: Production) se resuelve a una versión concreta con
+un timeout corto. Si esa versión ya está en el caché local y su checksum
+coincide, se reutiliza sin descargar nada. Si el registry no responde, se usa
+la última versión cacheada para ese stage.
+
+Estructura del caché:
+
+    <MODEL_CACHE_DIR>/<modelo>/v<versión>/manifest.json
+    <MODEL_CACHE_DIR>/<modelo>/v<versión>/model/<artefactos del modelo>
+    <MODEL_CACHE_DIR>/<modelo>/v<versión>-<artefacto>/...  -> otros artefactos del run (ej: compiled)
+    <MODEL_CACHE_DIR>/<modelo>/<stage>.json   -> última versión usada
+
+Para precargar el caché (ej: al construir una imagen):
+
+    python -m src.api.model_cache
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+MODEL_CACHE_DIR = os.getenv("MODEL_CACHE_DIR", "/tmp/model_cache")
+REGISTRY_TIMEOUT = int(os.getenv("MODEL_REGISTRY_TIMEOUT", "5"))
+
+
+def _checksum(path: str) -> str:
+    """SHA-256 sobre todos los archivos del directorio (rutas relativas + contenido)"""
+    digest = hashlib.sha256()
+    for root, dirs, files in os.walk(path):
+        dirs.sort()
+        for name in sorted(files):
+            file_path = os.path.join(root, name)
+            digest.update(os.path.relpath(file_path, path).encode())
+            with open(file_path, "rb") as f:
+                for block in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(block)
+    return digest.hexdigest()
+
+
+def _read_json(path: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_json(path: str, data: Dict[str, Any]):
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+# Las variables de MLflow son del proceso: una sola resolución a la vez las modifica
+_registry_settings_lock = threading.Lock()
+
+
+@contextmanager
+def _registry_request_settings(timeout: int):
+    """
+    Timeout corto y sin reintentos para los pedidos HTTP de MLflow del bloque.
+
+    MlflowClient lee MLFLOW_HTTP_REQUEST_TIMEOUT y
+    MLFLOW_HTTP_REQUEST_MAX_RETRIES en cada pedido: se definen solo durante
+    la llamada y después se restauran los valores anteriores. Otra llamada a
+    MLflow desde otro hilo en ese lapso también los vería; la API resuelve
+    el stage solo al cargar o recargar el modelo.
+    """
+    overrides = {"MLFLOW_HTTP_REQUEST_TIMEOUT": str(timeout), "MLFLOW_HTTP_REQUEST_MAX_RETRIES": "0"}
+    with _registry_settings_lock:
+        previous = {name: os.environ.get(name) for name in overrides}
+        os.environ.update(overrides)
+        try:
+            yield
+        finally:
+            for name, value in previous.items():
+                if value is None:
+                    os.environ.pop(name, None)
+                else:
+                    os.environ[name] = value
+
+
+def resolve_version(model_name: str, stage: str, timeout: int = REGISTRY_TIMEOUT, registry_uri: Optional[str] = None):
+    """
+    Resuelve stage -> versión registrada (timeout corto, sin reintentos).
+
+    `registry_uri` None usa el registry configurado en MLflow
+    (MLFLOW_REGISTRY_URI o el de tracking).
+    """
+    from mlflow.tracking import MlflowClient
+
+    client = MlflowClient(registry_uri=registry_uri)
+    with _registry_request_settings(timeout):
+        versions = client.get_latest_versions(model_name, stages=[stage])
+
+    if not versions:
+        raise LookupError(f"No hay versiones del modelo '{model_name}' en stage '{stage}'")
+    return versions[0]
+
+
+def _version_dir(cache_dir: str, model_name: str, version: str, artifact: str) -> str:
+    suffix = "" if artifact == "model" else f"-{artifact}"
+    return os.path.join(cache_dir, model_name, f"v{version}{suffix}")
+
+
+def cached_model(
+    model_name: str,
+    version: str,
+    cache_dir: str = MODEL_CACHE_DIR,
+    artifact: str = "model",
+) -> Optional[Dict[str, Any]]:
+    """Devuelve el manifest de una versión cacheada si existe y su checksum es válido"""
+    version_dir = _version_dir(cache_dir, model_name, version, artifact)
+    manifest = _read_json(os.path.join(version_dir, "manifest.json"))
+    if manifest is None:
+        return None
+
+    model_path = os.path.join(version_dir, manifest["model_path"])
+    if not os.path.isdir(model_path) or _checksum(model_path) != manifest["checksum"]:
+        logger.warning(f"Caché inválido para {model_name} v{version}, se descartará")
+        return None
+
+    return {**manifest, "local_path": model_path}
+
+
+def download_model(
+    model_name: str,
+    model_version,
+    cache_dir: str = MODEL_CACHE_DIR,
+    artifact: str = "model",
+) -> Dict[str, Any]:
+    """
+    Descarga una versión del registry al caché de forma atómica.
+
+    Con `artifact` distinto de "model" se descarga ese directorio de
+    artefactos del run de la versión (ej: "compiled").
+    """
+    import mlflow
+
+    model_dir = os.path.join(cache_dir, model_name)
+    version_dir = _version_dir(cache_dir, model_name, model_version.version, artifact)
+    tmp_dir = f"{version_dir}.tmp-{os.getpid()}"
+    os.makedirs(model_dir, exist_ok=True)
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(os.path.join(tmp_dir, "model"))
+
+    try:
+        if artifact == "model":
+            artifact_uri = f"models:/{model_name}/{model_version.version}"
+        else:
+            artifact_uri = f"runs:/{model_version.run_id}/{artifact}"
+
+        local_path = mlflow.artifacts.download_artifacts(
+            artifact_uri=artifact_uri,
+            dst_path=os.path.join(tmp_dir, "model")
+        )
+        model_path = os.path.relpath(local_path, tmp_dir)
+
+        manifest = {
+            "name": model_name,
+            "version": str(model_version.version),
+            "run_id": model_version.run_id,
+            "model_path": model_path,
+            "checksum": _checksum(local_path),
+            "cached_at": time.time(),
+        }
+        _write_json(os.path.join(tmp_dir, "manifest.json"), manifest)
+
+        shutil.rmtree(version_dir, ignore_errors=True)
+        os.replace(tmp_dir, version_dir)
+    except Exception:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+    return {**manifest, "local_path": os.path.join(version_dir, model_path)}
+
+
+def fetch_model(
+    model_name: str,
+    stage: str,
+    cache_dir: str = MODEL_CACHE_DIR,
+    timeout: int = REGISTRY_TIMEOUT,
+    artifact: str = "model",
+) -> Tuple[str, Dict[str, Any]]:
+    """
+    Obtiene la ruta local del modelo en `stage`, usando el caché cuando es posible.
+
+    `artifact` permite obtener otro directorio de artefactos del run de la
+    versión en lugar del modelo registrado (ej: "compiled").
+
+    Returns:
+        - ruta local del modelo (para mlflow.pyfunc.load_model)
+        - info: versión, run_id, checksum, `source` ("cache" o "network") y
+          `phases` (segundos de resolución en el registry y de descarga)
+    """
+    pointer_path = os.path.join(cache_dir, model_name, f"{stage}.json")
+    started = time.perf_counter()
+
+    try:
+        model_version = resolve_version(model_name, stage, timeout)
+    except Exception as e:
+        # Registry inaccesible: usar la última versión cacheada para el stage
+        registry_seconds = time.perf_counter() - started
+        pointer = _read_json(pointer_path)
+        entry = cached_model(model_name, pointer["version"], cache_dir, artifact) if pointer else None
+        if entry is None:
+            raise
+
+        logger.warning(f"Registry inaccesible ({e}), usando versión cacheada v{entry['version']}")
+        phases = {"registry": registry_seconds, "download": time.perf_counter() - started - registry_seconds}
+        return entry.pop("local_path"), {**entry, "source": "cache", "registry_error": str(e), "phases": phases}
+
+    registry_seconds = time.perf_counter() - started
+    entry = cached_model(model_name, model_version.version, cache_dir, artifact)
+    source = "cache"
+    if entry is None:
+        logger.info(f"Descargando {model_name} v{model_version.version} ({artifact}) al caché {cache_dir}")
+        entry = download_model(model_name, model_version, cache_dir, artifact)
+        source = "network"
+
+    try:
+        _write_json(pointer_path, {"version": str(model_version.version)})
+    except OSError as e:
+        # Caché de solo lectura (ej: precargado en la imagen)
+        logger.warning(f"No se pudo actualizar el puntero del caché: {e}")
+
+    # "download" incluye la verificación del checksum cuando se usa el caché
+    phases = {"registry": registry_seconds, "download": time.perf_counter() - started - registry_seconds}
+    return entry.pop("local_path"), {**entry, "source": source, "phases": phases}
+
+
+if __name__ == "__main__":
+    import mlflow
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    tracking_uri = os.getenv("MLFLOW_TRACKING_URI")
+    if tracking_uri:
+        mlflow.set_tracking_uri(tracking_uri)
+
+    path, info = fetch_model(
+        os.getenv("MLFLOW_MODEL_NAME", "telco-churn-prediction"),
+        os.getenv("MLFLOW_MODEL_STAGE", "Production"),
+        timeout=60
+    )
+    print(f"✅ Modelo v{info['version']} disponible en {path} ({info['source']})")
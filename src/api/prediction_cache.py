@@ -0,0 +1,85 @@
+# src/api/prediction_cache.py
+"""
+Caché en memoria de predicciones (LRU + TTL).
+
+La clave es un hash estable de las features del cliente (sin customer_id)
+más la versión del modelo, así el mismo cliente con los mismos atributos no
+vuelve a pasar por el modelo mientras la entrada no expire. Las entradas
+de otra versión del modelo nunca coinciden y el caché se vacía al recargar.
+"""
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+# Campos que no afectan la predicción y no forman parte de la clave
+EXCLUDED_FIELDS = ("customer_id",)
+
+
+class PredictionCache:
+    """LRU acotado con expiración por entrada"""
+
+    def __init__(self, max_entries: int = 10000, ttl_seconds: float = 300.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key(record: Dict[str, Any], model_version: Optional[str]) -> str:
+        """Hash estable de las features del cliente y la versión del modelo"""
+        features = {k: v for k, v in record.items() if k not in EXCLUDED_FIELDS}
+        payload = json.dumps([model_version, features], sort_keys=True, separators=(",", ":"), default=str)
+        return hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()
+
+    def get(self, key: str) -> Optional[Any]:
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] < now:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: str, value: Any):
+        expires_at = time.monotonic() + self.ttl_seconds
+
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": True,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+            }
@@ -0,0 +1,174 @@
+# src/api/score_store.py
+"""
+Score store: predicciones precalculadas por customer_id en SQLite.
+
+La tabla de clientes se puntúa con el modelo en Production mediante
+src/build_score_store.py y cada fila guarda la predicción, la versión del
+modelo y un fingerprint de las features del cliente. La API responde
+/score/{customer_id} con una búsqueda por clave primaria; si el cliente no
+está, su score es de otra versión del modelo, está vencido o sus features
+cambiaron, se usa la inferencia en línea.
+
+Esquema:
+
+    scores(customer_id PK, fingerprint, prediction, model_version, scored_at, seen_at)
+    meta(key PK, value)  -> model_name, model_version, built_at, rows, rescored
+"""
+
+import hashlib
+import json
+import numbers
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from src.api.prediction_cache import EXCLUDED_FIELDS
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scores (
+    customer_id TEXT PRIMARY KEY,
+    fingerprint TEXT NOT NULL,
+    prediction INTEGER NOT NULL,
+    model_version TEXT NOT NULL,
+    scored_at REAL NOT NULL,
+    seen_at REAL NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+) WITHOUT ROWID;
+"""
+
+# Límite de parámetros por consulta en versiones viejas de SQLite
+_MAX_PARAMS = 900
+
+
+def fingerprint(record: Dict[str, Any]) -> str:
+    """
+    Hash estable de las features del cliente (sin customer_id).
+
+    Los números se normalizan a float redondeado a 6 decimales para que 6 y
+    6.0, o el mismo valor leído de un CSV y de un JSON, den el mismo
+    fingerprint.
+    """
+    features = {}
+    for key, value in record.items():
+        if key in EXCLUDED_FIELDS:
+            continue
+        if isinstance(value, numbers.Number) and not isinstance(value, bool):
+            value = round(float(value), 6)
+        features[key] = value
+
+    payload = json.dumps(features, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()
+
+
+class ScoreStore:
+    """Acceso al score store (lectura desde la API, escritura desde el pipeline)"""
+
+    def __init__(self, path: str, readonly: bool = True):
+        self.path = path
+        self.readonly = readonly
+
+        if readonly:
+            self._conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+        else:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            # WAL: la API puede seguir leyendo mientras se reconstruye
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(SCHEMA)
+
+        self._lock = threading.Lock()
+        self.lookups: Counter = Counter()
+
+    def close(self):
+        self._conn.close()
+
+    def get(self, customer_id: str) -> Optional[Dict[str, Any]]:
+        """Busca el score de un cliente por clave primaria"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT fingerprint, prediction, model_version, scored_at, seen_at FROM scores WHERE customer_id = ?",
+                (customer_id,)
+            ).fetchone()
+
+        if row is None:
+            return None
+        return {
+            "customer_id": customer_id,
+            "fingerprint": row[0],
+            "prediction": row[1],
+            "model_version": row[2],
+            "scored_at": row[3],
+            "seen_at": row[4],
+        }
+
+    def meta(self) -> Dict[str, str]:
+        with self._lock:
+            return dict(self._conn.execute("SELECT key, value FROM meta").fetchall())
+
+    def stats(self) -> Dict[str, Any]:
+        meta = self.meta()
+        return {
+            "enabled": True,
+            "path": self.path,
+            "model_version": meta.get("model_version"),
+            "built_at": float(meta["built_at"]) if "built_at" in meta else None,
+            "rows": int(meta["rows"]) if "rows" in meta else None,
+            "lookups": dict(self.lookups),
+        }
+
+    # --- Escritura (src/build_score_store.py) ---
+
+    def fingerprints(self, customer_ids: List[str]) -> Dict[str, Tuple[str, str]]:
+        """customer_id -> (fingerprint, model_version) de los clientes que ya están en el store"""
+        found = {}
+        for start in range(0, len(customer_ids), _MAX_PARAMS):
+            batch = customer_ids[start:start + _MAX_PARAMS]
+            placeholders = ",".join("?" * len(batch))
+            rows = self._conn.execute(
+                f"SELECT customer_id, fingerprint, model_version FROM scores WHERE customer_id IN ({placeholders})",
+                batch
+            )
+            found.update((customer_id, (fp, version)) for customer_id, fp, version in rows)
+        return found
+
+    def upsert(self, rows: Iterable[Tuple[str, str, int, str, float, float]]):
+        """Inserta o reemplaza (customer_id, fingerprint, prediction, model_version, scored_at, seen_at)"""
+        self._conn.executemany("INSERT OR REPLACE INTO scores VALUES (?, ?, ?, ?, ?, ?)", rows)
+
+    def touch(self, customer_ids: Iterable[str], seen_at: float):
+        """Marca clientes sin cambios como vistos en esta reconstrucción"""
+        self._conn.executemany("UPDATE scores SET seen_at = ? WHERE customer_id = ?", ((seen_at, c) for c in customer_ids))
+
+    def delete_unseen(self, seen_before: float) -> int:
+        """Elimina los clientes que ya no están en la tabla de entrada"""
+        return self._conn.execute("DELETE FROM scores WHERE seen_at < ?", (seen_before,)).rowcount
+
+    def set_meta(self, values: Dict[str, Any]):
+        self._conn.executemany("INSERT OR REPLACE INTO meta VALUES (?, ?)", ((k, str(v)) for k, v in values.items()))
+
+    def commit(self):
+        self._conn.commit()
+
+
+def open_store(path: Optional[str]) -> Optional[ScoreStore]:
+    """Abre el store en modo lectura; None si no está configurado o no existe"""
+    if not path or not os.path.exists(path):
+        return None
+    return ScoreStore(path, readonly=True)
+
+
+def stale_reason(entry: Dict[str, Any], model_version: Optional[str], max_age_seconds: float) -> Optional[str]:
+    """Devuelve None si el score sirve, o el motivo por el que está vencido"""
+    if entry["model_version"] != model_version:
+        return "model_version"
+    if max_age_seconds > 0 and time.time() - entry["seen_at"] > max_age_seconds:
+        return "expired"
+    return None
@@ -0,0 +1,333 @@
+# src/api/server.py
+"""
+Servidor pre-fork para producción: N procesos uvicorn que comparten el modelo.
+
+Con un solo proceso uvicorn todo `model.predict` corre bajo el mismo GIL.
+Este servidor carga el modelo (y el challenger de sombra, si hay) una sola
+vez en el proceso master, mueve todos los objetos existentes a la generación
+permanente del GC (`gc.freeze`) y recién entonces hace fork de los workers.
+Así las páginas del modelo se comparten copy-on-write: el recolector de
+los workers no recorre esos objetos, y sus escrituras de conteo de
+referencias y de cabeceras del GC no las duplican. El throughput escala con
+los cores sin multiplicar la memoria del modelo por N.
+
+Todos los workers aceptan conexiones del mismo socket, abierto por el master.
+
+Señales del master:
+
+- SIGTERM / SIGINT: apagado gradual. Los workers dejan de aceptar
+  conexiones, terminan los pedidos en curso (hasta `--graceful-timeout`
+  segundos) y salen.
+- SIGHUP: reinicio gradual. El master recarga el modelo del stage, arranca
+  workers nuevos con esa versión y recién después apaga gradualmente los
+  anteriores, sin cortar pedidos. `POST /admin/reload` en un worker envía
+  esta señal al master.
+
+Si un worker muere se reemplaza. Con MODEL_RELOAD_INTERVAL > 0 el master
+revisa la versión del stage y reinicia los workers cuando cambia (los
+workers no recargan por su cuenta: cada uno tendría su propia copia).
+
+Uso:
+    python -m src.api.server --workers 4 --port 8000
+"""
+
+import argparse
+import gc
+import logging
+import os
+import random
+import shutil
+import signal
+import socket
+import tempfile
+import threading
+import time
+from typing import Dict
+
+logger = logging.getLogger(__name__)
+
+# Un worker que muere antes de esto se reemplaza recién después de la misma
+# espera, para no entrar en un ciclo de forks si falla al arrancar
+MIN_WORKER_UPTIME = 1.0
+
+
+def _freeze():
+    """Deja los objetos cargados fuera del GC para que los workers compartan sus páginas"""
+    gc.collect()
+    gc.freeze()
+    logger.info(f"🧊 {gc.get_freeze_count()} objetos congelados antes del fork")
+
+
+def _export_worker_defaults(workers: int):
+    """
+    Defaults por worker que dependen de la cantidad de workers. Se exportan
+    al entorno antes de importar la app en el master, así los workers los
+    heredan con el fork: el límite de inferencias por defecto reparte los
+    cores entre los N procesos (si no, cada worker tomaría todos los cores
+    y podrían correr hasta N x cores inferencias a la vez).
+    """
+    if "INFERENCE_CONCURRENCY" not in os.environ:
+        concurrency = max(1, (os.cpu_count() or 1) // workers)
+        os.environ["INFERENCE_CONCURRENCY"] = str(concurrency)
+        logger.info(f"INFERENCE_CONCURRENCY={concurrency} por worker ({workers} workers)")
+
+
+def _watch_metrics(directory: str, interval: float):
+    """Escribe periódicamente las métricas del worker para que /metrics en los demás las incluya"""
+    from src.api.metrics import REGISTRY, write_snapshot
+
+    while True:
+        try:
+            write_snapshot(REGISTRY, directory)
+        except OSError as e:
+            logger.warning(f"No se pudieron escribir las métricas del worker {os.getpid()}: {e}")
+        time.sleep(interval)
+
+
+def _watch_master(master_pid: int):
+    """Apaga el worker si el master murió (el worker queda huérfano)"""
+    while True:
+        time.sleep(1.0)
+        if os.getppid() != master_pid:
+            os.kill(os.getpid(), signal.SIGTERM)
+            return
+
+
+def _run_worker(sock: socket.socket, graceful_timeout: float, master_pid: int):
+    """Cuerpo de un worker después del fork (no vuelve)"""
+    import uvicorn
+
+    from src.api import app as api
+    from src.api.metrics import REGISTRY
+
+    exit_code = 0
+    try:
+        for signum in (signal.SIGHUP, signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, signal.SIG_DFL)
+        # Cada worker con su propia secuencia (ej: la muestra del scoring en sombra)
+        random.seed()
+        api.prefork_master = master_pid
+        threading.Thread(target=_watch_master, args=(master_pid,), name="master-watcher", daemon=True).start()
+        # Las series de cada worker se distinguen por su pid
+        REGISTRY.set_const_labels(worker=str(os.getpid()))
+        if api.METRICS_DIR:
+            threading.Thread(
+                target=_watch_metrics,
+                args=(api.METRICS_DIR, api.METRICS_SNAPSHOT_INTERVAL),
+                name="metrics-writer",
+                daemon=True
+            ).start()
+
+        config = uvicorn.Config(api.app, timeout_graceful_shutdown=graceful_timeout, access_log=False)
+        uvicorn.Server(config).run(sockets=[sock])
+    except BaseException as e:
+        logger.error(f"❌ Worker {os.getpid()} terminó con error: {e}")
+        exit_code = 1
+    finally:
+        # os._exit no corre atexit: escribir los logs encolados antes de salir
+        from src.api.logs import stop_logging
+        stop_logging()
+        os._exit(exit_code)
+
+
+class PreforkServer:
+    """Proceso master: carga el modelo, abre el socket y supervisa los workers"""
+
+    def __init__(self, host: str, port: int, workers: int, graceful_timeout: float = 30.0):
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.graceful_timeout = graceful_timeout
+
+        self.sock = None
+        # Workers activos (pid -> instante de arranque) y los que se están apagando (pid -> límite)
+        self._active: Dict[int, float] = {}
+        self._retiring: Dict[int, float] = {}
+        self._respawn_at = 0.0
+        self._stopping = False
+        self._restart_requested = False
+        # Directorio de métricas de los workers, si lo creó el master (se borra al apagar)
+        self._own_metrics_dir = None
+
+    # --- Modelo ---
+
+    def _load(self):
+        from src.api import app as api
+
+        api.load_model()
+        api.load_challenger()
+        if api.shadow is not None and not api.SHADOW_LOG_PATH:
+            logger.warning("Scoring en sombra sin SHADOW_LOG_PATH: GET /shadow informará solo los contadores de un worker")
+        if api.model is None:
+            logger.warning("El master no pudo cargar el modelo: cada worker lo intentará al arrancar (sin memoria compartida)")
+        _freeze()
+
+    def _reload(self, force: bool) -> bool:
+        """Recarga el modelo en el master; True si hay que reiniciar los workers"""
+        from src.api import app as api
+
+        # Lo cargado antes vuelve al GC para que la versión anterior se pueda liberar
+        gc.unfreeze()
+        status = api.reload_model(force=force)
+        challenger = api.reload_challenger(force=force)
+        _freeze()
+
+        changed = status["status"] == "reloaded" or (challenger or {}).get("status") == "reloaded"
+        if status["status"] == "error":
+            logger.error(f"❌ No se pudo recargar el modelo en el master: {status['error']}")
+        return changed
+
+    # --- Workers ---
+
+    def _spawn(self):
+        master_pid = os.getpid()
+        pid = os.fork()
+        if pid == 0:
+            _run_worker(self.sock, self.graceful_timeout, master_pid)
+        self._active[pid] = time.monotonic()
+        logger.info(f"👷 Worker {pid} iniciado")
+
+    def _retire(self, pids):
+        """Apagado gradual: el worker termina sus pedidos en curso y sale"""
+        deadline = time.monotonic() + self.graceful_timeout + 5
+        for pid in pids:
+            self._active.pop(pid, None)
+            self._retiring[pid] = deadline
+            self._signal(pid, signal.SIGTERM)
+
+    @staticmethod
+    def _signal(pid: int, signum: int):
+        try:
+            os.kill(pid, signum)
+        except ProcessLookupError:
+            pass
+
+    def _reap(self):
+        """Recoge los workers que terminaron y mata los que no terminaron a tiempo"""
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid == 0:
+                break
+
+            self._drop_metrics(pid)
+            if pid in self._retiring:
+                del self._retiring[pid]
+                logger.info(f"Worker {pid} apagado")
+            elif pid in self._active:
+                uptime = time.monotonic() - self._active.pop(pid)
+                logger.error(f"❌ Worker {pid} terminó inesperadamente (estado {status}, {uptime:.1f} s activo), se reemplaza")
+                if uptime < MIN_WORKER_UPTIME:
+                    self._respawn_at = time.monotonic() + MIN_WORKER_UPTIME
+
+        now = time.monotonic()
+        for pid, deadline in list(self._retiring.items()):
+            if now > deadline:
+                logger.warning(f"Worker {pid} no terminó en {self.graceful_timeout} s, se fuerza la salida")
+                self._signal(pid, signal.SIGKILL)
+                self._retiring[pid] = float("inf")
+
+    def _drop_metrics(self, pid: int):
+        """Las métricas de un worker que terminó dejan de exponerse"""
+        from src.api import app as api
+        from src.api.metrics import snapshot_path
+
+        if api.METRICS_DIR:
+            try:
+                os.remove(snapshot_path(api.METRICS_DIR, pid))
+            except FileNotFoundError:
+                pass
+
+    def _replace_workers(self):
+        """Reinicio gradual: primero arrancan los workers nuevos, después se apagan los anteriores"""
+        previous = list(self._active)
+        for _ in range(self.workers):
+            self._spawn()
+        self._retire(previous)
+        logger.info(f"🔄 Reinicio gradual: {len(previous)} workers reemplazados")
+
+    # --- Bucle principal ---
+
+    def _on_stop(self, signum, frame):
+        self._stopping = True
+
+    def _on_hup(self, signum, frame):
+        self._restart_requested = True
+
+    def run(self):
+        _export_worker_defaults(self.workers)
+        if "METRICS_DIR" not in os.environ:
+            self._own_metrics_dir = tempfile.mkdtemp(prefix="telco-metrics-")
+            os.environ["METRICS_DIR"] = self._own_metrics_dir
+        from src.api import app as api
+
+        self._load()
+
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.bind((self.host, self.port))
+        self.sock.listen(2048)
+        self.sock.set_inheritable(True)
+
+        signal.signal(signal.SIGTERM, self._on_stop)
+        signal.signal(signal.SIGINT, self._on_stop)
+        signal.signal(signal.SIGHUP, self._on_hup)
+
+        for _ in range(self.workers):
+            self._spawn()
+        logger.info(f"🚀 Servidor pre-fork en http://{self.host}:{self.port} con {self.workers} workers (master {os.getpid()})")
+
+        reload_interval = api.MODEL_RELOAD_INTERVAL
+        next_check = time.monotonic() + reload_interval
+        while not self._stopping:
+            time.sleep(0.2)
+            self._reap()
+
+            if self._restart_requested:
+                self._restart_requested = False
+                self._reload(force=True)
+                self._replace_workers()
+            elif reload_interval > 0 and time.monotonic() >= next_check:
+                next_check = time.monotonic() + reload_interval
+                if self._reload(force=False):
+                    self._replace_workers()
+
+            if not self._stopping and time.monotonic() >= self._respawn_at:
+                for _ in range(self.workers - len(self._active)):
+                    self._spawn()
+
+        self.shutdown()
+
+    def shutdown(self):
+        """Apagado gradual de todos los workers"""
+        logger.info(f"Apagando {len(self._active)} workers...")
+        self._retire(list(self._active))
+        while self._retiring:
+            time.sleep(0.1)
+            self._reap()
+        self.sock.close()
+        if self._own_metrics_dir is not None:
+            shutil.rmtree(self._own_metrics_dir, ignore_errors=True)
+        logger.info("Servidor detenido")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor pre-fork de la API (modelo compartido entre workers)")
+    parser.add_argument("--host", default=os.getenv("API_HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("API_PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("API_WORKERS", str(os.cpu_count() or 1))), help="Procesos worker")
+    parser.add_argument(
+        "--graceful-timeout",
+        type=float,
+        default=float(os.getenv("GRACEFUL_TIMEOUT", "30")),
+        help="Segundos para terminar los pedidos en curso al apagar o reiniciar un worker"
+    )
+    args = parser.parse_args()
+
+    PreforkServer(args.host, args.port, args.workers, args.graceful_timeout).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+# src/api/serving.py
+"""
+Modelo en servicio: el modelo pyfunc (o el backend ONNX compilado), su
+camino rápido y la información de la versión cargada, agrupados en un único
+objeto.
+
+La API mantiene una sola referencia al modelo activo; al recargar se arma un
+ServingModel nuevo y se reemplaza la referencia de una vez, así los pedidos
+en curso terminan con el modelo anterior.
+
+MLflow, pandas, el camino rápido y el backend ONNX se importan al cargar el
+modelo y solo si se usan, para que importar la API sea liviano.
+"""
+
+import logging
+import time
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+from src.api.metrics import StageTimer
+from src.api.model_cache import fetch_model, resolve_version
+
+if TYPE_CHECKING:
+    from src.api.compiled import CompiledModel
+    from src.api.fast_path import FastPath
+
+logger = logging.getLogger(__name__)
+
+
+class ServingModel:
+    """Modelo cargado listo para predecir"""
+
+    def __init__(
+        self,
+        pyfunc_model,
+        info: Dict[str, Any],
+        fast_path: Optional["FastPath"] = None,
+        fast_path_max_rows: int = 64,
+        compiled: Optional["CompiledModel"] = None,
+    ):
+        self.pyfunc_model = pyfunc_model
+        self.info = info
+        self.fast_path = fast_path
+        self.fast_path_max_rows = fast_path_max_rows
+        self.compiled = compiled
+
+    def predict_records(self, records: List[Dict[str, Any]]) -> List[int]:
+        """Predice un lote de clientes con un único DataFrame columnar y una sola llamada al modelo"""
+        if self.compiled is not None:
+            with StageTimer("dataframe_build"):
+                X = self.compiled.preprocessor.encode(records)
+            if X is None:
+                raise ValueError("El backend compilado no pudo codificar los datos de entrada")
+            with StageTimer("model_predict"):
+                return self.compiled.predict_features(X)
+
+        # Lotes chicos: codificar directo a NumPy si el camino rápido está compilado
+        if self.fast_path is not None and len(records) <= self.fast_path_max_rows:
+            with StageTimer("dataframe_build"):
+                X = self.fast_path.encode(records)
+            if X is not None:
+                with StageTimer("model_predict"):
+                    return [int(prediction) for prediction in self.fast_path.estimator.predict(X)]
+
+        import pandas as pd
+
+        with StageTimer("dataframe_build"):
+            columns = {name: [row[name] for row in records] for name in records[0]}
+            df = pd.DataFrame(columns)
+
+        with StageTimer("model_predict"):
+            return [int(prediction) for prediction in self.pyfunc_model.predict(df)]
+
+
+def _resolve_and_download(model_name: str, stage: str, artifact: str = "model"):
+    """Resuelve el stage y descarga el artefacto sin usar el caché local"""
+    import mlflow
+
+    started = time.perf_counter()
+    model_version = resolve_version(model_name, stage)
+    registry_seconds = time.perf_counter() - started
+
+    if artifact == "model":
+        artifact_uri = f"models:/{model_name}/{model_version.version}"
+    else:
+        artifact_uri = f"runs:/{model_version.run_id}/{artifact}"
+    local_path = mlflow.artifacts.download_artifacts(artifact_uri)
+
+    info = {
+        "source": "network",
+        "version": str(model_version.version),
+        "run_id": model_version.run_id,
+        "phases": {"registry": registry_seconds, "download": time.perf_counter() - started - registry_seconds},
+    }
+    return local_path, info
+
+
+def format_phases(phases: Dict[str, float]) -> str:
+    """Formatea las fases de carga para los logs (ej: "registry 0.31 s | download 1.20 s")"""
+    return " | ".join(f"{name} {seconds:.2f} s" for name, seconds in phases.items())
+
+
+def load_serving_model(
+    model_name: str,
+    stage: str,
+    samples: List[Dict[str, Any]],
+    use_cache: bool = True,
+    fast_path_enabled: bool = True,
+    fast_path_max_rows: int = 64,
+    backend: str = "pyfunc",
+) -> ServingModel:
+    """
+    Carga el modelo del registry (o del caché local) y compila su camino rápido.
+
+    Con backend="onnx" se usa el artefacto `compiled/` exportado al promover
+    el modelo; si no existe o no se puede cargar, se usa el modelo pyfunc.
+
+    `info["phases"]` registra los segundos de cada fase: registry (resolver
+    el stage), download (descarga o verificación del caché), unpickle (cargar
+    el modelo en memoria) y fast_path (compilar el camino rápido).
+    """
+    started = time.perf_counter()
+    model_uri = f"models:/{model_name}/{stage}"
+
+    if backend == "onnx":
+        try:
+            if use_cache:
+                local_path, cache_info = fetch_model(model_name, stage, artifact="compiled")
+            else:
+                local_path, cache_info = _resolve_and_download(model_name, stage, artifact="compiled")
+
+            unpickle_started = time.perf_counter()
+            from src.api.compiled import CompiledModel
+            compiled = CompiledModel.load(local_path)
+            phases = {**cache_info["phases"], "unpickle": time.perf_counter() - unpickle_started}
+
+            info = {
+                "name": model_name,
+                "stage": stage,
+                "uri": model_uri,
+                "version": cache_info.get("version"),
+                "run_id": cache_info.get("run_id"),
+                "source": cache_info["source"],
+                "backend": "onnx",
+                "fast_path": False,
+                "phases": {name: round(seconds, 3) for name, seconds in phases.items()},
+                "load_seconds": round(time.perf_counter() - started, 3),
+                "loaded_at": time.time(),
+            }
+            return ServingModel(None, info, compiled=compiled)
+
+        except Exception as e:
+            logger.warning(f"Backend ONNX no disponible, se usará el modelo pyfunc: {e}")
+
+    # Cargar modelo: desde el caché local si la versión no cambió
+    if use_cache:
+        local_path, cache_info = fetch_model(model_name, stage)
+    else:
+        local_path, cache_info = _resolve_and_download(model_name, stage)
+
+    unpickle_started = time.perf_counter()
+    import mlflow.pyfunc
+    pyfunc_model = mlflow.pyfunc.load_model(local_path)
+    phases = {**cache_info["phases"], "unpickle": time.perf_counter() - unpickle_started}
+
+    # Compilar el camino rápido (si falla, se sigue usando pyfunc)
+    fast_path = None
+    if fast_path_enabled:
+        fast_path_started = time.perf_counter()
+        from src.api.fast_path import compile_fast_path
+        fast_path = compile_fast_path(pyfunc_model, samples)
+        phases["fast_path"] = time.perf_counter() - fast_path_started
+
+    info = {
+        "name": model_name,
+        "stage": stage,
+        "uri": model_uri,
+        "version": cache_info.get("version"),
+        "run_id": cache_info.get("run_id"),
+        "source": cache_info["source"],
+        "backend": "pyfunc",
+        "fast_path": fast_path is not None,
+        "phases": {name: round(seconds, 3) for name, seconds in phases.items()},
+        "load_seconds": round(time.perf_counter() - started, 3),
+        "loaded_at": time.time(),
+    }
+    if "registry_error" in cache_info:
+        info["registry_error"] = cache_info["registry_error"]
+
+    return ServingModel(pyfunc_model, info, fast_path, fast_path_max_rows)
@@ -0,0 +1,277 @@
+# src/api/shadow.py
+"""
+Scoring en sombra (champion / challenger).
+
+Una muestra de los pedidos a /predict se vuelve a predecir con un modelo
+challenger (ej: el stage Staging) en un executor de fondo, después de que
+el champion ya respondió: la latencia del pedido no cambia. Por cada
+comparación se registra si ambos modelos coinciden y la latencia de cada
+uno, y se expone un reporte con la tasa de acuerdo, la matriz champion x
+challenger y los percentiles de latencia lado a lado. Opcionalmente cada
+comparación se agrega como una línea JSON a un archivo local.
+
+Las latencias de los dos modelos se miden igual en el hilo de fondo: el
+mismo cliente pasa por `predict_records` de cada uno (en orden alternado),
+sin la cola del límite de concurrencia, el threadpool ni la espera del
+micro-batcher que sí ve el pedido del champion.
+
+El reporte corresponde a un par de versiones (champion, challenger): si
+cualquiera de los dos cambia (recarga), los contadores vuelven a cero.
+
+Los contadores son del proceso. Con el servidor pre-fork (src/api/server.py)
+cada worker ve solo su parte del tráfico: el reporte completo se arma con
+`summarize(read_log(...))` sobre el log, que todos los workers escriben. El
+archivo se abre en el proceso que escribe (no en el master antes del fork),
+así cada worker tiene su propio descriptor en modo append.
+
+Si el executor tiene más de `max_pending` comparaciones pendientes, las
+nuevas se descartan (se cuentan en `dropped`) en lugar de acumular trabajo.
+"""
+
+import itertools
+import json
+import logging
+import os
+import random
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Deque, Dict, Iterable, List, Optional
+
+from src.api.metrics import REGISTRY, Histogram, disable_stage_timing
+
+logger = logging.getLogger(__name__)
+
+SHADOW_LATENCY = REGISTRY.register(Histogram(
+    "telco_shadow_latency_seconds",
+    "Latencia de inferencia de los pedidos comparados en sombra, por modelo (champion o challenger)",
+    ["model"]
+))
+
+PERCENTILES = (50, 90, 99)
+
+
+def percentiles(values: Iterable[float]) -> Dict[str, Optional[float]]:
+    """p50 / p90 / p99 y media de una muestra de latencias (ms)"""
+    ordered = sorted(values)
+    if not ordered:
+        return {"count": 0, **{f"p{p}": None for p in PERCENTILES}, "mean": None}
+
+    summary = {"count": len(ordered)}
+    for p in PERCENTILES:
+        summary[f"p{p}"] = round(ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))], 3)
+    summary["mean"] = round(sum(ordered) / len(ordered), 3)
+    return summary
+
+
+def summarize(records: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Reporte a partir de las líneas del log de sombra (mismo formato que
+    ShadowScorer.report). Se usa solo el último par de versiones del log.
+    """
+    records = list(records)
+    if not records:
+        return {"comparisons": 0, "agreed": 0, "agreement_rate": None}
+
+    last = records[-1]
+    pair = (last.get("champion_version"), last.get("challenger_version"))
+    records = [r for r in records if (r.get("champion_version"), r.get("challenger_version")) == pair]
+    agreed = sum(1 for r in records if r["champion"] == r["challenger"])
+
+    return {
+        "champion": {"version": pair[0]},
+        "challenger": {"version": pair[1], "run_id": last.get("challenger_run_id")},
+        "since": records[0].get("at"),
+        "comparisons": len(records),
+        "agreed": agreed,
+        "agreement_rate": agreed / len(records),
+        "confusion": dict(Counter(f"{r['champion']}/{r['challenger']}" for r in records)),
+        "latency_ms": {
+            "champion": percentiles(r["champion_ms"] for r in records if r.get("champion_ms") is not None),
+            "challenger": percentiles(r["challenger_ms"] for r in records),
+        },
+    }
+
+
+def read_log(path: str) -> List[Dict[str, Any]]:
+    """Líneas del log de sombra (se ignoran las que no son JSON válido, ej: una escritura cortada)"""
+    records = []
+    with open(path) as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                continue
+    return records
+
+
+class ShadowScorer:
+    """Compara en segundo plano las predicciones del champion con las de un challenger"""
+
+    def __init__(
+        self,
+        challenger,
+        sample_rate: float,
+        max_pending: int = 100,
+        workers: int = 1,
+        log_path: Optional[str] = None,
+        latency_window: int = 10000,
+    ):
+        self.challenger = challenger
+        self.sample_rate = sample_rate
+        self.max_pending = max_pending
+        self.log_path = log_path
+        self.latency_window = latency_window
+
+        # Los hilos del executor no registran etapas en STAGE_DURATION
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers,
+            thread_name_prefix="shadow",
+            initializer=disable_stage_timing
+        )
+        self._lock = threading.Lock()
+        # Se abre al escribir la primera línea en cada proceso (ver _write_log)
+        self._log_file = None
+        self._log_pid = None
+
+        self._order = itertools.count()
+        self.sampled = 0
+        self.dropped = 0
+        self._pending = 0
+        self._reset(None, None)
+
+    def _reset(self, champion_version: Optional[str], challenger_version: Optional[str]):
+        self._pair = (champion_version, challenger_version)
+        self._since = time.time()
+        self.comparisons = 0
+        self.agreed = 0
+        self.errors = 0
+        self.confusion: Counter = Counter()
+        self._latencies: Dict[str, Deque[float]] = {
+            "champion": deque(maxlen=self.latency_window),
+            "challenger": deque(maxlen=self.latency_window),
+        }
+
+    def submit(
+        self,
+        record: Dict[str, Any],
+        champion_prediction: int,
+        champion,
+    ) -> bool:
+        """
+        Encola la comparación si el pedido cae en la muestra (no bloquea).
+
+        `champion` es el modelo que respondió el pedido (la referencia que
+        estaba activa, aunque después se recargue).
+        """
+        if random.random() >= self.sample_rate:
+            return False
+
+        with self._lock:
+            self.sampled += 1
+            if self._pending >= self.max_pending:
+                self.dropped += 1
+                return False
+            self._pending += 1
+
+        self._executor.submit(self._compare, record, champion_prediction, champion)
+        return True
+
+    @staticmethod
+    def _timed_predict(model, record: Dict[str, Any]):
+        started = time.perf_counter()
+        prediction = model.predict_records([record])[0]
+        return prediction, (time.perf_counter() - started) * 1000
+
+    def _compare(self, record, champion_prediction, champion):
+        challenger = self.challenger
+        champion_version = champion.info.get("version")
+        challenger_version = challenger.info.get("version")
+
+        try:
+            # Orden alternado: ninguno de los dos aprovecha siempre lo que el otro dejó en caché
+            if next(self._order) % 2:
+                challenger_prediction, challenger_ms = self._timed_predict(challenger, record)
+                _, champion_ms = self._timed_predict(champion, record)
+            else:
+                _, champion_ms = self._timed_predict(champion, record)
+                challenger_prediction, challenger_ms = self._timed_predict(challenger, record)
+        except Exception as e:
+            logger.warning(f"Error en sombra (champion v{champion_version}, challenger v{challenger_version}): {e}")
+            with self._lock:
+                self._pending -= 1
+                self.errors += 1
+            return
+
+        SHADOW_LATENCY.labels("challenger").observe(challenger_ms / 1000)
+        SHADOW_LATENCY.labels("champion").observe(champion_ms / 1000)
+
+        with self._lock:
+            self._pending -= 1
+            if self._pair != (champion_version, challenger_version):
+                self._reset(champion_version, challenger_version)
+
+            self.comparisons += 1
+            self.agreed += int(champion_prediction == challenger_prediction)
+            self.confusion[f"{champion_prediction}/{challenger_prediction}"] += 1
+            self._latencies["challenger"].append(challenger_ms)
+            self._latencies["champion"].append(champion_ms)
+
+            if self.log_path:
+                self._write_log({
+                    "at": time.time(),
+                    "customer_id": record.get("customer_id"),
+                    "champion_version": champion_version,
+                    "challenger_version": challenger_version,
+                    "challenger_run_id": challenger.info.get("run_id"),
+                    "champion": champion_prediction,
+                    "challenger": challenger_prediction,
+                    "champion_ms": round(champion_ms, 3),
+                    "challenger_ms": round(challenger_ms, 3),
+                })
+
+    def _write_log(self, entry: Dict[str, Any]):
+        """Agrega una línea al log (bajo self._lock); reabre el archivo si el proceso cambió (fork)"""
+        if self._log_pid != os.getpid():
+            # El objeto heredado del master no se cierra: su buffer es del otro proceso
+            self._log_file = open(self.log_path, "a", buffering=1)
+            self._log_pid = os.getpid()
+        self._log_file.write(json.dumps(entry) + "\n")
+
+    def report(self) -> Dict[str, Any]:
+        """Tasa de acuerdo y latencias del par de versiones actual"""
+        with self._lock:
+            latencies = {name: list(values) for name, values in self._latencies.items()}
+            report = {
+                "enabled": True,
+                "scope": "process",
+                "pid": os.getpid(),
+                "sample_rate": self.sample_rate,
+                "champion": {"version": self._pair[0]},
+                "challenger": {
+                    "version": self.challenger.info.get("version"),
+                    "stage": self.challenger.info.get("stage"),
+                    "run_id": self.challenger.info.get("run_id"),
+                },
+                "since": self._since,
+                "sampled": self.sampled,
+                "dropped": self.dropped,
+                "pending": self._pending,
+                "errors": self.errors,
+                "comparisons": self.comparisons,
+                "agreed": self.agreed,
+                "agreement_rate": (self.agreed / self.comparisons) if self.comparisons else None,
+                "confusion": dict(self.confusion),
+            }
+
+        report["latency_ms"] = {name: percentiles(values) for name, values in latencies.items()}
+        return report
+
+    def shutdown(self):
+        """Espera las comparaciones encoladas y cierra el log"""
+        self._executor.shutdown(wait=True)
+        if self._log_file is not None and self._log_pid == os.getpid():
+            self._log_file.close()
+        self._log_file = None
+        self._log_pid = None
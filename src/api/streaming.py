@@ -0,0 +1,72 @@
+# src/api/streaming.py
+"""
+Utilidades para /predict/stream (NDJSON de entrada y de salida).
+
+La respuesta se genera a medida que se lee el cuerpo del request: solo se
+lee el próximo bloque de la entrada cuando el cliente consumió la salida
+anterior, así un cliente lento frena la lectura en lugar de hacer que el
+servidor acumule datos en memoria.
+"""
+
+import json
+from typing import Any, AsyncIterator, Dict, Tuple
+
+from starlette.responses import StreamingResponse
+
+
+class LineTooLongError(ValueError):
+    """Una línea de la entrada supera el tamaño máximo permitido"""
+
+
+class BodyStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse que puede seguir leyendo el cuerpo del request.
+
+    La implementación base escucha `http.disconnect` en paralelo con
+    `receive()`, lo que consumiría los mensajes del cuerpo que el generador
+    necesita leer. Acá solo se envía la respuesta.
+    """
+
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+
+async def iter_ndjson(stream: AsyncIterator[bytes], max_line_bytes: int) -> AsyncIterator[Tuple[int, Any]]:
+    """
+    Itera los registros de un cuerpo NDJSON a medida que llegan.
+
+    Devuelve tuplas (número de línea, registro); si una línea no es JSON
+    válido el registro es una instancia de ValueError.
+    """
+    buffer = b""
+    line_number = 0
+
+    async for chunk in stream:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+
+        for line in lines:
+            line_number += 1
+            if len(line) > max_line_bytes:
+                raise LineTooLongError(f"Línea {line_number} supera {max_line_bytes} bytes")
+            if line.strip():
+                yield line_number, _parse_line(line)
+
+        if len(buffer) > max_line_bytes:
+            raise LineTooLongError(f"Línea {line_number + 1} supera {max_line_bytes} bytes")
+
+    if buffer.strip():
+        yield line_number + 1, _parse_line(buffer)
+
+
+def _parse_line(line: bytes) -> Any:
+    try:
+        return json.loads(line)
+    except ValueError as e:
+        return e
+
+
+def ndjson_line(record: Dict[str, Any]) -> bytes:
+    return (json.dumps(record, ensure_ascii=False, default=str) + "\n").encode()
@@ -0,0 +1,126 @@
+# src/build_score_store.py
+"""
+Construye (o actualiza) el score store que usa GET/POST /score/{customer_id}.
+
+Puntúa la tabla de clientes con el modelo en Production y guarda por
+cliente la predicción, la versión del modelo y el fingerprint de sus
+features (ver src/api/score_store.py). La reconstrucción es incremental:
+solo pasan por el modelo los clientes nuevos, los que cambiaron de
+atributos y todos si cambió la versión del modelo; los clientes que ya no
+están en la tabla se eliminan.
+
+Uso (etapa `score_store` de dvc.yaml):
+    python -m src.build_score_store
+    python -m src.build_score_store --input data/processed/telco_churn_processed.parquet --full
+"""
+
+import argparse
+import os
+import time
+
+import mlflow
+import yaml
+from dotenv import load_dotenv
+
+from src.api.model_cache import fetch_model
+from src.api.score_store import ScoreStore, fingerprint
+from src.score import NON_FEATURE_COLUMNS, read_chunks
+
+
+def build_score_store(input_path: str, store_path: str, chunk_size: int, model_name: str, stage: str, full: bool = False):
+    load_dotenv()
+    tracking_uri = os.getenv("MLFLOW_TRACKING_URI")
+    if tracking_uri:
+        mlflow.set_tracking_uri(tracking_uri)
+
+    model_path, info = fetch_model(model_name, stage)
+    model_version = str(info["version"])
+    model = mlflow.pyfunc.load_model(model_path)
+    print(f"Modelo: {model_name} ({stage}) v{model_version} desde {info['source']}")
+
+    store = ScoreStore(store_path, readonly=False)
+    previous_version = store.meta().get("model_version")
+    if previous_version != model_version:
+        print(f"Versión del store: {previous_version} -> v{model_version}, se puntúan todos los clientes")
+
+    started = time.time()
+    rows = 0
+    rescored = 0
+
+    try:
+        for chunk in read_chunks(input_path, chunk_size):
+            features = chunk.drop(columns=[c for c in NON_FEATURE_COLUMNS if c in chunk.columns])
+            records = features.to_dict(orient="records")
+            customer_ids = [str(record["customer_id"]) for record in records]
+            fingerprints = [fingerprint(record) for record in records]
+
+            existing = {} if full else store.fingerprints(customer_ids)
+            changed, unchanged = [], []
+            for i, (customer_id, fp) in enumerate(zip(customer_ids, fingerprints)):
+                if existing.get(customer_id) == (fp, model_version):
+                    unchanged.append(customer_id)
+                else:
+                    changed.append(i)
+
+            if changed:
+                predictions = model.predict(features.iloc[changed])
+                now = time.time()
+                store.upsert(
+                    (customer_ids[i], fingerprints[i], int(prediction), model_version, now, now)
+                    for i, prediction in zip(changed, predictions)
+                )
+            store.touch(unchanged, time.time())
+            store.commit()
+
+            rows += len(records)
+            rescored += len(changed)
+            print(f"  {rows} clientes ({rescored} puntuados)")
+
+        removed = store.delete_unseen(started)
+        store.set_meta({
+            "model_name": model_name,
+            "model_version": model_version,
+            "built_at": time.time(),
+            "rows": rows,
+            "rescored": rescored,
+        })
+        store.commit()
+    finally:
+        store.close()
+
+    report = {
+        "rows": rows,
+        "rescored": rescored,
+        "unchanged": rows - rescored,
+        "removed": removed,
+        "seconds": round(time.time() - started, 3),
+        "model_version": model_version,
+        "store": store_path,
+    }
+
+    print("\n--- Resumen del score store ---")
+    for key, value in report.items():
+        print(f"  {key}: {value}")
+
+    return report
+
+
+def main():
+    with open("params.yaml") as f:
+        params = yaml.safe_load(f)
+    store_params = params.get("score_store", {})
+
+    parser = argparse.ArgumentParser(description="Construye el score store por customer_id con el modelo del Model Registry")
+    parser.add_argument("--input", default=store_params.get("input", params["data_processed"]), help="Tabla de clientes (.parquet, .csv o .jsonl)")
+    parser.add_argument("--store", default=store_params.get("path", "outputs/score_store.sqlite"), help="Archivo SQLite del store")
+    parser.add_argument("--chunk-size", type=int, default=store_params.get("chunk_size", 10000), help="Filas por bloque")
+    parser.add_argument("--model-name", default=os.getenv("MLFLOW_MODEL_NAME", "telco-churn-prediction"))
+    parser.add_argument("--stage", default=os.getenv("MLFLOW_MODEL_STAGE", "Production"))
+    parser.add_argument("--full", action="store_true", help="Puntuar todos los clientes aunque no hayan cambiado")
+    args = parser.parse_args()
+
+    build_score_store(args.input, args.store, args.chunk_size, args.model_name, args.stage, args.full)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,119 @@
-# src/data_prep.py (versión simplificada)
-import pandas as pd
+# src/data_prep.py
+"""
+Preparación de datos: CSV crudo -> Parquet tipado.
+
+El CSV se lee en bloques (sirve para archivos más grandes que la memoria) en
+dos pasadas:
+
+1. Se infiere el esquema de todo el archivo: columnas de texto con pocos
+   valores distintos -> category (con las categorías de todos los bloques),
+   enteros -> el tipo entero más chico que cubre su rango y decimales ->
+   float32 solo si la conversión no pierde precisión.
+2. Se convierte cada bloque a ese esquema y se escribe de forma incremental
+   en data/processed/telco_churn_processed.parquet.
+
+Así train.py y evaluate.py leen columnas ya tipadas en lugar de volver a
+parsear el CSV.
+"""
+
 import os
 
+import numpy as np
+import pandas as pd
+import yaml
+
+
+def _infer_schema(raw_path: str, chunk_size: int, max_categories: int):
+    """Primera pasada: tipo final de cada columna"""
+    columns = {}
+
+    for chunk in pd.read_csv(raw_path, chunksize=chunk_size):
+        for name in chunk.columns:
+            series = chunk[name]
+            info = columns.setdefault(name, {
+                "kinds": set(), "values": set(), "min": None, "max": None, "nulls": False, "float32_exact": True
+            })
+            info["nulls"] |= bool(series.isna().any())
+            values = series.dropna()
+
+            if pd.api.types.is_bool_dtype(series):
+                info["kinds"].add("bool")
+            elif pd.api.types.is_numeric_dtype(series):
+                info["kinds"].add("int" if pd.api.types.is_integer_dtype(series) else "float")
+                if len(values):
+                    info["min"] = values.min() if info["min"] is None else min(info["min"], values.min())
+                    info["max"] = values.max() if info["max"] is None else max(info["max"], values.max())
+                if info["float32_exact"]:
+                    as_float = values.to_numpy(dtype=np.float64)
+                    info["float32_exact"] = bool(np.array_equal(as_float.astype(np.float32).astype(np.float64), as_float))
+            else:
+                info["kinds"].add("object")
+                if len(info["values"]) <= max_categories:
+                    info["values"].update(values.astype(str).unique())
+
+    schema = {}
+    for name, info in columns.items():
+        kinds = info["kinds"]
+        if "object" in kinds:
+            # Texto: category si tiene pocos valores distintos (ej: customer_id queda como texto)
+            if len(info["values"]) <= max_categories:
+                schema[name] = pd.CategoricalDtype(sorted(info["values"]))
+            else:
+                schema[name] = "object"
+        elif kinds == {"bool"} and not info["nulls"]:
+            schema[name] = "bool"
+        elif kinds == {"int"} and not info["nulls"] and info["min"] is not None:
+            schema[name] = np.result_type(np.min_scalar_type(info["min"]), np.min_scalar_type(info["max"]))
+        elif info["float32_exact"]:
+            schema[name] = "float32"
+        else:
+            schema[name] = "float64"
+
+    return schema
+
+
 def prepare_data():
-    # Carga de datos
-    df = pd.read_csv('data/raw/telco_churn.csv')
-    
-    # Solo limpieza básica manual si es necesaria
-    df_clean = df.copy()
-    
+    with open('params.yaml') as f:
+        params = yaml.safe_load(f)
+    prep_params = params.get('data_prep', {})
+
+    raw_path = prep_params.get('raw_csv', 'data/raw/telco_churn.csv')
+    output_path = params['data_processed']
+    chunk_size = prep_params.get('chunk_size', 100000)
+    max_categories = prep_params.get('max_categories', 1000)
+
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    # Primera pasada: esquema de todo el archivo
+    schema = _infer_schema(raw_path, chunk_size, max_categories)
+    print("Esquema del dataset procesado:")
+    for name, dtype in schema.items():
+        print(f"  {name}: {dtype}")
+
     # Crear el directorio de salida si no existe
-    output_dir = 'data/processed'
-    os.makedirs(output_dir, exist_ok=True)
-    
-    # Guardar los datos procesados
-    df_clean.to_csv(os.path.join(output_dir, 'telco_churn_processed.csv'), index=False)
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+
+    # Segunda pasada: convertir cada bloque y escribirlo
+    tmp_path = f"{output_path}.tmp"
+    writer = None
+    rows = 0
+    try:
+        for chunk in pd.read_csv(raw_path, chunksize=chunk_size):
+            # Solo limpieza básica manual si es necesaria
+            chunk = chunk.astype(schema)
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(tmp_path, table.schema, compression="snappy")
+            writer.write_table(table)
+            rows += len(chunk)
+    finally:
+        if writer is not None:
+            writer.close()
+
+    os.replace(tmp_path, output_path)
+    print(f"Datos procesados guardados en {output_path} ({rows} filas)")
+
 
 if __name__ == "__main__":
     prepare_data()
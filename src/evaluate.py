@@ -1,160 +1,276 @@
 # src/evaluate.py (con MLflow)
+"""
+Evaluación final en el hold-out de los mejores runs del experimento.
+
+Se evalúan los `evaluation.top_k` runs con mejor Accuracy (de CV) en
+procesos en paralelo. Cada proceso carga su modelo una sola vez y hace una
+sola pasada de `predict_proba` sobre el hold-out, de la que salen tanto las
+clases como el AUC. También se mide lo que cuesta servirlo: latencia de a un
+cliente (p50/p99), tiempo por fila en lote, tamaño del artefacto y pico de
+memoria al cargarlo y predecir. Todas las métricas se escriben en cada run
+con un solo `log_batch`, así promote_best_model.py puede elegir entre varios
+candidatos el mejor que entra en los presupuestos de `promotion.budgets`.
+"""
+
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
 import mlflow
-import pandas as pd
-import yaml
+import numpy as np
+from mlflow.entities import Metric
+from mlflow.tracking import MlflowClient
 from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, roc_auc_score, confusion_matrix, roc_curve
 import matplotlib.pyplot as plt
 import seaborn as sns
-import os
-from dotenv import load_dotenv
 
-def evaluate_model():
-    # Cargar parámetros PRIMERO
-    with open('params.yaml') as f:
-        params = yaml.safe_load(f)
-
-    # --- MLflow setup ---
-    # --- MLflow setup ---
-    track_remote = params.get('track_to_dagshub', False) or os.getenv('TRACK_TO_DAGSHUB') == 'true'
-
-    if track_remote:
-        # Si vamos a DagsHub, cargar credenciales y configurar URI
-        load_dotenv()
-        # Si la URI viene por variable de entorno (CI), usarla. Si no, usar params.
-        tracking_uri = os.getenv('MLFLOW_TRACKING_URI') or params.get('dagshub_tracking_uri')
-        if tracking_uri:
-            mlflow.set_tracking_uri(tracking_uri)
-    else:
-        # Si es local, asegurarse de que no haya URI de tracking de DagsHub
-        if 'MLFLOW_TRACKING_URI' in os.environ:
-            del os.environ['MLFLOW_TRACKING_URI']
-        if 'MLFLOW_TRACKING_USERNAME' in os.environ:
-            del os.environ['MLFLOW_TRACKING_USERNAME']
-        if 'MLFLOW_TRACKING_PASSWORD' in os.environ:
-            del os.environ['MLFLOW_TRACKING_PASSWORD']
+from src.utils import load_holdout, load_params, setup_mlflow
 
-    experiment_name = "telco-churn-prediction"
+# Hold-out y configuración de mediciones en cada proceso worker (se reciben una vez por proceso)
+_worker_data = None
 
-    # Cargar datos de prueba (el mismo hold-out set que usó PyCaret)
-    df = pd.read_csv(params['data_read_csv'])
-    
-    data_unseen = df.sample(frac=1-params['train_size'], random_state=params['seed'])
-    X_unseen = data_unseen.drop('churn', axis=1)
-    y_unseen = data_unseen['churn']
 
-    # --- Búsqueda del mejor modelo en MLflow ---
-    # Buscar el mejor run dentro del experimento, ordenado por Accuracy
-    best_run = mlflow.search_runs(
-        experiment_names=[experiment_name],
-        order_by=["metrics.Accuracy DESC"],
-        max_results=1
-    ).iloc[0]
+def _init_worker(tracking_uri, X, y, latency_rows):
+    global _worker_data
+    mlflow.set_tracking_uri(tracking_uri)
+    _worker_data = (X, y, latency_rows)
+
+    # Un hilo por worker: los modelos se miden sin competir entre sí por los cores
+    from threadpoolctl import threadpool_limits
+    threadpool_limits(1)
 
-    best_run_id = best_run["run_id"]
-    print(f"Mejor Run ID encontrado: {best_run_id}")
-    print(f"Métricas del mejor run: Accuracy = {best_run['metrics.Accuracy']:.4f}")
 
-    # Cargar el modelo del mejor run
-    model_uri = f"runs:/{best_run_id}/model"
-    loaded_model = mlflow.pyfunc.load_model(model_uri)
+def _load_predictor(model_path):
+    """
+    Carga el modelo una sola vez y devuelve una función X -> (clases, probabilidad de churn).
 
-    # --- Evaluación del modelo cargado ---
-    # Predecir clases y probabilidades
-    predictions = loaded_model.predict(X_unseen)
-    # Algunos modelos devuelven probabilidades de forma diferente, intentamos predict_proba si es posible
+    Las clases salen de la misma pasada de predict_proba (argmax, igual que
+    predict). Si el modelo no es sklearn o no tiene probabilidades (ej: SVM
+    lineal), se usa predict y no hay AUC.
+    """
     try:
-        # PyCaret/Sklearn models usually have predict_proba
-        # loaded_model es un PyFuncModel, necesitamos el underlying model o usar predict con params si es soportado
-        # Para simplificar con mlflow pyfunc, a veces devuelve solo clases.
-        # Si el modelo fue logueado con sklearn flavor, podríamos cargarlo como sklearn.
-        # Pero pyfunc es genérico. Vamos a asumir que predict devuelve clases.
-        # Para ROC necesitamos probabilidades.
-        # Intentaremos obtener probabilidades si el flavor lo permite o si predict devuelve df con probas (raro).
-        # NOTA: MLflow pyfunc predict output depends on the model.
-        # Si no podemos obtener probas fácilmente de pyfunc genérico sin más info,
-        # cargaremos como sklearn si es posible, o omitiremos ROC si falla.
-        
-        # Intento de cargar como sklearn para tener predict_proba
-        sklearn_model = mlflow.sklearn.load_model(model_uri)
-        probs = sklearn_model.predict_proba(X_unseen)[:, 1]
-        has_probs = True
+        model = mlflow.sklearn.load_model(model_path)
     except Exception as e:
-        print(f"No se pudo cargar como modelo sklearn para probabilidades: {e}")
-        print("Se intentará usar pyfunc, pero ROC/AUC podría no estar disponible.")
-        probs = None
-        has_probs = False
+        print(f"No se pudo cargar {model_path} como modelo sklearn ({e}), se usa pyfunc sin probabilidades")
+        pyfunc_model = mlflow.pyfunc.load_model(model_path)
+        return lambda X: (np.asarray(pyfunc_model.predict(X)), None)
 
-    # Calcular métricas de evaluación final
-    final_accuracy = accuracy_score(y_unseen, predictions)
-    final_precision = precision_score(y_unseen, predictions)
-    final_recall = recall_score(y_unseen, predictions)
-    final_f1 = f1_score(y_unseen, predictions)
-    
-    metrics = {
-        "final_accuracy": final_accuracy,
-        "final_precision": final_precision,
-        "final_recall": final_recall,
-        "final_f1": final_f1
-    }
+    if hasattr(model, 'predict_proba'):
+        def predict(X):
+            proba = model.predict_proba(X)
+            return model.classes_[np.argmax(proba, axis=1)], proba[:, 1]
+        return predict
+    return lambda X: (np.asarray(model.predict(X)), None)
 
-    if has_probs:
-        final_auc = roc_auc_score(y_unseen, probs)
-        metrics["final_auc"] = final_auc
-        print(f"  AUC-ROC: {final_auc:.4f}")
 
-    print("--- Métricas de Evaluación Final en Hold-Out Set ---")
-    print(f"  Accuracy: {final_accuracy:.4f}")
-    print(f"  Precision: {final_precision:.4f}")
-    print(f"  Recall: {final_recall:.4f}")
-    print(f"  F1-Score: {final_f1:.4f}")
+def _memory_mb(field):
+    """VmRSS (actual) o VmHWM (pico) del proceso en MB; None fuera de Linux"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith(f"{field}:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def _reset_peak_memory():
+    """Reinicia VmHWM: un worker puede evaluar varios modelos seguidos"""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        pass
+
+
+def _dir_size_mb(path):
+    return sum(
+        os.path.getsize(os.path.join(root, name))
+        for root, _, files in os.walk(path)
+        for name in files
+    ) / (1024 * 1024)
 
-    # --- Generación de Gráficos ---
-    os.makedirs("outputs/plots", exist_ok=True)
+
+def _single_row_latencies_ms(predict, X, n_rows):
+    """Latencia de predecir un cliente por vez (como /predict), en ms"""
+    rows = np.linspace(0, len(X) - 1, min(n_rows, len(X))).astype(int)
+    predict(X.iloc[[rows[0]]])  # calentamiento
+    latencies = []
+    for i in rows:
+        started = time.perf_counter()
+        predict(X.iloc[[i]])
+        latencies.append((time.perf_counter() - started) * 1000)
+    return np.array(latencies)
+
+
+def _plots(run_id, y, predictions, probs, auc):
+    """Matriz de confusión y curva ROC del run en outputs/plots/<run_id>/"""
+    plot_dir = os.path.join("outputs/plots", run_id)
+    os.makedirs(plot_dir, exist_ok=True)
+    paths = []
 
     # 1. Matriz de Confusión
-    cm = confusion_matrix(y_unseen, predictions)
+    cm = confusion_matrix(y, predictions)
     plt.figure(figsize=(8, 6))
     sns.heatmap(cm, annot=True, fmt='d', cmap='Blues')
     plt.title('Matriz de Confusión - Hold-Out Set')
     plt.ylabel('Verdadero')
     plt.xlabel('Predicho')
     plt.tight_layout()
-    cm_path = "outputs/plots/confusion_matrix.png"
-    plt.savefig(cm_path)
+    paths.append(os.path.join(plot_dir, "confusion_matrix.png"))
+    plt.savefig(paths[-1])
     plt.close()
 
     # 2. Curva ROC (si hay probabilidades)
-    roc_path = None
-    if has_probs:
-        fpr, tpr, _ = roc_curve(y_unseen, probs)
+    if probs is not None:
+        fpr, tpr, _ = roc_curve(y, probs)
         plt.figure(figsize=(8, 6))
-        plt.plot(fpr, tpr, label=f'AUC = {final_auc:.2f}')
+        plt.plot(fpr, tpr, label=f'AUC = {auc:.2f}')
         plt.plot([0, 1], [0, 1], 'k--')
         plt.xlabel('False Positive Rate')
         plt.ylabel('True Positive Rate')
         plt.title('Curva ROC - Hold-Out Set')
         plt.legend(loc='lower right')
         plt.tight_layout()
-        roc_path = "outputs/plots/roc_curve.png"
-        plt.savefig(roc_path)
+        paths.append(os.path.join(plot_dir, "roc_curve.png"))
+        plt.savefig(paths[-1])
         plt.close()
 
-    # --- Loguear las métricas y artefactos al run original de MLflow ---
-    with mlflow.start_run(run_id=best_run_id):
-        mlflow.log_metrics(metrics)
-        mlflow.log_artifact(cm_path)
-        if roc_path:
-            mlflow.log_artifact(roc_path)
-
-    print("Métricas y gráficos de evaluación final logueados en el run de MLflow existente.")
-    
-    # --- Guardar métricas también en formato JSON para DVC ---
-    import json
+    return paths
+
+
+def _evaluate_run(run_id):
+    """Evalúa un run en el hold-out (se ejecuta en un proceso worker)"""
+    X_unseen, y_unseen, latency_rows = _worker_data
+    started = time.time()
+
+    baseline_mb = _memory_mb('VmRSS')
+    _reset_peak_memory()
+
+    model_path = mlflow.artifacts.download_artifacts(f"runs:/{run_id}/model")
+    predict = _load_predictor(model_path)
+
+    batch_started = time.perf_counter()
+    predictions, probs = predict(X_unseen)
+    batch_seconds = time.perf_counter() - batch_started
+    latencies = _single_row_latencies_ms(predict, X_unseen, latency_rows)
+
+    # Calcular métricas de evaluación final
+    metrics = {
+        "final_accuracy": accuracy_score(y_unseen, predictions),
+        "final_precision": precision_score(y_unseen, predictions),
+        "final_recall": recall_score(y_unseen, predictions),
+        "final_f1": f1_score(y_unseen, predictions)
+    }
+    if probs is not None:
+        metrics["final_auc"] = roc_auc_score(y_unseen, probs)
+
+    # Costo de servir el modelo (presupuestos en params.yaml: promotion.budgets)
+    metrics["latency_p50_ms"] = float(np.percentile(latencies, 50))
+    metrics["latency_p99_ms"] = float(np.percentile(latencies, 99))
+    metrics["batch_ms_per_row"] = batch_seconds * 1000 / len(X_unseen)
+    metrics["model_size_mb"] = _dir_size_mb(model_path)
+    peak_mb = _memory_mb('VmHWM')
+    if peak_mb is not None and baseline_mb is not None:
+        metrics["peak_memory_mb"] = peak_mb - baseline_mb
+
+    plots = _plots(run_id, y_unseen, predictions, probs, metrics.get("final_auc"))
+    return {"run_id": run_id, "metrics": metrics, "plots": plots, "seconds": time.time() - started}
+
+
+def evaluate_model():
+    # Cargar parámetros PRIMERO
+    params = load_params()
+    setup_mlflow(params)
+    evaluation = params.get('evaluation', {})
+
+    experiment_name = "telco-churn-prediction"
+
+    # Cargar datos de prueba (el mismo hold-out set que usó PyCaret, ver src/utils.py)
+    data_unseen = load_holdout(params)
+    X_unseen = data_unseen.drop('churn', axis=1)
+    y_unseen = data_unseen['churn']
+
+    # --- Búsqueda de los mejores runs en MLflow ---
+    # Los top_k runs del experimento, ordenados por Accuracy
+    top_k = evaluation.get('top_k', 3)
+    candidates = mlflow.search_runs(
+        experiment_names=[experiment_name],
+        filter_string="metrics.Accuracy > 0",
+        order_by=["metrics.Accuracy DESC"],
+        max_results=top_k
+    )
+    run_ids = list(candidates["run_id"])
+    print(f"Evaluando {len(run_ids)} runs en el hold-out ({len(X_unseen)} filas):")
+    for _, run in candidates.iterrows():
+        print(f"  {run['run_id']}: Accuracy (CV) = {run['metrics.Accuracy']:.4f}")
+
+    # El último run incremental no tiene métricas de CV (ver src/incremental.py): se suma aparte
+    incremental = mlflow.search_runs(
+        experiment_names=[experiment_name],
+        filter_string="tags.train_mode = 'incremental'",
+        order_by=["start_time DESC"],
+        max_results=1
+    )
+    for run_id in incremental["run_id"]:
+        if run_id not in run_ids:
+            run_ids.append(run_id)
+            print(f"  {run_id}: incremental")
+
+    # --- Evaluación en paralelo: un proceso por modelo ---
+    n_jobs = evaluation.get('n_jobs', -1)
+    n_jobs = os.cpu_count() if n_jobs in (None, -1, 0) else n_jobs
+    started = time.time()
+    results = []
+    with ProcessPoolExecutor(
+        max_workers=max(1, min(n_jobs, len(run_ids))),
+        initializer=_init_worker,
+        initargs=(mlflow.get_tracking_uri(), X_unseen, y_unseen, evaluation.get('latency_rows', 200)),
+    ) as executor:
+        futures = {run_id: executor.submit(_evaluate_run, run_id) for run_id in run_ids}
+        for run_id, future in futures.items():
+            try:
+                results.append(future.result())
+            except Exception as e:
+                print(f"No se pudo evaluar el run {run_id}: {e}")
+
+    if not results:
+        raise RuntimeError("No se pudo evaluar ningún run")
+    print(f"Evaluación de {len(results)} modelos en {time.time() - started:.1f}s")
+
+    # --- Loguear las métricas (un log_batch por run) y los gráficos a cada run ---
+    client = MlflowClient()
+    timestamp = int(time.time() * 1000)
+    for result in results:
+        client.log_batch(
+            result["run_id"],
+            metrics=[Metric(key, float(value), timestamp, 0) for key, value in result["metrics"].items()]
+        )
+        for path in result["plots"]:
+            client.log_artifact(result["run_id"], path)
+
+    print("--- Métricas de Evaluación Final en Hold-Out Set ---")
+    for result in sorted(results, key=lambda r: r["metrics"]["final_accuracy"], reverse=True):
+        metrics = result["metrics"]
+        summary = ", ".join(f"{key[len('final_'):]}={value:.4f}" for key, value in metrics.items() if key.startswith("final_"))
+        print(f"  {result['run_id']} ({result['seconds']:.1f}s): {summary}")
+        print(
+            f"      latencia p50/p99 {metrics['latency_p50_ms']:.2f}/{metrics['latency_p99_ms']:.2f} ms, "
+            f"lote {metrics['batch_ms_per_row']:.4f} ms/fila, {metrics['model_size_mb']:.1f} MB, "
+            f"pico de memoria {metrics.get('peak_memory_mb', float('nan')):.1f} MB"
+        )
+
+    print("Métricas y gráficos de evaluación final logueados en los runs de MLflow existentes.")
+
+    # --- Guardar métricas del mejor candidato también en formato JSON para DVC ---
+    best = max(results, key=lambda r: r["metrics"]["final_accuracy"])
     os.makedirs("outputs/metrics", exist_ok=True)
     with open("outputs/metrics/metrics.json", "w") as f:
-        json.dump(metrics, f, indent=2)
-    
+        json.dump(best["metrics"], f, indent=2)
+
     print("Métricas guardadas también en outputs/metrics/metrics.json para DVC")
 
 if __name__ == "__main__":
-    evaluate_model()
\ No newline at end of file
+    evaluate_model()
@@ -0,0 +1,281 @@
+# src/incremental.py
+"""
+Reentrenamiento incremental desde el modelo en Production.
+
+Cada run de entrenamiento guarda su linaje en el artefacto `lineage/`:
+
+- `row_hashes.npy`: hash de cada fila del train (features + churn);
+- `schema.json`: columnas y tipos del dataset.
+
+Ambos ignoran el ancho de los tipos numéricos (uint8 / int16, float32 /
+float64): un valor nuevo que hace que data_prep.py elija otro ancho no
+cambia el esquema ni el hash de las filas existentes.
+
+y los tags `data_key`, `train_mode` y, si partió de otro modelo,
+`parent_model_version` / `parent_run_id`.
+
+Con el modo incremental activo, train.py compara el train actual con el del
+modelo en Production: las filas cuyo hash no estaba son las nuevas (clientes
+nuevos o con datos cambiados). Si el estimador lo permite, se continúa el
+entrenamiento solo con esas filas sobre el preprocesamiento ya ajustado:
+
+- xgboost: se agregan `boost_rounds` árboles al booster existente;
+- estimadores con `partial_fit` (ej: SGDClassifier, GaussianNB).
+
+Se vuelve al entrenamiento completo si no hay linaje, cambió el esquema,
+las filas nuevas superan `max_delta_fraction` del train, su distribución se
+aleja de la anterior (PSI mayor que `drift_threshold`) o el estimador no
+admite warm start.
+"""
+
+import json
+import os
+import tempfile
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.utils import ID_COLUMN, TARGET, split_key
+
+LINEAGE_DIR = 'lineage'
+ROW_HASHES_FILE = 'row_hashes.npy'
+SCHEMA_FILE = 'schema.json'
+
+EXPERIMENT_NAME = 'telco-churn-prediction'
+
+# Tags del run que promote_best_model.py copia a la versión registrada
+LINEAGE_TAGS = ('data_key', 'train_mode', 'parent_model_version', 'parent_run_id', 'full_retrain_reason')
+
+
+class FullRetrain(Exception):
+    """El modelo no se puede actualizar de forma incremental"""
+
+    def __init__(self, reason: str, detail: str = ''):
+        super().__init__(f"{reason}: {detail}" if detail else reason)
+        self.reason = reason
+
+
+def _dtype_family(dtype) -> str:
+    """
+    Tipo de una columna sin el ancho: data_prep.py elige el entero (o
+    float32 / float64) más chico según los valores del dataset, así que un
+    valor nuevo puede cambiar el ancho sin que cambie el esquema.
+    """
+    if pd.api.types.is_bool_dtype(dtype):
+        return 'bool'
+    if pd.api.types.is_integer_dtype(dtype):
+        return 'int'
+    if pd.api.types.is_float_dtype(dtype):
+        return 'float'
+    return str(dtype)
+
+
+def _widen(df: pd.DataFrame) -> pd.DataFrame:
+    """Enteros a int64 y decimales a float64: el hash de una fila no depende del ancho"""
+    widths = {}
+    for column, dtype in df.dtypes.items():
+        family = _dtype_family(dtype)
+        if family == 'int' and dtype != np.uint64:
+            widths[column] = np.int64
+        elif family == 'float':
+            widths[column] = np.float64
+    return df.astype(widths) if widths else df
+
+
+def row_hashes(df: pd.DataFrame) -> np.ndarray:
+    return pd.util.hash_pandas_object(_widen(df), index=False).to_numpy()
+
+
+def schema_of(df: pd.DataFrame) -> Dict[str, str]:
+    return {column: _dtype_family(dtype) for column, dtype in df.dtypes.items()}
+
+
+def incremental_enabled(params: Dict[str, Any]) -> bool:
+    return params.get('incremental', {}).get('enabled', False) or os.getenv('INCREMENTAL_TRAINING') == 'true'
+
+
+# --- Linaje ---
+
+def log_lineage(client, run_ids: List[str], train_df: pd.DataFrame, params: Dict[str, Any], tags: Dict[str, str]):
+    """Guarda el linaje del train en cada run"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        np.save(os.path.join(tmp_dir, ROW_HASHES_FILE), row_hashes(train_df))
+        with open(os.path.join(tmp_dir, SCHEMA_FILE), 'w') as f:
+            json.dump(schema_of(train_df), f)
+
+        tags = {'data_key': split_key(params), 'data_rows': str(len(train_df)), **tags}
+        for run_id in run_ids:
+            client.log_artifacts(run_id, tmp_dir, artifact_path=LINEAGE_DIR)
+            for key, value in tags.items():
+                client.set_tag(run_id, key, value)
+
+
+def runs_since(started: float) -> List[str]:
+    """Runs del experimento creados desde `started` (los de esta corrida de train.py)"""
+    import mlflow
+
+    runs = mlflow.search_runs(
+        experiment_names=[EXPERIMENT_NAME],
+        filter_string=f"attributes.start_time >= {int(started * 1000)}",
+    )
+    return list(runs['run_id']) if not runs.empty else []
+
+
+def load_lineage(client, run_id: str) -> Tuple[np.ndarray, Dict[str, str]]:
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        try:
+            path = client.download_artifacts(run_id, LINEAGE_DIR, tmp_dir)
+        except Exception as e:
+            raise FullRetrain('no_lineage', f"el run {run_id} no tiene '{LINEAGE_DIR}/' ({e})")
+        hashes = np.load(os.path.join(path, ROW_HASHES_FILE))
+        with open(os.path.join(path, SCHEMA_FILE)) as f:
+            schema = json.load(f)
+    return hashes, schema
+
+
+# --- Drift ---
+
+def psi(reference: pd.Series, current: pd.Series, bins: int = 10) -> float:
+    """Population Stability Index entre dos muestras de una columna"""
+    eps = 1e-4
+    if pd.api.types.is_numeric_dtype(reference) and not pd.api.types.is_bool_dtype(reference):
+        edges = np.unique(np.nanquantile(reference.to_numpy(dtype=np.float64), np.linspace(0, 1, bins + 1)[1:-1]))
+        edges = np.concatenate(([-np.inf], edges, [np.inf]))
+        expected = np.histogram(reference.dropna(), edges)[0] / max(reference.notna().sum(), 1)
+        actual = np.histogram(current.dropna(), edges)[0] / max(current.notna().sum(), 1)
+    else:
+        ref_freq = reference.astype(str).value_counts(normalize=True)
+        cur_freq = current.astype(str).value_counts(normalize=True)
+        categories = ref_freq.index.union(cur_freq.index)
+        expected = ref_freq.reindex(categories, fill_value=0).to_numpy()
+        actual = cur_freq.reindex(categories, fill_value=0).to_numpy()
+
+    expected = np.clip(expected, eps, None)
+    actual = np.clip(actual, eps, None)
+    return float(np.sum((actual - expected) * np.log(actual / expected)))
+
+
+def drift_report(reference: pd.DataFrame, current: pd.DataFrame) -> Dict[str, float]:
+    """PSI por columna (numéricas, booleanas y categóricas; se omiten los ids de texto)"""
+    report = {}
+    for column in reference.columns:
+        dtype = reference[column].dtype
+        if column == ID_COLUMN or dtype == object:
+            continue
+        report[column] = psi(reference[column], current[column])
+    return report
+
+
+# --- Warm start ---
+
+def warm_start(pipeline, X: pd.DataFrame, y: pd.Series, boost_rounds: int) -> str:
+    """Continúa el entrenamiento del estimador final del pipeline con las filas nuevas"""
+    Xt = X
+    for _, step in pipeline.steps[:-1]:
+        Xt = step.transform(Xt)
+    estimator = pipeline.steps[-1][1]
+
+    if type(estimator).__name__ == 'XGBClassifier':
+        booster = estimator.get_booster()
+        estimator.set_params(n_estimators=boost_rounds)
+        estimator.fit(Xt, y, xgb_model=booster)
+        return f"xgboost (+{boost_rounds} árboles)"
+    if hasattr(estimator, 'partial_fit'):
+        estimator.partial_fit(Xt, y)
+        return f"partial_fit ({type(estimator).__name__})"
+    raise FullRetrain('unsupported_estimator', type(estimator).__name__)
+
+
+def incremental_train(params: Dict[str, Any], train_df: pd.DataFrame, holdout_df: pd.DataFrame) -> Optional[str]:
+    """
+    Actualiza el modelo en Production con las filas nuevas del train y lo
+    loguea como un run nuevo con linaje a su versión padre.
+
+    Devuelve el run_id, o None si no hay filas nuevas. Lanza FullRetrain si
+    hay que reentrenar desde cero.
+    """
+    import mlflow
+    from mlflow.tracking import MlflowClient
+    from sklearn.metrics import get_scorer
+
+    from src.api.fast_path import unwrap_pipeline
+    from src.model_selection import SCORING
+
+    config = params.get('incremental', {})
+    model_name = config.get('model_name', EXPERIMENT_NAME)
+    stage = config.get('stage', 'Production')
+    client = MlflowClient()
+
+    versions = client.get_latest_versions(model_name, stages=[stage]) if _model_exists(client, model_name) else []
+    if not versions:
+        raise FullRetrain('no_parent', f"no hay versión de '{model_name}' en {stage}")
+    parent = versions[0]
+
+    parent_hashes, parent_schema = load_lineage(client, parent.run_id)
+    schema = schema_of(train_df)
+    if schema != parent_schema:
+        changed = sorted(set(schema.items()) ^ set(parent_schema.items()))
+        raise FullRetrain('schema_changed', str(changed))
+
+    is_new = ~np.isin(row_hashes(train_df), parent_hashes)
+    delta = train_df[is_new]
+    print(f"Modelo padre: {model_name} v{parent.version} (run {parent.run_id})")
+    print(f"Filas nuevas en el train: {len(delta)} de {len(train_df)}")
+
+    if delta.empty:
+        print("Sin filas nuevas: el modelo en Production ya está al día")
+        return None
+
+    max_delta_fraction = config.get('max_delta_fraction', 0.3)
+    if len(delta) > max_delta_fraction * len(train_df):
+        raise FullRetrain('delta_too_large', f"{len(delta) / len(train_df):.1%} > {max_delta_fraction:.0%}")
+
+    drift = drift_report(train_df[~is_new], delta)
+    worst = max(drift, key=drift.get) if drift else None
+    if worst is not None:
+        print(f"Drift máximo (PSI): {worst} = {drift[worst]:.3f}")
+        if drift[worst] > config.get('drift_threshold', 0.2):
+            raise FullRetrain('drift', f"PSI de '{worst}' = {drift[worst]:.3f}")
+
+    pipeline = unwrap_pipeline(mlflow.sklearn.load_model(f"models:/{model_name}/{parent.version}"))
+    started = time.time()
+    method = warm_start(pipeline, delta.drop(TARGET, axis=1), delta[TARGET], config.get('boost_rounds', 50))
+    seconds = time.time() - started
+    print(f"Warm start: {method} en {seconds:.1f}s")
+
+    # Métrica de selección en el hold-out. Va con otra clave que la de los runs
+    # completos (`metric` es su promedio de CV): evaluate.py evalúa este run
+    # igual que los demás y promote_best_model.py compara las métricas final_*
+    metric = params['metric']
+    score = get_scorer(SCORING[metric])(pipeline, holdout_df.drop(TARGET, axis=1), holdout_df[TARGET])
+
+    with mlflow.start_run(experiment_id=_experiment_id(), run_name=f"incremental-v{parent.version}") as run:
+        mlflow.sklearn.log_model(pipeline, 'model')
+        mlflow.log_params({'warm_start': method, 'delta_rows': len(delta)})
+        mlflow.log_metrics({f'holdout_{metric}': score, 'warm_start_seconds': seconds, 'max_psi': drift[worst] if worst else 0.0})
+        run_id = run.info.run_id
+
+    log_lineage(client, [run_id], train_df, params, {
+        'train_mode': 'incremental',
+        'parent_model_version': str(parent.version),
+        'parent_run_id': parent.run_id,
+    })
+    print(f"✅ Modelo incremental logueado en el run {run_id} ({metric} en hold-out: {score:.4f})")
+    return run_id
+
+
+def _model_exists(client, model_name: str) -> bool:
+    try:
+        client.get_registered_model(model_name)
+        return True
+    except Exception:
+        return False
+
+
+def _experiment_id() -> str:
+    import mlflow
+
+    experiment = mlflow.get_experiment_by_name(EXPERIMENT_NAME)
+    return experiment.experiment_id if experiment else mlflow.create_experiment(EXPERIMENT_NAME)
@@ -0,0 +1,273 @@
+# src/model_selection.py
+"""
+Selección de modelos por eliminación sucesiva (successive halving) en paralelo.
+
+En lugar de correr la validación cruzada completa de todos los candidatos,
+cada ronda evalúa los modelos que siguen en carrera sobre una submuestra
+estratificada del train, descarta los peores y multiplica por `eta` las filas
+de la ronda siguiente:
+
+    ronda 0:  6 modelos x  min_rows filas
+    ronda 1:  3 modelos x  min_rows * 2 filas      (eta = 2)
+    ronda 2:  2 modelos x  min_rows * 4 filas
+
+Los candidatos se evalúan en un pool de `n_jobs` procesos (cada uno limitado a
+un hilo de BLAS/OpenMP, así el total de cores es el configurado). Hay dos
+presupuestos de tiempo:
+
+- por modelo: un candidato que tarda más de `model_time_budget_s` en una
+  ronda, o que según lo que tardó tardaría más en la siguiente (más filas),
+  queda eliminado;
+- global: al vencer `time_budget_min` se cortan las evaluaciones en curso y
+  siguen los mejores hasta ese momento.
+
+Los sobrevivientes pasan a `compare_models` de PyCaret (ver src/train.py).
+"""
+
+import math
+import multiprocessing
+import os
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Métricas de PyCaret (params['metric']) -> scoring de sklearn
+SCORING = {
+    'Accuracy': 'accuracy',
+    'AUC': 'roc_auc',
+    'Recall': 'recall',
+    'Prec.': 'precision',
+    'F1': 'f1',
+    'MCC': 'matthews_corrcoef',
+}
+
+# Datos del train en cada worker (se reciben una vez por proceso)
+_X = None
+_y = None
+
+
+def _init_worker(X, y):
+    global _X, _y
+    _X, _y = X, y
+
+    # Un hilo por worker: el paralelismo lo da el pool
+    from threadpoolctl import threadpool_limits
+    threadpool_limits(1)
+
+
+def _evaluate(model_id: str, estimator, rows: np.ndarray, scoring: str, cv_folds: int, seed: int, time_budget: float):
+    """Valida un candidato sobre las filas de la ronda, fold por fold"""
+    from sklearn.base import clone
+    from sklearn.metrics import get_scorer
+    from sklearn.model_selection import StratifiedKFold
+
+    started = time.time()
+    scorer = get_scorer(scoring)
+    X = _X[rows] if isinstance(_X, np.ndarray) else _X.iloc[rows]
+    y = _y[rows] if isinstance(_y, np.ndarray) else _y.iloc[rows]
+
+    scores = []
+    folds = StratifiedKFold(n_splits=cv_folds, shuffle=True, random_state=seed)
+    for train_idx, test_idx in folds.split(X, y):
+        model = clone(estimator)
+        if model.get_params().get('n_jobs') not in (None, 1):
+            model.set_params(n_jobs=1)
+        model.fit(_take(X, train_idx), _take(y, train_idx))
+        scores.append(scorer(model, _take(X, test_idx), _take(y, test_idx)))
+
+        if time.time() - started > time_budget:
+            return model_id, None, time.time() - started
+
+    return model_id, float(np.mean(scores)), time.time() - started
+
+
+def _take(data, idx):
+    return data[idx] if isinstance(data, np.ndarray) else data.iloc[idx]
+
+
+def _stratified_order(y, seed: int) -> np.ndarray:
+    """
+    Permutación del train en la que cada prefijo mantiene la proporción de
+    clases: las filas de una ronda incluyen a las de la anterior.
+    """
+    rng = np.random.default_rng(seed)
+    y = np.asarray(y)
+    rank = np.empty(len(y))
+    for label in np.unique(y):
+        positions = np.flatnonzero(y == label)
+        rng.shuffle(positions)
+        # Posición relativa dentro de la clase, en [0, 1)
+        rank[positions] = (np.arange(len(positions)) + rng.random()) / len(positions)
+    return np.argsort(rank, kind='stable')
+
+
+def successive_halving(
+    candidates: Dict[str, Any],
+    X,
+    y,
+    scoring: str = 'accuracy',
+    n_jobs: int = -1,
+    min_rows: int = 2000,
+    eta: int = 2,
+    keep: int = 2,
+    cv_folds: int = 3,
+    model_time_budget_s: float = 300.0,
+    time_budget_min: float = 0.0,
+    seed: int = 42,
+) -> Tuple[List[str], List[Dict[str, Any]]]:
+    """
+    Devuelve (ids de los modelos sobrevivientes ordenados del mejor al peor,
+    historial por ronda y modelo).
+
+    `time_budget_min=0` desactiva el presupuesto global.
+    """
+    n_jobs = os.cpu_count() if n_jobs in (None, -1, 0) else n_jobs
+    deadline = time.time() + time_budget_min * 60 if time_budget_min > 0 else None
+    order = _stratified_order(y, seed)
+
+    remaining = list(candidates)
+    ranking: List[str] = remaining
+    history: List[Dict[str, Any]] = []
+    n_rows = min(min_rows, len(order))
+    round_number = 0
+
+    context = multiprocessing.get_context('fork' if 'fork' in multiprocessing.get_all_start_methods() else 'spawn')
+    with context.Pool(processes=min(n_jobs, len(remaining)), initializer=_init_worker, initargs=(X, y)) as pool:
+        while True:
+            rows = np.sort(order[:n_rows])
+            pending = {
+                model_id: pool.apply_async(
+                    _evaluate, (model_id, candidates[model_id], rows, scoring, cv_folds, seed + round_number, model_time_budget_s)
+                )
+                for model_id in remaining
+            }
+
+            results = {}
+            for model_id, result in pending.items():
+                timeout = None if deadline is None else max(0.0, deadline - time.time())
+                try:
+                    results[model_id] = result.get(timeout)
+                except multiprocessing.TimeoutError:
+                    # Vencido el presupuesto se recogen solo los que ya terminaron
+                    continue
+
+            out_of_time = len(results) < len(pending)
+            if out_of_time:
+                # Cortar las evaluaciones que siguen corriendo
+                pool.terminate()
+
+            scored = []
+            for model_id in remaining:
+                if model_id not in results:
+                    score, seconds, status = None, None, 'cancelled'
+                else:
+                    _, score, seconds = results[model_id]
+                    status = 'timeout' if score is None else 'ok'
+                # Un modelo que con eta veces más filas superaría el presupuesto también sale
+                over_budget = status == 'ok' and n_rows < len(order) and seconds * eta > model_time_budget_s
+                history.append({
+                    'round': round_number,
+                    'model': model_id,
+                    'rows': int(n_rows),
+                    'score': score,
+                    'seconds': None if seconds is None else round(seconds, 3),
+                    'status': 'over_budget' if over_budget else status,
+                })
+                if status == 'ok':
+                    scored.append((score, not over_budget, model_id))
+
+            if not scored:
+                # Ningún candidato terminó la ronda: seguir con los de la ronda anterior
+                break
+
+            # Los que entran en el presupuesto primero, después por score
+            scored.sort(key=lambda item: (item[1], item[0]), reverse=True)
+            ranking = [model_id for _, _, model_id in scored]
+            within_budget = [model_id for _, fits, model_id in scored if fits]
+
+            n_keep = max(keep, math.ceil(len(remaining) / eta))
+            remaining = (within_budget or ranking)[:n_keep]
+
+            if out_of_time or len(remaining) <= keep or n_rows >= len(order):
+                ranking = remaining
+                break
+
+            n_rows = min(n_rows * eta, len(order))
+            round_number += 1
+
+    return ranking[:max(keep, 1)], history
+
+
+def format_history(history: List[Dict[str, Any]]) -> str:
+    lines = [f"{'ronda':>5}  {'modelo':<12} {'filas':>8} {'score':>8} {'seg':>8}  estado"]
+    for entry in history:
+        score = '-' if entry['score'] is None else f"{entry['score']:.4f}"
+        seconds = '-' if entry['seconds'] is None else f"{entry['seconds']:.1f}"
+        lines.append(f"{entry['round']:>5}  {entry['model']:<12} {entry['rows']:>8} {score:>8} {seconds:>8}  {entry['status']}")
+    return "\n".join(lines)
+
+
+def halving_candidates(exp, model_ids: List[str]) -> Dict[str, Any]:
+    """Estimadores sin entrenar de PyCaret (mismos hiperparámetros que usa compare_models)"""
+    from pycaret.containers.models.classification import get_all_model_containers
+
+    containers = get_all_model_containers(exp)
+    return {model_id: containers[model_id].class_def(**containers[model_id].args) for model_id in model_ids}
+
+
+def select_models(exp, params: Dict[str, Any], selection: Optional[Dict[str, Any]] = None) -> List[str]:
+    """
+    Filtra `models_to_compare` con successive halving sobre el train ya
+    transformado por el setup de PyCaret.
+    """
+    selection = selection if selection is not None else params.get('model_selection', {})
+    metric = params['metric']
+    if metric not in SCORING:
+        raise ValueError(f"Métrica '{metric}' no soportada por model_selection (opciones: {', '.join(SCORING)})")
+
+    X = exp.get_config('X_train_transformed')
+    y = exp.get_config('y_train_transformed')
+
+    started = time.time()
+    survivors, history = successive_halving(
+        halving_candidates(exp, params['models_to_compare']),
+        X,
+        y,
+        scoring=SCORING[metric],
+        n_jobs=selection.get('n_jobs', -1),
+        min_rows=selection.get('min_rows', 2000),
+        eta=selection.get('eta', 2),
+        keep=selection.get('keep', 2),
+        cv_folds=selection.get('cv_folds', 3),
+        model_time_budget_s=selection.get('model_time_budget_s', 300),
+        time_budget_min=selection.get('time_budget_min', 0),
+        seed=params['seed'],
+    )
+
+    print("--- Successive halving ---")
+    print(format_history(history))
+    print(f"Sobrevivientes: {survivors} ({time.time() - started:.1f}s)")
+    return survivors
+
+
+def compare_candidates(exp, params: Dict[str, Any], n_select: int = 3):
+    """
+    `compare_models` de PyCaret sobre `models_to_compare`.
+
+    En modo 'halving' los candidatos se filtran antes con successive halving
+    y `compare_models` usa lo que quede de `time_budget_min`. En modo
+    'compare' (default) corre como siempre: todos los modelos, sin presupuesto.
+    """
+    selection = params.get('model_selection', {})
+    if selection.get('mode', 'compare') != 'halving':
+        return exp.compare_models(include=params['models_to_compare'], sort=params['metric'], n_select=n_select)
+
+    started = time.time()
+    candidates = select_models(exp, params, selection)
+
+    # Lo que quede del presupuesto global (0 = sin límite), en minutos como espera PyCaret
+    budget_min = selection.get('time_budget_min', 0)
+    budget_time = max(budget_min - (time.time() - started) / 60, 0.1) if budget_min else None
+
+    return exp.compare_models(include=candidates, sort=params['metric'], n_select=n_select, budget_time=budget_time)
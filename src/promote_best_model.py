@@ -2,32 +2,215 @@
 Script para promover el mejor modelo a Production en MLflow Model Registry.
 
 Este script:
-1. Busca el mejor run en el experimento basándose en una métrica (ej: final_accuracy).
+1. Busca el mejor run en el experimento basándose en una métrica (ej: final_accuracy)
+   entre los que cumplen los presupuestos de latencia, tamaño y memoria
+   (`promotion.budgets`, medidos por evaluate.py). Si hay un reporte del
+   scoring en sombra de la API (`promotion.shadow`) y el candidato es el
+   challenger evaluado, también debe cumplir el acuerdo con el champion y la
+   latencia observados en tráfico real.
 2. Registra el modelo en el Model Registry si no está registrado.
-3. Promueve la versión a stage 'Production'.
+3. Opcionalmente exporta el pipeline a un backend compilado (ONNX + tablas de
+   preprocesamiento) y verifica que prediga igual que el original.
+4. Promueve la versión a stage 'Production' y la anota en
+   outputs/promoted_model.json (salida de la etapa `promote_model` de DVC,
+   de la que depende `score_store`).
+
+Se ejecuta como módulo desde la raíz del repo:
+    python -m src.promote_best_model
 """
 
 import mlflow
 from mlflow.tracking import MlflowClient
+import json
 import os
-import yaml
-from dotenv import load_dotenv
+import sys
+import tempfile
+import urllib.request
+import pandas as pd
+
+from src.api.compiled import CompiledModel, CompiledPreprocessor, ONNX_FILE, PREPROCESSOR_FILE
+from src.api.fast_path import FastPath, unwrap_pipeline
+from src.api.shadow import read_log, summarize
+from src.incremental import LINEAGE_TAGS
+from src.utils import holdout_split, load_dataset, load_params, setup_mlflow
+
+PROMOTED_MODEL_FILE = "outputs/promoted_model.json"
+
+# Presupuesto en params.yaml (promotion.budgets) -> métrica logueada por evaluate.py
+BUDGET_METRICS = {
+    'max_latency_p99_ms': 'latency_p99_ms',
+    'max_batch_ms_per_row': 'batch_ms_per_row',
+    'max_model_size_mb': 'model_size_mb',
+    'max_peak_memory_mb': 'peak_memory_mb',
+}
+
+def convert_to_onnx(estimator, n_features):
+    """Convierte el estimador final del pipeline a ONNX (sklearn o xgboost)"""
+    from skl2onnx import convert_sklearn, update_registered_converter
+    from skl2onnx.common.data_types import FloatTensorType
+    from skl2onnx.common.shape_calculator import calculate_linear_classifier_output_shapes
+    
+    # Registrar el conversor de xgboost si está disponible
+    try:
+        from xgboost import XGBClassifier
+        from onnxmltools.convert.xgboost.operator_converters.XGBoost import convert_xgboost
+        
+        update_registered_converter(
+            XGBClassifier,
+            "XGBoostXGBClassifier",
+            calculate_linear_classifier_output_shapes,
+            convert_xgboost,
+            options={"nocl": [True, False], "zipmap": [True, False, "columns"]}
+        )
+    except ImportError:
+        pass
+    
+    onnx_model = convert_sklearn(
+        estimator,
+        initial_types=[("input", FloatTensorType([None, n_features]))],
+        options={id(estimator): {"zipmap": False}}
+    )
+    return onnx_model.SerializeToString()
+
+def export_compiled_model(client, run_id, params):
+    """
+    Exporta el pipeline del run a un backend compilado y lo loguea en el run.
+    
+    El preprocesamiento se compila en tablas (src/api/fast_path.py) usando
+    todas las categorías del dataset, y el estimador final se convierte a
+    ONNX. Falla si las predicciones compiladas difieren del pipeline original
+    en el hold-out más de lo permitido por `promotion.onnx_max_mismatch_rate`.
+    """
+    promotion = params.get('promotion', {})
+    max_mismatch_rate = promotion.get('onnx_max_mismatch_rate', 0.0)
+    
+    print("Exportando backend compilado (ONNX)...")
+    pipeline = unwrap_pipeline(mlflow.sklearn.load_model(f"runs:/{run_id}/model"))
+    
+    df = load_dataset(params)
+    rows = df.drop('churn', axis=1).to_dict('records')
+    
+    # Compilar el preprocesamiento aprendiendo todas las categorías del dataset
+    fast_path = FastPath(pipeline, rows[0], max_categories=len(rows) + 1)
+    X = fast_path.encode(rows)
+    if X is None:
+        raise RuntimeError("No se pudo compilar el preprocesamiento del pipeline")
+    fast_path.add_unknown()
+    
+    onnx_bytes = convert_to_onnx(fast_path.estimator, X.shape[1])
+    compiled = CompiledModel(CompiledPreprocessor.from_dict(fast_path.to_dict()), onnx_bytes)
+    
+    # Verificar contra el pipeline original en el hold-out
+    _, holdout_idx = holdout_split(params, df)
+    data_unseen = df.iloc[holdout_idx]
+    X_unseen = data_unseen.drop('churn', axis=1)
+    expected = [int(p) for p in pipeline.predict(X_unseen)]
+    actual = compiled.predict(X_unseen.to_dict('records'))
+    
+    mismatches = sum(1 for a, b in zip(actual, expected) if a != b)
+    mismatch_rate = mismatches / len(expected)
+    print(f"   Diferencias ONNX vs pipeline en hold-out: {mismatches}/{len(expected)} ({mismatch_rate:.4%})")
+    
+    if mismatch_rate > max_mismatch_rate:
+        raise RuntimeError(
+            f"El modelo compilado difiere del original en {mismatch_rate:.4%} del hold-out "
+            f"(máximo permitido {max_mismatch_rate:.4%}). No se promueve el modelo."
+        )
+    
+    # Loguear como artefacto `compiled/` del mismo run que la versión registrada
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        with open(os.path.join(tmp_dir, PREPROCESSOR_FILE), "w") as f:
+            json.dump(compiled.preprocessor.to_dict(), f)
+        with open(os.path.join(tmp_dir, ONNX_FILE), "wb") as f:
+            f.write(onnx_bytes)
+        client.log_artifacts(run_id, tmp_dir, artifact_path="compiled")
+    
+    print("✅ Backend compilado logueado en el run como 'compiled/'")
+    return mismatch_rate
+
+def budget_violations(run, budgets):
+    """
+    Presupuestos de `promotion.budgets` que el run no cumple (lista vacía si
+    entra en todos). Un presupuesto sin medición en el run se omite con un
+    aviso: el run se evaluó antes de que evaluate.py midiera costos, o la
+    métrica no se puede medir en esa plataforma (peak_memory_mb solo en Linux).
+    """
+    violations = []
+    for budget, metric in BUDGET_METRICS.items():
+        limit = budgets.get(budget)
+        if not limit:
+            continue
+        value = run.get(f"metrics.{metric}")
+        if value is None or pd.isna(value):
+            print(f"   ⚠️ {run['run_id']} no tiene {metric}: no se controla {budget}")
+        elif value > limit:
+            violations.append(f"{metric} = {value:.2f} > {limit}")
+    return violations
+
+def load_shadow_report(source):
+    """
+    Reporte del scoring en sombra desde la URL de GET /shadow de la API, un
+    JSON guardado de ese endpoint o el log JSONL de SHADOW_LOG_PATH.
+    Devuelve None si no se puede leer o si es el reporte parcial de un
+    worker del servidor pre-fork.
+    """
+    try:
+        if source.startswith(("http://", "https://")):
+            with urllib.request.urlopen(source, timeout=10) as response:
+                report = json.load(response)
+        elif source.endswith(".jsonl"):
+            return summarize(read_log(source))
+        else:
+            with open(source) as f:
+                report = json.load(f)
+    except Exception as e:
+        print(f"⚠️ No se pudo leer el reporte de sombra {source}: {e}")
+        return None
+    
+    # Servidor pre-fork sin SHADOW_LOG_PATH: contadores de un solo worker
+    if report.get("scope") == "worker":
+        print(f"⚠️ El reporte de sombra {source} cubre solo el worker {report.get('pid')} del servidor pre-fork; "
+              f"se ignora (configurar SHADOW_LOG_PATH en la API o usar el log como reporte)")
+        return None
+    return report
+
+def shadow_violations(run_id, report, shadow):
+    """
+    Condiciones de `promotion.shadow` que el run no cumple según el reporte
+    del scoring en sombra. Solo aplica si el run es el challenger del
+    reporte; si no lo es, no hay evidencia y cuenta como no cumplido solo
+    con `required: true`.
+    """
+    challenger_run_id = (report or {}).get("challenger", {}).get("run_id")
+    if challenger_run_id != run_id:
+        return ["sin evidencia de scoring en sombra"] if shadow.get('required', False) else []
+    
+    violations = []
+    comparisons = report.get("comparisons", 0)
+    min_comparisons = shadow.get('min_comparisons', 0)
+    if comparisons < min_comparisons:
+        violations.append(f"{comparisons} comparaciones en sombra < {min_comparisons}")
+    
+    agreement = report.get("agreement_rate")
+    min_agreement = shadow.get('min_agreement')
+    if min_agreement and (agreement is None or agreement < min_agreement):
+        violations.append(f"acuerdo con el champion {agreement} < {min_agreement}")
+    
+    max_ratio = shadow.get('max_latency_p99_ratio')
+    latency = report.get("latency_ms", {})
+    champion_p99 = latency.get("champion", {}).get("p99")
+    challenger_p99 = latency.get("challenger", {}).get("p99")
+    if max_ratio and champion_p99 and challenger_p99 is not None and challenger_p99 > max_ratio * champion_p99:
+        violations.append(f"latencia p99 en sombra {challenger_p99:.2f} ms > {max_ratio} x {champion_p99:.2f} ms del champion")
+    
+    return violations
 
 def promote_best_model():
     # Cargar configuración
-    load_dotenv()
-    
-    with open('params.yaml') as f:
-        params = yaml.safe_load(f)
+    params = load_params()
     
     # Configurar MLflow
-    track_remote = params.get('track_to_dagshub', False) or os.getenv('TRACK_TO_DAGSHUB') == 'true'
-    
-    if track_remote:
-        load_dotenv()
-        tracking_uri = os.getenv('MLFLOW_TRACKING_URI') or params.get('dagshub_tracking_uri')
-        if tracking_uri:
-            mlflow.set_tracking_uri(tracking_uri)
+    setup_mlflow(params)
     
     experiment_name = "telco-churn-prediction"
     model_name = "telco-churn-prediction"
@@ -37,20 +220,46 @@ def promote_best_model():
     
     print(f"Buscando el mejor modelo en experimento '{experiment_name}' por métrica '{metric_name}'...")
     
-    # Buscar el mejor run
-    best_run = mlflow.search_runs(
+    # Buscar los candidatos, del mejor al peor
+    runs = mlflow.search_runs(
         experiment_names=[experiment_name],
         filter_string=f"metrics.{metric_name} > 0",  # Solo runs con esta métrica
         order_by=[f"metrics.{metric_name} DESC"],
-        max_results=1
+        max_results=100
     )
     
-    if best_run.empty:
+    if runs.empty:
         print(f"ERROR: No se encontraron runs con la métrica '{metric_name}'.")
-        return
+        sys.exit(1)
+    
+    # Evidencia del scoring en sombra de la API (opcional)
+    shadow = params.get('promotion', {}).get('shadow', {})
+    shadow_source = os.getenv('SHADOW_REPORT') or shadow.get('report')
+    shadow_report = load_shadow_report(shadow_source) if shadow_source else None
+    if shadow_report is not None:
+        print(
+            f"Reporte de sombra: challenger v{shadow_report.get('challenger', {}).get('version')} "
+            f"(run {shadow_report.get('challenger', {}).get('run_id')}), "
+            f"{shadow_report.get('comparisons', 0)} comparaciones, acuerdo {shadow_report.get('agreement_rate')}"
+        )
+    
+    # El mejor que entra en los presupuestos de latencia, tamaño y memoria
+    # (y, si es el challenger en sombra, en las condiciones de promotion.shadow)
+    budgets = params.get('promotion', {}).get('budgets', {})
+    best_run = None
+    for _, run in runs.iterrows():
+        violations = budget_violations(run, budgets) + shadow_violations(run["run_id"], shadow_report, shadow)
+        if not violations:
+            best_run = run
+            break
+        print(f"   Descartado {run['run_id']} ({metric_name} = {run[f'metrics.{metric_name}']:.4f}): {'; '.join(violations)}")
+    
+    if best_run is None:
+        print(f"ERROR: Ningún run con '{metric_name}' entra en los presupuestos {budgets} ni en las condiciones de sombra {shadow}.")
+        sys.exit(1)
     
-    best_run_id = best_run.iloc[0]["run_id"]
-    best_metric_value = best_run.iloc[0][f"metrics.{metric_name}"]
+    best_run_id = best_run["run_id"]
+    best_metric_value = best_run[f"metrics.{metric_name}"]
     
     print(f"✅ Mejor run encontrado: {best_run_id}")
     print(f"   {metric_name}: {best_metric_value:.4f}")
@@ -66,6 +275,12 @@ def promote_best_model():
         print(f"Modelo '{model_name}' no existe. Creándolo...")
         client.create_registered_model(model_name)
     
+    # Exportar el backend compilado antes de registrar: si las predicciones
+    # compiladas difieren del original, la promoción se aborta
+    export_onnx = params.get('promotion', {}).get('export_onnx', False) or os.getenv('EXPORT_ONNX') == 'true'
+    if export_onnx:
+        export_compiled_model(client, best_run_id, params)
+    
     # Registrar la versión del modelo desde el run
     model_uri = f"runs:/{best_run_id}/model"
     
@@ -74,6 +289,20 @@ def promote_best_model():
     
     print(f"✅ Modelo registrado como versión {model_version.version}")
     
+    if export_onnx:
+        client.set_model_version_tag(model_name, model_version.version, "compiled_backend", "onnx")
+    
+    # Linaje del entrenamiento (completo o incremental desde otra versión)
+    run_tags = client.get_run(best_run_id).data.tags
+    for key in LINEAGE_TAGS:
+        if key in run_tags:
+            client.set_model_version_tag(model_name, model_version.version, key, run_tags[key])
+    
+    # Evidencia en tráfico real del challenger promovido
+    if shadow_report is not None and shadow_report.get("challenger", {}).get("run_id") == best_run_id:
+        client.set_model_version_tag(model_name, model_version.version, "shadow_comparisons", str(shadow_report.get("comparisons")))
+        client.set_model_version_tag(model_name, model_version.version, "shadow_agreement_rate", str(shadow_report.get("agreement_rate")))
+    
     # Promover a Production
     print(f"Promoviendo versión {model_version.version} a stage 'Production'...")
     
@@ -94,6 +323,16 @@ def promote_best_model():
     )
     
     print(f"✅ Versión {model_version.version} promovida a Production exitosamente.")
+    
+    # Versión promovida para DVC: si cambia, la etapa score_store se vuelve a ejecutar
+    os.makedirs(os.path.dirname(PROMOTED_MODEL_FILE), exist_ok=True)
+    with open(PROMOTED_MODEL_FILE, "w") as f:
+        json.dump({
+            "model_name": model_name,
+            "version": model_version.version,
+            "run_id": best_run_id,
+            metric_name: best_metric_value,
+        }, f, indent=2)
     print(f"\nEl modelo está listo para ser usado por la API en AWS Lambda.")
 
 if __name__ == "__main__":
@@ -0,0 +1,173 @@
+# src/score.py
+"""
+Scoring masivo de clientes sin pasar por la API.
+
+Carga el mismo modelo del Model Registry que usa src/api/app.py, lee la
+entrada (CSV o JSONL) en bloques de tamaño fijo, reparte los bloques entre
+procesos (cada uno carga el modelo una sola vez) y escribe las predicciones
+a medida que llegan, en CSV o Parquet. La memoria se mantiene acotada
+porque solo hay unos pocos bloques en vuelo a la vez.
+
+Uso:
+    python -m src.score --input data/processed/telco_churn_processed.parquet \\
+        --output outputs/scores/scores.csv --chunk-size 10000 --workers 4
+"""
+
+import argparse
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import mlflow
+import pandas as pd
+from dotenv import load_dotenv
+
+from src.api.model_cache import fetch_model
+
+# Columnas de la entrada que no son features del modelo
+NON_FEATURE_COLUMNS = ["churn"]
+
+# Modelo cargado en cada proceso worker
+_worker_model = None
+
+
+def _init_worker(model_path):
+    """Carga el modelo una sola vez por proceso"""
+    global _worker_model
+    _worker_model = mlflow.pyfunc.load_model(model_path)
+
+
+def _score_chunk(chunk: pd.DataFrame) -> pd.DataFrame:
+    features = chunk.drop(columns=[c for c in NON_FEATURE_COLUMNS if c in chunk.columns])
+    predictions = [int(p) for p in _worker_model.predict(features)]
+
+    return pd.DataFrame({
+        "customer_id": chunk["customer_id"].values,
+        "churn_prediction": predictions,
+        "churn_risk": ["HIGH" if p == 1 else "LOW" for p in predictions],
+    })
+
+
+def _read_parquet_chunks(path: str, chunk_size: int):
+    import pyarrow.parquet as pq
+
+    for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+        yield batch.to_pandas()
+
+
+def read_chunks(path: str, chunk_size: int):
+    """Lee la entrada en bloques según su extensión (.parquet, .csv o .jsonl)"""
+    if path.endswith(".parquet"):
+        return _read_parquet_chunks(path, chunk_size)
+    if path.endswith(".jsonl") or path.endswith(".json"):
+        return pd.read_json(path, lines=True, chunksize=chunk_size)
+    return pd.read_csv(path, chunksize=chunk_size)
+
+
+class ScoreWriter:
+    """Escribe las predicciones de forma incremental en CSV o Parquet"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.parquet = path.endswith(".parquet")
+        self._writer = None
+        self._first = True
+
+        output_dir = os.path.dirname(path)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+
+    def write(self, df: pd.DataFrame):
+        if self.parquet:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if self._writer is None:
+                self._writer = pq.ParquetWriter(self.path, table.schema)
+            self._writer.write_table(table)
+        else:
+            df.to_csv(self.path, mode="w" if self._first else "a", header=self._first, index=False)
+        self._first = False
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+def score(input_path: str, output_path: str, chunk_size: int, workers: int, model_name: str, stage: str):
+    load_dotenv()
+    tracking_uri = os.getenv("MLFLOW_TRACKING_URI")
+    if tracking_uri:
+        mlflow.set_tracking_uri(tracking_uri)
+
+    # Resolver el modelo una sola vez; los workers lo cargan desde disco
+    model_path, info = fetch_model(model_name, stage)
+    print(f"Modelo: {model_name} ({stage}) v{info['version']} desde {info['source']}")
+    print(f"Scoring de {input_path} -> {output_path} con {workers} workers, bloques de {chunk_size} filas")
+
+    writer = ScoreWriter(output_path)
+    started = time.perf_counter()
+    rows = 0
+    chunks = 0
+
+    # Ventana acotada de bloques en vuelo: la lectura avanza solo a medida
+    # que se escriben resultados, así la memoria no crece con la entrada
+    max_in_flight = workers * 2
+    in_flight = deque()
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(model_path,)) as pool:
+            for chunk in read_chunks(input_path, chunk_size):
+                in_flight.append(pool.submit(_score_chunk, chunk))
+
+                if len(in_flight) >= max_in_flight:
+                    result = in_flight.popleft().result()
+                    writer.write(result)
+                    rows += len(result)
+                    chunks += 1
+                    elapsed = time.perf_counter() - started
+                    print(f"  {rows} filas ({rows / elapsed:,.0f} filas/s)", file=sys.stderr)
+
+            while in_flight:
+                result = in_flight.popleft().result()
+                writer.write(result)
+                rows += len(result)
+                chunks += 1
+    finally:
+        writer.close()
+
+    elapsed = time.perf_counter() - started
+    report = {
+        "rows": rows,
+        "chunks": chunks,
+        "workers": workers,
+        "seconds": round(elapsed, 3),
+        "rows_per_second": round(rows / elapsed, 1) if elapsed > 0 else 0.0,
+        "model_version": info["version"],
+    }
+
+    print("\n--- Resumen de scoring ---")
+    for key, value in report.items():
+        print(f"  {key}: {value}")
+
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scoring masivo de clientes con el modelo del Model Registry")
+    parser.add_argument("--input", required=True, help="Archivo de entrada (.parquet, .csv o .jsonl)")
+    parser.add_argument("--output", required=True, help="Archivo de salida (.csv o .parquet)")
+    parser.add_argument("--chunk-size", type=int, default=10000, help="Filas por bloque")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Procesos en paralelo")
+    parser.add_argument("--model-name", default=os.getenv("MLFLOW_MODEL_NAME", "telco-churn-prediction"))
+    parser.add_argument("--stage", default=os.getenv("MLFLOW_MODEL_STAGE", "Production"))
+    args = parser.parse_args()
+
+    score(args.input, args.output, args.chunk_size, args.workers, args.model_name, args.stage)
+
+
+if __name__ == "__main__":
+    main()
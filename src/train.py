@@ -1,63 +1,68 @@
 # src/train.py (usando PyCaret y MLflow)
+import time
+
+from mlflow.tracking import MlflowClient
 from pycaret.classification import *
-import yaml
-import pandas as pd
-import os
-import mlflow
-from dotenv import load_dotenv
+
+from src.incremental import FullRetrain, incremental_enabled, incremental_train, log_lineage, runs_since
+from src.model_selection import compare_candidates
+from src.tuning import tune_with_optuna
+from src.utils import load_params, load_split, setup_mlflow
 
 def train_model():
     # Cargar parámetros PRIMERO
-    with open('params.yaml') as f:
-        params = yaml.safe_load(f)
-
-    # --- MLflow setup ---
-    # --- MLflow setup ---
-    track_remote = params.get('track_to_dagshub', False) or os.getenv('TRACK_TO_DAGSHUB') == 'true'
+    params = load_params()
+    setup_mlflow(params)
     
-    if track_remote:
-        # Si vamos a DagsHub, cargar credenciales y configurar URI
-        load_dotenv()
-        # Si la URI viene por variable de entorno (CI), usarla. Si no, usar params.
-        tracking_uri = os.getenv('MLFLOW_TRACKING_URI') or params.get('dagshub_tracking_uri')
-        if tracking_uri:
-            mlflow.set_tracking_uri(tracking_uri)
-    else:
-        # Si es local, asegurarse de que no haya URI de tracking de DagsHub
-        if 'MLFLOW_TRACKING_URI' in os.environ:
-            del os.environ['MLFLOW_TRACKING_URI']
-        if 'MLFLOW_TRACKING_USERNAME' in os.environ:
-            del os.environ['MLFLOW_TRACKING_USERNAME']
-        if 'MLFLOW_TRACKING_PASSWORD' in os.environ:
-            del os.environ['MLFLOW_TRACKING_PASSWORD']
-        
-    # Cargar datos procesados
-    df = pd.read_csv(params['data_read_csv'])
+    # Cargar datos procesados con la partición train / hold-out compartida
+    # (evaluate.py y promote_best_model.py usan el mismo hold-out)
+    train_df, holdout_df = load_split(params)
+    started = time.time()
+    
+    # Modo incremental: actualizar el modelo en Production solo con las filas nuevas
+    fallback_reason = None
+    if incremental_enabled(params):
+        try:
+            incremental_train(params, train_df, holdout_df)
+            return
+        except FullRetrain as e:
+            fallback_reason = e.reason
+            print(f"Reentrenamiento completo: {e}")
     
     # Setup PyCaret - esto leerá las variables de entorno de MLflow y lo configurará todo
     exp = ClassificationExperiment()
     exp.setup(
-        data=df, 
+        data=train_df,
+        test_data=holdout_df,
         target='churn',
-        train_size=params['train_size'],
         session_id=params['seed'],
         log_experiment=True, # Activar logging a MLflow
         experiment_name="telco-churn-prediction"
     )
     
-    # Comparar modelos automáticamente (PyCaret logueará todo)
-    best_models = exp.compare_models(
-        include=params['models_to_compare'],
-        sort=params['metric'],
-        n_select=3
-    )
+    # Comparar modelos automáticamente (PyCaret logueará todo); con
+    # model_selection.mode 'halving' antes se descartan los candidatos flojos o lentos
+    best_models = compare_candidates(exp, params)
+    if not isinstance(best_models, list):
+        best_models = [best_models]
     
     # Seleccionar y tunear el mejor
-    best_model = exp.tune_model(best_models[0])
+    tuning = params.get('tuning', {})
+    if tuning.get('mode', 'pycaret') == 'optuna':
+        # Búsqueda con poda y estudio persistente (se retoma si dvc repro se repite)
+        best_model = tune_with_optuna(exp, best_models[0], params, tuning)
+    else:
+        best_model = exp.tune_model(best_models[0])
     
     # Finalizar modelo
     final_model = exp.finalize_model(best_model)
     
+    # Linaje (filas y esquema del train) en los runs de esta corrida, para el modo incremental
+    tags = {'train_mode': 'full'}
+    if fallback_reason:
+        tags['full_retrain_reason'] = fallback_reason
+    log_lineage(MlflowClient(), runs_since(started), train_df, params, tags)
+    
     # No es necesario guardar el modelo localmente, MLflow se encarga
     # print("Modelo guardado en MLflow")
 
@@ -0,0 +1,257 @@
+# src/tuning.py
+"""
+Búsqueda de hiperparámetros con Optuna, poda de trials y estudio persistente.
+
+Reemplaza la búsqueda aleatoria de `tune_model` (CV completa en cada trial):
+
+- El espacio de búsqueda es el mismo que usa PyCaret para el modelo.
+- Cada trial valida fold por fold e informa el score parcial; el pruner
+  (`median` o `asha`) corta los trials que van peor que los anteriores
+  después de los primeros folds.
+- Los trials corren en `n_jobs` procesos que comparten el estudio en SQLite
+  (`tuning.storage`). El estudio se identifica por modelo, dataset, partición
+  y métrica, así que si `dvc repro` se interrumpe o se repite con los mismos
+  datos continúa desde los trials ya hechos hasta completar `n_trials`.
+- El primer trial de un estudio nuevo son los hiperparámetros del modelo
+  de compare_models: el resultado nunca es peor que no tunear.
+"""
+
+import multiprocessing
+import os
+import time
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from src.model_selection import SCORING
+from src.utils import split_key
+
+# Estado de cada worker (se recibe una vez por proceso)
+_worker: Dict[str, Any] = {}
+
+
+def _storage(path: str):
+    import optuna
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    # Los workers comparten el archivo: esperar el lock de SQLite en lugar de fallar
+    return optuna.storages.RDBStorage(f"sqlite:///{path}", engine_kwargs={"connect_args": {"timeout": 60}})
+
+
+def _pruner(name: str):
+    import optuna
+
+    if name == 'asha':
+        return optuna.pruners.SuccessiveHalvingPruner()
+    if name == 'median':
+        return optuna.pruners.MedianPruner(n_startup_trials=5, n_warmup_steps=1)
+    raise ValueError(f"Pruner '{name}' no soportado (opciones: median, asha)")
+
+
+def _suggest(trial, name: str, distribution):
+    import optuna
+
+    if isinstance(distribution, optuna.distributions.CategoricalDistribution):
+        return trial.suggest_categorical(name, distribution.choices)
+    if isinstance(distribution, optuna.distributions.IntDistribution):
+        return trial.suggest_int(name, distribution.low, distribution.high, step=distribution.step, log=distribution.log)
+    return trial.suggest_float(name, distribution.low, distribution.high, step=distribution.step, log=distribution.log)
+
+
+def _contains(distribution, value) -> bool:
+    import optuna
+
+    if isinstance(distribution, optuna.distributions.CategoricalDistribution):
+        return value in distribution.choices
+    return isinstance(value, (int, float)) and distribution.low <= value <= distribution.high
+
+
+def _init_worker(estimator, space, X, y, scoring, cv_folds, seed):
+    _worker.update(estimator=estimator, space=space, X=X, y=y, scoring=scoring, cv_folds=cv_folds, seed=seed)
+
+    # Un hilo por worker: el paralelismo lo dan los procesos
+    from threadpoolctl import threadpool_limits
+    threadpool_limits(1)
+
+
+def _objective(trial):
+    import optuna
+    from sklearn.base import clone
+    from sklearn.metrics import get_scorer
+    from sklearn.model_selection import StratifiedKFold
+
+    X, y = _worker['X'], _worker['y']
+    model = clone(_worker['estimator'])
+    model.set_params(**{name: _suggest(trial, name, dist) for name, dist in _worker['space'].items()})
+    if model.get_params().get('n_jobs') not in (None, 1):
+        model.set_params(n_jobs=1)
+
+    scorer = get_scorer(_worker['scoring'])
+    folds = StratifiedKFold(n_splits=_worker['cv_folds'], shuffle=True, random_state=_worker['seed'])
+    scores = []
+    for step, (train_idx, test_idx) in enumerate(folds.split(X, y)):
+        fold_model = clone(model)
+        fold_model.fit(_take(X, train_idx), _take(y, train_idx))
+        scores.append(scorer(fold_model, _take(X, test_idx), _take(y, test_idx)))
+
+        trial.report(float(np.mean(scores)), step)
+        if trial.should_prune():
+            raise optuna.TrialPruned()
+
+    return float(np.mean(scores))
+
+
+def _take(data, idx):
+    return data[idx] if isinstance(data, np.ndarray) else data.iloc[idx]
+
+
+def _run_worker(
+    storage_path: str,
+    study_name: str,
+    n_trials: int,
+    quota: int,
+    timeout: Optional[float],
+    sampler_seed: int,
+    pruner: str,
+):
+    import optuna
+    from optuna.study import MaxTrialsCallback
+    from optuna.trial import TrialState
+
+    optuna.logging.set_verbosity(optuna.logging.WARNING)
+    study = optuna.load_study(
+        study_name=study_name,
+        storage=_storage(storage_path),
+        sampler=optuna.samplers.TPESampler(seed=sampler_seed),
+        pruner=_pruner(pruner),
+    )
+    study.optimize(
+        _objective,
+        # `quota`: los trials que le tocan a este worker. Con solo el callback,
+        # los workers que ya empezaron un trial cuando otro completa el total
+        # lo terminan igual y el estudio se pasa de n_trials
+        n_trials=quota,
+        timeout=timeout,
+        # n_trials es el total del estudio (todos los workers y corridas anteriores);
+        # los trials que quedaron RUNNING en una corrida interrumpida no cuentan
+        callbacks=[MaxTrialsCallback(n_trials, states=(TrialState.COMPLETE, TrialState.PRUNED))],
+        catch=(ValueError,),
+    )
+
+
+def _model_container(exp, estimator):
+    from pycaret.containers.models.classification import get_all_model_containers
+
+    for model_id, container in get_all_model_containers(exp).items():
+        if type(estimator) is container.class_def:
+            return model_id, container
+    return None, None
+
+
+def optuna_search(estimator, space: Dict[str, Any], X, y, study_name: str, tuning: Dict[str, Any], scoring: str, seed: int):
+    """
+    Corre (o continúa) el estudio y devuelve los mejores hiperparámetros, o
+    None si ningún trial terminó.
+    """
+    import optuna
+    from optuna.trial import TrialState
+
+    storage_path = tuning.get('storage', 'outputs/tuning/optuna.sqlite')
+    n_trials = tuning.get('n_trials', 50)
+    n_jobs = tuning.get('n_jobs', -1)
+    n_jobs = os.cpu_count() if n_jobs in (None, -1, 0) else n_jobs
+    timeout_min = tuning.get('timeout_min', 0)
+    pruner = tuning.get('pruner', 'median')
+    cv_folds = tuning.get('cv_folds', 5)
+
+    study = optuna.create_study(
+        study_name=study_name,
+        storage=_storage(storage_path),
+        direction='maximize',
+        load_if_exists=True,
+    )
+    started = time.time()
+    if not study.get_trials(deepcopy=False):
+        # Primer trial: los hiperparámetros actuales del modelo (los que estén
+        # dentro del espacio). Se evalúa en este proceso antes de lanzar los
+        # workers: si lo tomaran de la cola en paralelo, con SQLite más de uno
+        # puede correr el mismo trial encolado
+        current = estimator.get_params()
+        study.enqueue_trial({name: current[name] for name, dist in space.items() if _contains(dist, current.get(name))})
+        _worker.update(estimator=estimator, space=space, X=X, y=y, scoring=scoring, cv_folds=cv_folds, seed=seed)
+        study.optimize(_objective, n_trials=1, catch=(ValueError,))
+    finished = [t for t in study.get_trials(deepcopy=False) if t.state in (TrialState.COMPLETE, TrialState.PRUNED)]
+    print(f"Estudio '{study_name}': {len(finished)}/{n_trials} trials hechos, {n_jobs} procesos")
+
+    remaining = n_trials - len(finished)
+    if remaining > 0:
+        timeout = timeout_min * 60 if timeout_min > 0 else None
+        # Los trials que faltan, repartidos entre los workers
+        n_workers = min(n_jobs, remaining)
+        quotas = [remaining // n_workers + (1 if i < remaining % n_workers else 0) for i in range(n_workers)]
+        context = multiprocessing.get_context('fork' if 'fork' in multiprocessing.get_all_start_methods() else 'spawn')
+        with context.Pool(
+            processes=n_workers,
+            initializer=_init_worker,
+            initargs=(estimator, space, X, y, scoring, cv_folds, seed),
+        ) as pool:
+            workers = [
+                pool.apply_async(_run_worker, (storage_path, study_name, n_trials, quota, timeout, seed + i, pruner))
+                for i, quota in enumerate(quotas)
+            ]
+            for worker in workers:
+                worker.get()
+
+    trials = study.get_trials(deepcopy=False)
+    states = {state.name: sum(1 for t in trials if t.state == state) for state in (TrialState.COMPLETE, TrialState.PRUNED, TrialState.FAIL)}
+    print(f"Trials: {states} ({time.time() - started:.1f}s en esta corrida)")
+
+    if not any(t.state == TrialState.COMPLETE for t in trials):
+        return None
+    print(f"Mejor trial #{study.best_trial.number}: {params_summary(study.best_params)} -> {study.best_value:.4f}")
+    return study.best_params
+
+
+def params_summary(values: Dict[str, Any]) -> str:
+    return ", ".join(f"{k}={v:.4g}" if isinstance(v, float) else f"{k}={v}" for k, v in values.items())
+
+
+def tune_with_optuna(exp, estimator, params: Dict[str, Any], tuning: Optional[Dict[str, Any]] = None):
+    """
+    Tunea `estimator` (salida de compare_models) y lo vuelve a entrenar con
+    PyCaret (`create_model`) para que quede logueado en MLflow como con
+    tune_model.
+    """
+    from sklearn.base import clone
+
+    tuning = tuning if tuning is not None else params.get('tuning', {})
+    metric = params['metric']
+    if metric not in SCORING:
+        raise ValueError(f"Métrica '{metric}' no soportada por tuning (opciones: {', '.join(SCORING)})")
+
+    model_id, container = _model_container(exp, estimator)
+    if container is None or not container.tune_distribution:
+        print(f"Sin espacio de búsqueda para {type(estimator).__name__}, se usa tune_model de PyCaret")
+        return exp.tune_model(estimator)
+
+    space = {name: dist.get_optuna_distribution() for name, dist in container.tune_distribution.items()}
+    study_name = f"{model_id}-{split_key(params)}-{metric}-cv{tuning.get('cv_folds', 5)}"
+
+    best_params = optuna_search(
+        estimator,
+        space,
+        exp.get_config('X_train_transformed'),
+        exp.get_config('y_train_transformed'),
+        study_name,
+        tuning,
+        SCORING[metric],
+        params['seed'],
+    )
+    if best_params is None:
+        print("Ningún trial terminó, se usa el modelo sin tunear")
+        return estimator
+
+    tuned = clone(estimator).set_params(**best_params)
+    return exp.create_model(tuned, verbose=False)
@@ -0,0 +1,155 @@
+# src/utils.py
+"""
+Utilidades compartidas por las etapas del pipeline (train, evaluate, promote).
+
+- `load_params`: lee params.yaml.
+- `setup_mlflow`: configura el tracking de MLflow (DagsHub o local).
+- `load_dataset`: lee el Parquet procesado una sola vez por proceso.
+- `holdout_split`: partición train / hold-out determinística y estable por
+  cliente (ver `_compute_split`). Los índices se guardan como .npy en
+  `split.cache_dir/<hash del dataset>-seed<seed>-train<train_size>/` y las
+  etapas siguientes los abren con mmap en lugar de volver a particionar, así
+  que train, evaluate y promote usan exactamente el mismo hold-out.
+"""
+
+import hashlib
+import os
+import shutil
+import tempfile
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import yaml
+
+TARGET = 'churn'
+ID_COLUMN = 'customer_id'
+
+TRAIN_INDEX_FILE = 'train_idx.npy'
+HOLDOUT_INDEX_FILE = 'holdout_idx.npy'
+
+# Dataset ya leído en este proceso, por ruta (con el tamaño y la fecha de
+# modificación del archivo: si se reescribe se vuelve a leer)
+_datasets: Dict[str, Tuple[Tuple[int, int], pd.DataFrame]] = {}
+
+
+def load_params(path: str = 'params.yaml') -> Dict[str, Any]:
+    with open(path) as f:
+        return yaml.safe_load(f)
+
+
+def setup_mlflow(params: Dict[str, Any]) -> bool:
+    """
+    Configura MLflow para trackear en DagsHub o en local.
+
+    Devuelve True si se trackea en remoto.
+    """
+    import mlflow
+    from dotenv import load_dotenv
+
+    track_remote = params.get('track_to_dagshub', False) or os.getenv('TRACK_TO_DAGSHUB') == 'true'
+
+    if track_remote:
+        # Si vamos a DagsHub, cargar credenciales y configurar URI
+        load_dotenv()
+        # Si la URI viene por variable de entorno (CI), usarla. Si no, usar params.
+        tracking_uri = os.getenv('MLFLOW_TRACKING_URI') or params.get('dagshub_tracking_uri')
+        if tracking_uri:
+            mlflow.set_tracking_uri(tracking_uri)
+    else:
+        # Si es local, asegurarse de que no haya URI de tracking de DagsHub
+        for var in ('MLFLOW_TRACKING_URI', 'MLFLOW_TRACKING_USERNAME', 'MLFLOW_TRACKING_PASSWORD'):
+            os.environ.pop(var, None)
+
+    return track_remote
+
+
+def load_dataset(params: Dict[str, Any]) -> pd.DataFrame:
+    """Dataset procesado (se lee del disco una sola vez por proceso)"""
+    path = params['data_processed']
+    stat = os.stat(path)
+    version = (stat.st_size, stat.st_mtime_ns)
+    cached = _datasets.get(path)
+    if cached is None or cached[0] != version:
+        _datasets[path] = (version, pd.read_parquet(path))
+    return _datasets[path][1]
+
+
+def file_hash(path: str, block_size: int = 1 << 20) -> str:
+    """Hash del contenido de un archivo (identifica la versión del dataset)"""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def split_key(params: Dict[str, Any]) -> str:
+    """Identifica la versión del dataset y la partición (hash + seed + train_size)"""
+    return f"{file_hash(params['data_processed'])}-seed{params['seed']}-train{params['train_size']}"
+
+
+def _split_dir(params: Dict[str, Any]) -> str:
+    cache_dir = params.get('split', {}).get('cache_dir', 'data/splits')
+    return os.path.join(cache_dir, split_key(params))
+
+
+def _compute_split(df: pd.DataFrame, train_size: float, seed: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Cada fila va a train o a hold-out según un hash de su customer_id y la
+    semilla: al agregar clientes las filas existentes no cambian de lado (el
+    reentrenamiento incremental no evalúa sobre filas que ya vio). Dentro de
+    cada clase de `churn` la proporción es train_size en expectativa.
+    """
+    keys = df[ID_COLUMN] if ID_COLUMN in df.columns else df
+    hashes = pd.util.hash_pandas_object(keys, index=False, hash_key=f"{seed:016d}"[-16:]).to_numpy()
+    in_train = hashes < np.uint64(train_size * 2**64)
+    # Ordenados: el hold-out respeta el orden del dataset
+    return np.flatnonzero(in_train), np.flatnonzero(~in_train)
+
+
+def holdout_split(params: Dict[str, Any], df: Optional[pd.DataFrame] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Posiciones (iloc) de train y hold-out del dataset procesado.
+
+    La primera etapa que la pide calcula la partición y la guarda; las
+    siguientes (u otras corridas con el mismo dataset, seed y train_size)
+    abren los .npy con mmap_mode='r'.
+    """
+    split_dir = _split_dir(params)
+    train_path = os.path.join(split_dir, TRAIN_INDEX_FILE)
+    holdout_path = os.path.join(split_dir, HOLDOUT_INDEX_FILE)
+
+    if not (os.path.exists(train_path) and os.path.exists(holdout_path)):
+        if df is None:
+            df = load_dataset(params)
+        train_idx, holdout_idx = _compute_split(df, params['train_size'], params['seed'])
+
+        # Escribir en un directorio temporal y renombrar: otra etapa nunca ve una partición a medias
+        parent = os.path.dirname(split_dir) or '.'
+        os.makedirs(parent, exist_ok=True)
+        tmp_dir = tempfile.mkdtemp(dir=parent)
+        try:
+            np.save(os.path.join(tmp_dir, TRAIN_INDEX_FILE), train_idx)
+            np.save(os.path.join(tmp_dir, HOLDOUT_INDEX_FILE), holdout_idx)
+            os.replace(tmp_dir, split_dir)
+        except OSError:
+            # Otro proceso ya guardó la misma partición
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            if not os.path.exists(train_path):
+                raise
+        print(f"Partición train/hold-out guardada en {split_dir} ({len(train_idx)} / {len(holdout_idx)} filas)")
+
+    return np.load(train_path, mmap_mode='r'), np.load(holdout_path, mmap_mode='r')
+
+
+def load_split(params: Dict[str, Any]) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """(train_df, holdout_df) del dataset procesado con la partición compartida"""
+    df = load_dataset(params)
+    train_idx, holdout_idx = holdout_split(params, df)
+    return df.iloc[train_idx], df.iloc[holdout_idx]
+
+
+def load_holdout(params: Dict[str, Any]) -> pd.DataFrame:
+    """Hold-out compartido (el mismo que usó train.py como test de PyCaret)"""
+    return load_split(params)[1]
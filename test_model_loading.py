@@ -2,9 +2,14 @@
 Script de prueba local para verificar que el modelo en Production
 puede ser cargado desde MLflow (DagsHub) y usado para predicciones.
 
-Este script simula exactamente lo que hace src/app.py en producción.
+Este script simula exactamente lo que hace src/app.py en producción,
+incluyendo el desglose por fases del arranque en frío.
 """
 
+import time
+
+_imports_started = time.perf_counter()
+
 import mlflow
 from mlflow.tracking import MlflowClient
 import pandas as pd
@@ -12,6 +17,11 @@ import os
 from dotenv import load_dotenv
 from datetime import datetime
 
+from src.api.serving import format_phases, load_serving_model
+
+# Fases del arranque en frío (mismas que expone /health en "cold_start")
+cold_start = {"imports": time.perf_counter() - _imports_started}
+
 # Cargar variables de entorno
 load_dotenv()
 
@@ -133,11 +143,12 @@ def test_model_loading():
         print(f"\n  URI: {model_uri}")
         print("\n  Descargando modelo desde DagsHub...")
         
-        model = mlflow.pyfunc.load_model(model_uri)
+        serving = load_serving_model(model_name, model_stage, [], use_cache=False, fast_path_enabled=False)
+        cold_start.update(serving.info["phases"])
         
         print("\n✅ ÉXITO: Modelo cargado correctamente desde DagsHub")
         
-        return model
+        return serving.pyfunc_model
     
     except Exception as e:
         print(f"\n❌ ERROR al cargar modelo: {e}")
@@ -180,7 +191,9 @@ def test_prediction(model):
         df = pd.DataFrame([sample_data])
         
         print("\n  Ejecutando predicción...")
+        started = time.perf_counter()
         prediction = model.predict(df)
+        cold_start["first_predict"] = time.perf_counter() - started
         
         result = prediction[0]
         
@@ -237,6 +250,15 @@ MLFLOW_TRACKING_PASSWORD=tu_token_de_dagshub
     # Test 2: Hacer predicción
     success = test_prediction(model)
     
+    # Desglose del arranque en frío
+    print("\n" + "=" * 60)
+    print("⏱ ARRANQUE EN FRÍO POR FASE")
+    print("=" * 60)
+    for phase, seconds in cold_start.items():
+        print(f"   {phase:<14} {seconds:8.3f} s")
+    print(f"   {'total':<14} {sum(cold_start.values()):8.3f} s")
+    print(f"\n   {format_phases(cold_start)}")
+    
     # Resumen final
     print("\n" + "=" * 60)
     if success:
@@ -0,0 +1,146 @@
+# tests/test_batching.py
+"""Micro-batching de predicciones individuales (src/api/batching.py)"""
+
+import asyncio
+
+import pytest
+
+from src.api.batching import MicroBatcher
+from src.api.limiter import ConcurrencyLimiter, Overloaded
+
+
+def _double(rows):
+    return [row["x"] * 2 for row in rows]
+
+
+async def _with_batcher(batcher, scenario):
+    await batcher.start()
+    try:
+        return await scenario()
+    finally:
+        await batcher.stop()
+
+
+def test_pedidos_concurrentes_van_en_un_lote_y_cada_uno_recibe_su_resultado():
+    calls = []
+
+    def predict(rows):
+        calls.append(len(rows))
+        return _double(rows)
+
+    batcher = MicroBatcher(predict, max_batch_size=8, max_wait_ms=50)
+
+    async def scenario():
+        return await asyncio.gather(*(batcher.submit({"x": i}) for i in range(5)))
+
+    results = asyncio.run(_with_batcher(batcher, scenario))
+    assert results == [0, 2, 4, 6, 8]
+    assert calls == [5]
+    assert batcher.stats()["batch_sizes"] == {5: 1}
+
+
+def test_lote_se_despacha_al_llegar_a_max_batch_size():
+    calls = []
+
+    def predict(rows):
+        calls.append(len(rows))
+        return _double(rows)
+
+    # max_wait alto: solo el tamaño del lote puede despacharlo a tiempo
+    batcher = MicroBatcher(predict, max_batch_size=3, max_wait_ms=10_000)
+
+    async def scenario():
+        return await asyncio.wait_for(asyncio.gather(*(batcher.submit({"x": i}) for i in range(6))), timeout=2)
+
+    results = asyncio.run(_with_batcher(batcher, scenario))
+    assert results == [0, 2, 4, 6, 8, 10]
+    assert calls == [3, 3]
+
+
+def test_error_del_modelo_llega_a_todos_los_pedidos_del_lote():
+    def predict(rows):
+        raise ValueError("modelo roto")
+
+    batcher = MicroBatcher(predict, max_batch_size=8, max_wait_ms=20)
+
+    async def scenario():
+        return await asyncio.gather(*(batcher.submit({"x": i}) for i in range(3)), return_exceptions=True)
+
+    results = asyncio.run(_with_batcher(batcher, scenario))
+    assert all(isinstance(r, ValueError) and str(r) == "modelo roto" for r in results)
+    # El despachador sigue funcionando después del error
+    assert batcher.stats()["batches_flushed"] == 1
+
+
+def test_lote_corre_dentro_del_limite_de_concurrencia():
+    limiter = ConcurrencyLimiter(1, max_queue=0, queue_timeout_ms=1000)
+
+    async def run(fn, rows):
+        async with limiter.slot():
+            return fn(rows)
+
+    batcher = MicroBatcher(_double, max_batch_size=8, max_wait_ms=10, run=run)
+
+    async def scenario():
+        ok = await batcher.submit({"x": 1})
+        # Con el único lugar ocupado, el lote se descarta y todos sus pedidos reciben el 429
+        await limiter.acquire()
+        try:
+            shed = await asyncio.gather(*(batcher.submit({"x": i}) for i in range(3)), return_exceptions=True)
+        finally:
+            limiter.release()
+        return ok, shed
+
+    ok, shed = asyncio.run(_with_batcher(batcher, scenario))
+    assert ok == 2
+    assert all(isinstance(r, Overloaded) and r.status_code == 429 for r in shed)
+    assert limiter.admitted == 2
+
+
+def test_cola_llena_rechaza_con_429():
+    async def scenario():
+        gate = asyncio.Event()
+
+        async def run(fn, rows):
+            await gate.wait()
+            return fn(rows)
+
+        batcher = MicroBatcher(_double, max_batch_size=1, max_wait_ms=0, max_queue=2, run=run)
+        await batcher.start()
+        try:
+            # El primero queda en el lote bloqueado y los dos siguientes llenan la cola
+            pending = [asyncio.ensure_future(batcher.submit({"x": 0}))]
+            await asyncio.sleep(0.01)
+            pending += [asyncio.ensure_future(batcher.submit({"x": i})) for i in (1, 2)]
+            await asyncio.sleep(0)
+            with pytest.raises(Overloaded) as excinfo:
+                await batcher.submit({"x": 99})
+            gate.set()
+            return batcher, excinfo.value, await asyncio.wait_for(asyncio.gather(*pending), timeout=2)
+        finally:
+            await batcher.stop()
+
+    batcher, error, results = asyncio.run(scenario())
+    assert (error.status_code, error.reason) == (429, "queue_full")
+    assert results == [0, 2, 4]
+    assert batcher.stats()["rejected"] == 1
+
+
+def test_stop_falla_los_pedidos_pendientes():
+    async def scenario():
+        batcher = MicroBatcher(_double, max_batch_size=8, max_wait_ms=10_000)
+        await batcher.start()
+        # Pedidos en el lote que todavía se está juntando (max_wait_ms largo)
+        pending = [asyncio.ensure_future(batcher.submit({"x": i})) for i in range(2)]
+        await asyncio.sleep(0.01)
+        await batcher.stop()
+        return await asyncio.wait_for(asyncio.gather(*pending, return_exceptions=True), timeout=2)
+
+    results = asyncio.run(scenario())
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+
+def test_submit_sin_iniciar_falla():
+    batcher = MicroBatcher(_double)
+    with pytest.raises(RuntimeError):
+        asyncio.run(batcher.submit({"x": 1}))
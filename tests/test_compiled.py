@@ -0,0 +1,88 @@
+# tests/test_compiled.py
+"""Backend compilado (src/api/compiled.py): tablas serializadas y estimador ONNX"""
+
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.compose import ColumnTransformer
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+from src.api.compiled import ONNX_FILE, PREPROCESSOR_FILE, CompiledModel, CompiledPreprocessor
+from src.api.fast_path import FastPath
+
+CONTRACTS = ["Month-to-month", "One year", "Two year"]
+
+
+def _customers(n, seed=0, contracts=CONTRACTS):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "customer_id": [f"C{seed}-{i}" for i in range(n)],
+        "tenure_months": rng.integers(1, 72, n),
+        "monthly_charges": np.round(rng.uniform(20, 110, n), 2),
+        "contract": rng.choice(contracts, n),
+    })
+
+
+def _compile(estimator):
+    """Igual que promote_best_model.export_compiled_model: todas las categorías del dataset + desconocidas"""
+    X = _customers(400)
+    y = ((X["contract"] == "Month-to-month") & (X["tenure_months"] < 24)).astype(int)
+    pipeline = Pipeline([
+        ("prep", ColumnTransformer([
+            ("num", StandardScaler(), ["tenure_months", "monthly_charges"]),
+            ("cat", OneHotEncoder(handle_unknown="ignore"), ["contract"]),
+        ])),
+        ("clf", estimator),
+    ]).fit(X, y)
+
+    rows = X.to_dict("records")
+    fast_path = FastPath(pipeline, rows[0], max_categories=len(rows) + 1)
+    assert fast_path.encode(rows) is not None
+    fast_path.add_unknown()
+    return pipeline, fast_path
+
+
+def _requests():
+    # Clientes nuevos, con una categoría que el pipeline nunca vio
+    return pd.concat([_customers(200, seed=1), _customers(20, seed=2, contracts=["Three year"])], ignore_index=True)
+
+
+def test_tablas_json_ida_y_vuelta():
+    pipeline, fast_path = _compile(LogisticRegression(max_iter=1000))
+    preprocessor = CompiledPreprocessor.from_dict(json.loads(json.dumps(fast_path.to_dict())))
+
+    requests = _requests()
+    X = preprocessor.encode(requests.to_dict("records"))
+    # Las categorías no vistas usan la codificación del pipeline para valores desconocidos
+    assert np.allclose(X, fast_path.transform(requests.to_dict("records")), rtol=1e-6, atol=1e-9)
+
+
+@pytest.mark.parametrize("estimator", [
+    LogisticRegression(max_iter=1000),
+    RandomForestClassifier(n_estimators=20, random_state=0),
+], ids=["lr", "rf"])
+def test_onnx_predice_igual_que_sklearn(estimator, tmp_path):
+    pytest.importorskip("onnxruntime")
+    pytest.importorskip("skl2onnx")
+    from src.promote_best_model import convert_to_onnx
+
+    pipeline, fast_path = _compile(estimator)
+    onnx_bytes = convert_to_onnx(fast_path.estimator, fast_path.base.size)
+
+    # Mismo artefacto `compiled/` que se loguea al promover
+    with open(tmp_path / PREPROCESSOR_FILE, "w") as f:
+        json.dump(fast_path.to_dict(), f)
+    (tmp_path / ONNX_FILE).write_bytes(onnx_bytes)
+    compiled = CompiledModel.load(str(tmp_path))
+
+    requests = _requests()
+    expected = [int(p) for p in pipeline.predict(requests)]
+    actual = compiled.predict(requests.to_dict("records"))
+
+    # promotion.onnx_max_mismatch_rate es 0 por defecto: tienen que coincidir todas (ONNX predice en float32)
+    assert actual == expected
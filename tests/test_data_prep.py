@@ -0,0 +1,72 @@
+# tests/test_data_prep.py
+"""CSV crudo -> Parquet tipado (src/data_prep.py) y linaje estable ante el ancho de los tipos"""
+
+import numpy as np
+import pandas as pd
+import pytest
+import yaml
+
+from src.data_prep import prepare_data
+from src.incremental import row_hashes, schema_of
+
+pytest.importorskip("pyarrow")
+
+RAW = pd.DataFrame({
+    "customer_id": [f"C{i}" for i in range(6)],
+    "tenure_months": [1, 5, 12, 24, 60, 72],
+    "balance": [-3, 0, 7, 100, 20, 5],
+    "monthly_charges": [29.5, 56.25, 70.0, 99.75, 20.5, 45.0],
+    "total_charges": [29.51, 281.3, 840.07, 2394.11, 1230.0, 3240.5],
+    "contract": ["Month-to-month", "One year", "Two year", "Month-to-month", "Two year", "One year"],
+    "senior": [True, False, False, True, False, False],
+    "churn": [1, 0, 0, 1, 0, 0],
+})
+
+
+def _prepare(tmp_path, monkeypatch, raw: pd.DataFrame, chunk_size: int = 4) -> pd.DataFrame:
+    monkeypatch.chdir(tmp_path)
+    raw.to_csv("raw.csv", index=False)
+    with open("params.yaml", "w") as f:
+        yaml.safe_dump({
+            "data_processed": "processed/data.parquet",
+            "data_prep": {"raw_csv": "raw.csv", "chunk_size": chunk_size, "max_categories": 3},
+        }, f)
+    prepare_data()
+    return pd.read_parquet("processed/data.parquet")
+
+
+def test_ida_y_vuelta_tipos_y_valores(tmp_path, monkeypatch):
+    df = _prepare(tmp_path, monkeypatch, RAW)
+
+    # Enteros al tipo más chico que cubre el rango de todo el archivo (no solo del primer bloque)
+    assert df["tenure_months"].dtype == np.uint8
+    assert df["balance"].dtype == np.int16
+    assert df["monthly_charges"].dtype == np.float32
+    assert df["total_charges"].dtype == np.float64
+    assert df["senior"].dtype == bool
+    assert isinstance(df["contract"].dtype, pd.CategoricalDtype)
+    assert list(df["contract"].cat.categories) == ["Month-to-month", "One year", "Two year"]
+    # Más valores distintos que max_categories: queda como texto
+    assert df["customer_id"].dtype == object
+
+    # Los valores no cambian al tiparlos
+    for column in RAW.columns:
+        expected = RAW[column].tolist()
+        actual = df[column].astype(object if column in ("customer_id", "contract") else RAW[column].dtype).tolist()
+        assert actual == expected, column
+
+
+def test_linaje_no_cambia_si_un_valor_nuevo_ensancha_el_tipo(tmp_path, monkeypatch):
+    (tmp_path / "v1").mkdir()
+    (tmp_path / "v2").mkdir()
+    before = _prepare(tmp_path / "v1", monkeypatch, RAW)
+    # Un cliente nuevo lleva tenure_months de uint8 a uint16 y monthly_charges de float32 a float64
+    new_row = RAW.iloc[[0]].assign(customer_id="C99", tenure_months=300, monthly_charges=20.1)
+    after = _prepare(tmp_path / "v2", monkeypatch, pd.concat([RAW, new_row], ignore_index=True))
+
+    assert before["tenure_months"].dtype != after["tenure_months"].dtype
+    assert before["monthly_charges"].dtype != after["monthly_charges"].dtype
+    assert schema_of(before) == schema_of(after)
+    # Las filas existentes conservan su hash: solo la nueva es delta
+    assert np.array_equal(row_hashes(before), row_hashes(after)[:len(before)])
+    assert not np.isin(row_hashes(after)[-1:], row_hashes(before)).any()
@@ -0,0 +1,95 @@
+# tests/test_evaluate.py
+"""Evaluación en el hold-out de los mejores runs (src/evaluate.py)"""
+
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import mlflow
+import mlflow.sklearn
+import pandas as pd
+import pytest
+from sklearn.datasets import make_classification
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import accuracy_score, roc_auc_score
+from sklearn.svm import LinearSVC
+
+from src import evaluate
+from src.evaluate import _evaluate_run, _init_worker
+
+LATENCY_ROWS = 20
+
+
+@pytest.fixture
+def holdout():
+    X, y = make_classification(n_samples=300, n_features=5, random_state=0)
+    X = pd.DataFrame(X, columns=[f"f{i}" for i in range(X.shape[1])])
+    return X.iloc[:200], pd.Series(y[:200]), X.iloc[200:], pd.Series(y[200:])
+
+
+@pytest.fixture
+def runs(tmp_path, monkeypatch, holdout):
+    """Tracking en archivos con un run por modelo; los gráficos van a tmp_path"""
+    monkeypatch.chdir(tmp_path)
+    previous_uri = mlflow.get_tracking_uri()
+    mlflow.set_tracking_uri(f"file:{tmp_path / 'mlruns'}")
+    X_train, y_train, X_unseen, y_unseen = holdout
+
+    run_ids = {}
+    for name, model in (("lr", LogisticRegression()), ("svm", LinearSVC())):
+        model.fit(X_train, y_train)
+        with mlflow.start_run() as run:
+            mlflow.sklearn.log_model(model, "model")
+        run_ids[name] = (run.info.run_id, model)
+    monkeypatch.setattr(evaluate, "_worker_data", (X_unseen, y_unseen, LATENCY_ROWS))
+
+    yield run_ids
+    mlflow.set_tracking_uri(previous_uri)
+
+
+def test_metricas_del_hold_out_y_costo_de_servir(runs, holdout, tmp_path):
+    _, _, X_unseen, y_unseen = holdout
+    run_id, model = runs["lr"]
+
+    result = _evaluate_run(run_id)
+
+    metrics = result["metrics"]
+    assert result["run_id"] == run_id
+    assert metrics["final_accuracy"] == pytest.approx(accuracy_score(y_unseen, model.predict(X_unseen)))
+    assert metrics["final_auc"] == pytest.approx(roc_auc_score(y_unseen, model.predict_proba(X_unseen)[:, 1]))
+    assert 0 < metrics["latency_p50_ms"] <= metrics["latency_p99_ms"]
+    assert metrics["batch_ms_per_row"] > 0
+    assert metrics["model_size_mb"] > 0
+    assert [p.split("/")[-1] for p in result["plots"]] == ["confusion_matrix.png", "roc_curve.png"]
+    assert all((tmp_path / p).exists() for p in result["plots"])
+
+
+def test_modelo_sin_probabilidades_no_tiene_auc(runs, holdout):
+    _, _, X_unseen, y_unseen = holdout
+    run_id, model = runs["svm"]
+
+    result = _evaluate_run(run_id)
+
+    assert "final_auc" not in result["metrics"]
+    assert result["metrics"]["final_accuracy"] == pytest.approx(accuracy_score(y_unseen, model.predict(X_unseen)))
+    assert [p.split("/")[-1] for p in result["plots"]] == ["confusion_matrix.png"]
+
+
+def test_en_paralelo_da_las_mismas_metricas_que_en_el_proceso(runs, holdout):
+    """Como en evaluate_model: un worker por run, inicializado con el hold-out"""
+    _, _, X_unseen, y_unseen = holdout
+    run_ids = [run_id for run_id, _ in runs.values()]
+    expected = {run_id: _evaluate_run(run_id)["metrics"] for run_id in run_ids}
+
+    with ProcessPoolExecutor(
+        max_workers=2,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(mlflow.get_tracking_uri(), X_unseen, y_unseen, LATENCY_ROWS),
+    ) as executor:
+        futures = {run_id: executor.submit(_evaluate_run, run_id) for run_id in run_ids}
+        results = {run_id: future.result() for run_id, future in futures.items()}
+
+    for run_id in run_ids:
+        assert results[run_id]["run_id"] == run_id
+        final = {k: v for k, v in results[run_id]["metrics"].items() if k.startswith("final_")}
+        assert final == pytest.approx({k: v for k, v in expected[run_id].items() if k.startswith("final_")})
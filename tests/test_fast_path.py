@@ -0,0 +1,102 @@
+# tests/test_fast_path.py
+"""Camino rápido sin DataFrame (src/api/fast_path.py): paridad con el pipeline y fallback"""
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.compose import ColumnTransformer
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.impute import SimpleImputer
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import Pipeline, make_pipeline
+from sklearn.preprocessing import FunctionTransformer, OneHotEncoder, StandardScaler
+
+from src.api.fast_path import compile_fast_path
+from src.api.serving import ServingModel
+
+NUMERIC = ["tenure_months", "monthly_charges", "total_charges"]
+CATEGORICAL = ["contract", "payment_method"]
+CONTRACTS = ["Month-to-month", "One year", "Two year"]
+PAYMENTS = ["Electronic check", "Mailed check", "Credit card"]
+
+
+def _customers(n, seed=0, contracts=CONTRACTS, payments=PAYMENTS):
+    rng = np.random.default_rng(seed)
+    tenure = rng.integers(1, 72, n)
+    monthly = np.round(rng.uniform(20, 110, n), 2)
+    return [
+        {
+            "customer_id": f"C{seed}-{i}",
+            "tenure_months": int(tenure[i]),
+            "monthly_charges": float(monthly[i]),
+            "total_charges": float(np.round(tenure[i] * monthly[i], 2)),
+            "contract": str(rng.choice(contracts)),
+            "payment_method": str(rng.choice(payments)),
+        }
+        for i in range(n)
+    ]
+
+
+def _fit(estimator, numeric_steps=None):
+    rows = _customers(400)
+    X = pd.DataFrame(rows)
+    y = ((X["contract"] == "Month-to-month") & (X["tenure_months"] < 24)).astype(int)
+    numeric = make_pipeline(*(numeric_steps or [SimpleImputer(strategy="median"), StandardScaler()]))
+    pipeline = Pipeline([
+        ("prep", ColumnTransformer([
+            ("num", numeric, NUMERIC),
+            ("cat", OneHotEncoder(handle_unknown="ignore"), CATEGORICAL),
+        ])),
+        ("clf", estimator),
+    ])
+    return pipeline.fit(X, y), rows
+
+
+@pytest.mark.parametrize("estimator", [
+    LogisticRegression(max_iter=1000),
+    RandomForestClassifier(n_estimators=20, random_state=0),
+], ids=["lr", "rf"])
+def test_predicciones_iguales_al_pipeline(estimator):
+    pipeline, rows = _fit(estimator)
+    fast_path = compile_fast_path(pipeline, rows[:8])
+    assert fast_path is not None
+    assert set(fast_path.numeric_columns) == set(NUMERIC)
+    # customer_id no afecta al pipeline: no se compila
+    assert set(fast_path.categorical_columns) == set(CATEGORICAL)
+
+    # Clientes nuevos, incluidas categorías que el pipeline nunca vio
+    requests = _customers(200, seed=1) + _customers(
+        20, seed=2, contracts=["Three year"], payments=["Bitcoin", "Electronic check"]
+    )
+    expected = [int(p) for p in pipeline.predict(pd.DataFrame(requests))]
+    assert fast_path.predict(requests) == expected
+
+    model = ServingModel(pipeline, {"version": "1"}, fast_path)
+    assert model.predict_records(requests[:64]) == expected[:64]
+    # Más filas que fast_path_max_rows: camino con DataFrame, mismo resultado
+    assert model.predict_records(requests) == expected
+
+
+def test_categoria_nueva_se_aprende_una_vez():
+    pipeline, rows = _fit(LogisticRegression(max_iter=1000))
+    fast_path = compile_fast_path(pipeline, rows[:8])
+    before = len(fast_path.categorical_tables["contract"])
+
+    unseen = _customers(5, seed=3, contracts=["Three year"])
+    fast_path.predict(unseen)
+    fast_path.predict(unseen)
+
+    assert len(fast_path.categorical_tables["contract"]) == before + 1
+
+
+def test_compilacion_rechazada_usa_el_pipeline():
+    # log1p no es afín: la compilación se descarta
+    pipeline, rows = _fit(
+        LogisticRegression(max_iter=1000),
+        numeric_steps=[SimpleImputer(strategy="median"), FunctionTransformer(np.log1p), StandardScaler()],
+    )
+    assert compile_fast_path(pipeline, rows[:8]) is None
+
+    model = ServingModel(pipeline, {"version": "1"}, fast_path=None)
+    requests = _customers(50, seed=1)
+    assert model.predict_records(requests) == [int(p) for p in pipeline.predict(pd.DataFrame(requests))]
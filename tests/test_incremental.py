@@ -0,0 +1,170 @@
+# tests/test_incremental.py
+"""Reentrenamiento incremental (src/incremental.py): filas nuevas, motivos de reentrenamiento completo y warm start"""
+
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.compose import ColumnTransformer
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import SGDClassifier
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+import mlflow.tracking
+from src import incremental
+from src.incremental import FullRetrain, incremental_train, psi, row_hashes, schema_of, warm_start
+
+CONTRACTS = ["Month-to-month", "One year", "Two year"]
+
+
+def _customers(start, n, seed=0, tenure_offset=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "customer_id": [f"C{i}" for i in range(start, start + n)],
+        "tenure_months": (rng.integers(1, 72, n) + tenure_offset).astype(np.int64),
+        "monthly_charges": rng.uniform(20, 110, n),
+        "contract": pd.Categorical(rng.choice(CONTRACTS, n), categories=CONTRACTS),
+        "churn": rng.integers(0, 2, n),
+    })
+
+
+PARAMS = {
+    "metric": "Accuracy",
+    "incremental": {"max_delta_fraction": 0.3, "drift_threshold": 0.2, "boost_rounds": 5},
+}
+
+
+class _Client:
+    """MlflowClient con una versión en Production (o ninguna)"""
+
+    def __init__(self, has_model=True):
+        self.has_model = has_model
+
+    def get_registered_model(self, name):
+        if not self.has_model:
+            raise RuntimeError("RESOURCE_DOES_NOT_EXIST")
+        return SimpleNamespace(name=name)
+
+    def get_latest_versions(self, name, stages):
+        return [SimpleNamespace(version="3", run_id="parent-run")]
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    """Registro falso: el padre se entrenó con `parent_df`"""
+    state = {"client": _Client(), "parent_df": _customers(0, 200)}
+    monkeypatch.setattr(mlflow.tracking, "MlflowClient", lambda *a, **k: state["client"])
+    monkeypatch.setattr(
+        incremental, "load_lineage",
+        lambda client, run_id: (row_hashes(state["parent_df"]), schema_of(state["parent_df"]))
+    )
+    return state
+
+
+def _reason(params, train_df):
+    with pytest.raises(FullRetrain) as excinfo:
+        incremental_train(params, train_df, train_df)
+    return excinfo.value.reason
+
+
+def test_sin_version_padre(registry):
+    registry["client"] = _Client(has_model=False)
+    assert _reason(PARAMS, registry["parent_df"]) == "no_parent"
+
+
+def test_esquema_distinto(registry):
+    train_df = registry["parent_df"].assign(monthly_charges=lambda df: df["monthly_charges"].astype(str))
+    assert _reason(PARAMS, train_df) == "schema_changed"
+
+
+def test_sin_filas_nuevas(registry):
+    # Mismas filas en otro orden: no hay delta
+    train_df = registry["parent_df"].sample(frac=1.0, random_state=1)
+    assert incremental_train(PARAMS, train_df, train_df) is None
+
+
+def test_delta_detecta_filas_nuevas_y_cambiadas(registry, monkeypatch):
+    parent_df = registry["parent_df"]
+    changed = parent_df.iloc[[5]].assign(monthly_charges=999.0)
+    train_df = pd.concat([parent_df.drop(index=5), changed, _customers(1000, 10, seed=1)], ignore_index=True)
+
+    seen = {}
+
+    def drift_report(reference, current):
+        # Corta el entrenamiento después de calcular el delta
+        seen["delta"] = current
+        raise FullRetrain("captured")
+
+    monkeypatch.setattr(incremental, "drift_report", drift_report)
+    assert _reason(PARAMS, train_df) == "captured"
+    assert sorted(seen["delta"]["customer_id"]) == sorted(["C5"] + [f"C{i}" for i in range(1000, 1010)])
+
+
+def test_delta_demasiado_grande(registry):
+    train_df = pd.concat([registry["parent_df"], _customers(1000, 100, seed=1)], ignore_index=True)
+    assert _reason(PARAMS, train_df) == "delta_too_large"
+
+
+def test_drift_en_las_filas_nuevas(registry):
+    train_df = pd.concat([registry["parent_df"], _customers(1000, 40, seed=1, tenure_offset=200)], ignore_index=True)
+    assert _reason(PARAMS, train_df) == "drift"
+
+
+def test_psi():
+    rng = np.random.default_rng(0)
+    reference = pd.Series(rng.normal(0, 1, 5000))
+    assert psi(reference, pd.Series(rng.normal(0, 1, 5000))) < 0.05
+    assert psi(reference, pd.Series(rng.normal(2, 1, 5000))) > 0.2
+
+    categories = pd.Series(rng.choice(["a", "b"], 1000))
+    assert psi(categories, categories.sample(frac=1.0, random_state=0)) < 1e-9
+    # Una categoría que no estaba en la referencia cuenta como drift
+    assert psi(categories, pd.Series(["c"] * 500 + ["a"] * 500)) > 0.2
+
+
+def _pipeline(estimator, df):
+    pipeline = Pipeline([
+        ("prep", ColumnTransformer([
+            ("num", StandardScaler(), ["tenure_months", "monthly_charges"]),
+            ("cat", OneHotEncoder(handle_unknown="ignore"), ["contract"]),
+        ])),
+        ("clf", estimator),
+    ])
+    return pipeline.fit(df.drop(columns=["churn", "customer_id"]), df["churn"])
+
+
+def test_warm_start_partial_fit():
+    df = _customers(0, 200)
+    pipeline = _pipeline(SGDClassifier(random_state=0), df)
+    coef = pipeline.named_steps["clf"].coef_.copy()
+    scaler_mean = pipeline.named_steps["prep"].named_transformers_["num"].mean_.copy()
+
+    delta = _customers(1000, 20, seed=1)
+    method = warm_start(pipeline, delta.drop(columns=["churn", "customer_id"]), delta["churn"], boost_rounds=5)
+
+    assert method == "partial_fit (SGDClassifier)"
+    assert not np.array_equal(coef, pipeline.named_steps["clf"].coef_)
+    # El preprocesamiento ya ajustado no cambia
+    assert np.array_equal(scaler_mean, pipeline.named_steps["prep"].named_transformers_["num"].mean_)
+
+
+def test_warm_start_xgboost_agrega_arboles():
+    xgboost = pytest.importorskip("xgboost")
+    df = _customers(0, 200)
+    pipeline = _pipeline(xgboost.XGBClassifier(n_estimators=10, max_depth=2), df)
+
+    delta = _customers(1000, 20, seed=1)
+    method = warm_start(pipeline, delta.drop(columns=["churn", "customer_id"]), delta["churn"], boost_rounds=5)
+
+    assert method == "xgboost (+5 árboles)"
+    assert pipeline.named_steps["clf"].get_booster().num_boosted_rounds() == 15
+
+
+def test_warm_start_estimador_sin_soporte():
+    df = _customers(0, 100)
+    pipeline = _pipeline(RandomForestClassifier(n_estimators=5, random_state=0), df)
+    with pytest.raises(FullRetrain) as excinfo:
+        warm_start(pipeline, df.drop(columns=["churn", "customer_id"]), df["churn"], boost_rounds=5)
+    assert excinfo.value.reason == "unsupported_estimator"
@@ -0,0 +1,120 @@
+# tests/test_limiter.py
+"""Load shedding del límite de inferencias concurrentes (src/api/limiter.py)"""
+
+import asyncio
+
+import httpx
+import pytest
+
+from src.api import app as api
+from src.api.limiter import ConcurrencyLimiter, Overloaded
+
+
+def test_cola_llena_rechaza_con_429():
+    async def scenario():
+        limiter = ConcurrencyLimiter(1, max_queue=1, queue_timeout_ms=1000)
+        await limiter.acquire()
+        waiting = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0)
+
+        with pytest.raises(Overloaded) as excinfo:
+            await limiter.acquire()
+
+        limiter.release()
+        await waiting
+        limiter.release()
+        return limiter, excinfo.value
+
+    limiter, error = asyncio.run(scenario())
+    assert (error.status_code, error.reason, error.retry_after) == (429, "queue_full", 1)
+    assert limiter.stats()["shed"] == {"queue_full": 1}
+    assert limiter.admitted == 2
+    assert limiter.active == 0
+
+
+def test_espera_vencida_rechaza_con_503():
+    async def scenario():
+        limiter = ConcurrencyLimiter(1, max_queue=4, queue_timeout_ms=20)
+        await limiter.acquire()
+        with pytest.raises(Overloaded) as excinfo:
+            await limiter.acquire()
+        return limiter, excinfo.value
+
+    limiter, error = asyncio.run(scenario())
+    assert (error.status_code, error.reason) == (503, "queue_timeout")
+    assert limiter.queue_depth == 0
+    assert limiter.stats()["shed"] == {"queue_timeout": 1}
+
+
+def test_release_pasa_el_lugar_en_orden_fifo():
+    async def scenario():
+        limiter = ConcurrencyLimiter(1, max_queue=4, queue_timeout_ms=1000)
+        order = []
+
+        async def worker(name):
+            async with limiter.slot():
+                order.append(name)
+                await asyncio.sleep(0.01)
+
+        await asyncio.gather(*(worker(name) for name in "abcd"))
+        return limiter, order
+
+    limiter, order = asyncio.run(scenario())
+    assert order == list("abcd")
+    assert limiter.active == 0
+    assert limiter.admitted == 4
+
+
+def test_sin_descarte_espera_sin_limite_de_cola():
+    async def scenario():
+        limiter = ConcurrencyLimiter(1, max_queue=0, queue_timeout_ms=10)
+        await limiter.acquire()
+        waiting = asyncio.ensure_future(limiter.acquire(shed=False))
+        await asyncio.sleep(0.05)
+        assert not waiting.done()
+        limiter.release()
+        await waiting
+        limiter.release()
+        return limiter
+
+    limiter = asyncio.run(scenario())
+    assert limiter.shed == {}
+    assert limiter.active == 0
+
+
+class _Model:
+    info = {"version": "1"}
+
+    def predict_records(self, records):
+        return [0] * len(records)
+
+
+@pytest.fixture
+def overloaded_api(monkeypatch):
+    monkeypatch.setattr(api, "model", _Model())
+    monkeypatch.setattr(api, "prediction_cache", None)
+    monkeypatch.setattr(api, "batcher", None)
+
+
+@pytest.mark.parametrize(
+    "max_queue, queue_timeout_ms, status_code, reason",
+    [(0, 1000, 429, "queue_full"), (4, 20, 503, "queue_timeout")],
+)
+def test_api_responde_sobrecarga_con_retry_after(monkeypatch, overloaded_api, max_queue, queue_timeout_ms, status_code, reason):
+    limiter = ConcurrencyLimiter(1, max_queue=max_queue, queue_timeout_ms=queue_timeout_ms)
+    monkeypatch.setattr(api, "limiter", limiter)
+
+    async def scenario():
+        # El único lugar está ocupado durante todo el pedido
+        await limiter.acquire()
+        try:
+            transport = httpx.ASGITransport(app=api.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                return await client.post("/predict/batch", json=[])
+        finally:
+            limiter.release()
+
+    response = asyncio.run(scenario())
+    assert response.status_code == status_code
+    assert response.headers["Retry-After"] == "1"
+    assert response.json()["reason"] == reason
@@ -0,0 +1,126 @@
+# tests/test_logs.py
+"""Logging de la API (src/api/logs.py): formato JSON, muestreo y escritura en segundo plano"""
+
+import json
+import logging
+import os
+import random
+import sys
+
+import pytest
+
+from src.api import logs
+from src.api.logs import JsonFormatter, sample_success, setup_logging, stop_logging
+
+
+@pytest.fixture
+def log_file(tmp_path, monkeypatch):
+    """Logger raíz configurado por setup_logging hacia un archivo; se restaura al final"""
+    path = tmp_path / "api.log"
+    monkeypatch.setattr(logs, "LOG_FILE", str(path))
+    monkeypatch.setattr(logs, "LOG_FORMAT", "json")
+    monkeypatch.setattr(logs, "LOG_LEVEL", "INFO")
+    monkeypatch.setattr(logs, "_handler", None)
+    monkeypatch.setattr(logs, "_listener", None)
+    # Sin hooks de atexit ni de fork que sobrevivan al test en el proceso de pytest
+    monkeypatch.setattr(logs.atexit, "register", lambda func: func)
+    monkeypatch.setattr(os, "register_at_fork", lambda **kwargs: None)
+
+    root = logging.getLogger()
+    handlers, level = list(root.handlers), root.level
+    yield path
+    stop_logging()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+        handler.close()
+    for handler in handlers:
+        root.addHandler(handler)
+    root.setLevel(level)
+
+
+def _lines(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_formato_json_con_campos_de_extra():
+    record = logging.LogRecord("src.api.app", logging.INFO, __file__, 1, "Predicción %s para %s", (1, "c-1"), None)
+    record.customer_id = "c-1"
+    record.prediction = 1
+    record.payload = {1, 2}
+
+    entry = json.loads(JsonFormatter().format(record))
+
+    assert entry["level"] == "INFO"
+    assert entry["logger"] == "src.api.app"
+    assert entry["message"] == "Predicción 1 para c-1"
+    assert entry["customer_id"] == "c-1"
+    assert entry["prediction"] == 1
+    assert entry["payload"] == "{1, 2}"  # lo que no es JSON se escribe como texto
+    assert isinstance(entry["ts"], float)
+    assert "args" not in entry and "msg" not in entry
+
+
+def test_formato_json_incluye_la_excepcion():
+    try:
+        raise ValueError("entrada inválida")
+    except ValueError:
+        record = logging.LogRecord("src.api.app", logging.ERROR, __file__, 1, "Falló", (), sys.exc_info())
+
+    entry = json.loads(JsonFormatter().format(record))
+    assert entry["level"] == "ERROR"
+    assert "ValueError: entrada inválida" in entry["exception"]
+
+
+def test_muestreo_extremos(monkeypatch):
+    monkeypatch.setattr(logs, "LOG_SUCCESS_SAMPLE_RATE", 1.0)
+    assert all(sample_success() for _ in range(1000))
+    monkeypatch.setattr(logs, "LOG_SUCCESS_SAMPLE_RATE", 0.0)
+    assert not any(sample_success() for _ in range(1000))
+
+
+def test_muestreo_respeta_la_tasa(monkeypatch):
+    monkeypatch.setattr(logs, "LOG_SUCCESS_SAMPLE_RATE", 0.25)
+    random.seed(0)
+    rate = sum(sample_success() for _ in range(20000)) / 20000
+    assert rate == pytest.approx(0.25, abs=0.02)
+
+
+def test_stop_logging_escribe_lo_pendiente(log_file, monkeypatch):
+    monkeypatch.setattr(logs, "LOG_ASYNC", True)
+    setup_logging()
+    assert logs._listener is not None
+
+    logger = logging.getLogger("src.api.app")
+    for i in range(500):
+        logger.info("Pedido %s", i, extra={"customer_id": f"c-{i}"})
+    logger.debug("No se escribe: nivel deshabilitado")
+    stop_logging()
+
+    lines = _lines(log_file)
+    assert [line["message"] for line in lines] == [f"Pedido {i}" for i in range(500)]
+    assert lines[-1]["customer_id"] == "c-499"
+    assert logs._listener is None
+    stop_logging()  # una segunda llamada (ej: atexit) no hace nada
+
+
+def test_setup_logging_una_sola_vez_por_proceso(log_file, monkeypatch):
+    monkeypatch.setattr(logs, "LOG_ASYNC", True)
+    setup_logging()
+    handler = logs._handler
+    setup_logging()
+
+    assert logs._handler is handler
+    assert logging.getLogger().handlers == [handler]
+
+
+def test_modo_sincronico_escribe_sin_hilo(log_file, monkeypatch):
+    """Como en AWS Lambda: la línea está escrita al volver de la llamada"""
+    monkeypatch.setattr(logs, "LOG_ASYNC", False)
+    setup_logging()
+
+    logging.getLogger("src.api.app").warning("Modelo no cargado", extra={"stage": "Production"})
+
+    assert logs._listener is None
+    [line] = _lines(log_file)
+    assert (line["level"], line["message"], line["stage"]) == ("WARNING", "Modelo no cargado", "Production")
@@ -0,0 +1,141 @@
+# tests/test_metrics.py
+"""Métricas en formato de texto de Prometheus (src/api/metrics.py)"""
+
+import asyncio
+import json
+import os
+
+import httpx
+
+from src.api import app as api
+from src.api.metrics import (
+    STAGE_DURATION, Counter, Gauge, Histogram, Registry, merge_expositions, read_snapshots, write_snapshot
+)
+
+CUSTOMER = api.CustomerData.Config.schema_extra["example"]
+
+
+def _registry():
+    registry = Registry()
+    requests = registry.register(Counter("t_requests_total", "Requests", ["handler"]))
+    latency = registry.register(Histogram("t_latency_seconds", "Latencia", buckets=(0.1, 1.0)))
+    requests.labels("predict").inc()
+    latency.observe(0.05)
+    return registry
+
+
+def _samples(text):
+    """Muestras de una exposición: {línea sin el valor: valor}"""
+    samples = {}
+    for line in text.splitlines():
+        if line and not line.startswith("#"):
+            name, value = line.rsplit(" ", 1)
+            samples[name] = value
+    return samples
+
+
+def test_histograma_buckets_acumulados_sum_y_count():
+    registry = Registry()
+    latency = registry.register(Histogram("t_latency_seconds", "Latencia", ["handler"], buckets=(0.1, 1.0)))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        latency.labels("predict").observe(value)
+
+    text = registry.render()
+    assert text.startswith("# HELP t_latency_seconds Latencia\n# TYPE t_latency_seconds histogram\n")
+    samples = _samples(text)
+    # Cada bucket cuenta las observaciones <= su límite (0.1 cae en el bucket 0.1)
+    assert samples['t_latency_seconds_bucket{handler="predict",le="0.1"}'] == "2"
+    assert samples['t_latency_seconds_bucket{handler="predict",le="1.0"}'] == "3"
+    assert samples['t_latency_seconds_bucket{handler="predict",le="+Inf"}'] == "4"
+    assert samples['t_latency_seconds_count{handler="predict"}'] == "4"
+    assert float(samples['t_latency_seconds_sum{handler="predict"}']) == sum((0.05, 0.1, 0.5, 3.0))
+
+
+def test_counter_y_gauge_sin_labels():
+    registry = Registry()
+    requests = registry.register(Counter("t_total", "Total"))
+    in_flight = registry.register(Gauge("t_in_flight", "En curso"))
+    requests.inc()
+    requests.inc(2)
+    in_flight.inc()
+    in_flight.dec()
+
+    assert registry.render().splitlines() == [
+        "# HELP t_total Total", "# TYPE t_total counter", "t_total 3.0",
+        "# HELP t_in_flight En curso", "# TYPE t_in_flight gauge", "t_in_flight 0.0",
+    ]
+
+
+def test_escape_de_valores_de_labels():
+    registry = Registry()
+    errors = registry.register(Counter("t_errors_total", "Errores", ["message"]))
+    errors.labels('ruta "C:\\tmp"\nsegunda línea').inc()
+
+    line = registry.render().splitlines()[-1]
+    assert line == 't_errors_total{message="ruta \\"C:\\\\tmp\\"\\nsegunda línea"} 1.0'
+
+
+def test_stream_registra_la_etapa_validation(monkeypatch):
+    class _Model:
+        info = {"version": "1"}
+
+        def predict_records(self, records):
+            return [1] * len(records)
+
+    monkeypatch.setattr(api, "model", _Model())
+    monkeypatch.setattr(api, "prediction_cache", None)
+    monkeypatch.setattr(api, "STREAM_CHUNK_SIZE", 2)
+    validation = STAGE_DURATION.labels("validation")
+    before = sum(validation.counts)
+
+    body = b"".join(json.dumps({**CUSTOMER, "customer_id": f"C{i}"}).encode() + b"\n" for i in range(5))
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=api.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post("/predict/stream", content=body, headers={"content-type": "application/x-ndjson"})
+
+    response = asyncio.run(scenario())
+    assert response.status_code == 200
+    assert len(response.text.splitlines()) == 5
+    # Una observación por bloque: 2 + 2 + 1
+    assert sum(validation.counts) - before == 3
+
+
+def test_label_worker_en_todas_las_series():
+    registry = _registry()
+    registry.set_const_labels(worker="42")
+    samples = [line for line in registry.render().splitlines() if line and not line.startswith("#")]
+    assert samples
+    assert all('worker="42"' in line for line in samples)
+    assert 't_requests_total{worker="42",handler="predict"} 1.0' in samples
+    assert 't_latency_seconds_sum{worker="42"} 0.05' in samples
+
+
+def test_merge_agrupa_series_de_varios_workers_bajo_un_header():
+    texts = []
+    for pid in ("1", "2"):
+        registry = _registry()
+        registry.set_const_labels(worker=pid)
+        texts.append(registry.render())
+
+    lines = merge_expositions(texts).splitlines()
+    assert lines.count("# TYPE t_requests_total counter") == 1
+    assert lines.count("# TYPE t_latency_seconds histogram") == 1
+    # Las series de una métrica quedan juntas, antes del header de la siguiente
+    start = lines.index("# TYPE t_requests_total counter")
+    assert lines[start + 1:start + 3] == [
+        't_requests_total{worker="1",handler="predict"} 1.0',
+        't_requests_total{worker="2",handler="predict"} 1.0',
+    ]
+
+
+def test_snapshots_de_los_demas_workers(tmp_path):
+    registry = _registry()
+    registry.set_const_labels(worker=str(os.getpid()))
+    write_snapshot(registry, str(tmp_path))
+    (tmp_path / "worker-1.prom").write_text('# HELP t_requests_total Requests\n# TYPE t_requests_total counter\nt_requests_total{worker="1",handler="predict"} 3.0\n')
+
+    others = read_snapshots(str(tmp_path), exclude_pid=os.getpid())
+    assert len(others) == 1
+    assert 'worker="1"' in others[0]
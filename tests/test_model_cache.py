@@ -0,0 +1,135 @@
+# tests/test_model_cache.py
+"""Caché local de artefactos del Model Registry (src/api/model_cache.py)"""
+
+import os
+from types import SimpleNamespace
+
+import mlflow.artifacts
+import mlflow.tracking
+import pytest
+
+from src.api import model_cache
+from src.api.model_cache import cached_model, fetch_model, resolve_version
+
+MODEL = "telco-churn-prediction"
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    """Registry falso: versión actual del stage y descargas realizadas"""
+    state = {"version": "3", "down": False, "downloads": []}
+
+    def resolve(model_name, stage, timeout):
+        if state["down"]:
+            raise ConnectionError("registry inaccesible")
+        return SimpleNamespace(version=state["version"], run_id=f"run-{state['version']}")
+
+    def download_artifacts(artifact_uri, dst_path):
+        state["downloads"].append(artifact_uri)
+        path = os.path.join(dst_path, "model")
+        os.makedirs(path)
+        with open(os.path.join(path, "model.pkl"), "w") as f:
+            f.write(artifact_uri)
+        return path
+
+    monkeypatch.setattr(model_cache, "resolve_version", resolve)
+    monkeypatch.setattr(mlflow.artifacts, "download_artifacts", download_artifacts)
+    return state
+
+
+def test_primera_vez_descarga_y_despues_reutiliza(registry, tmp_path):
+    path, info = fetch_model(MODEL, "Production", str(tmp_path))
+    assert info["source"] == "network"
+    assert info["version"] == "3"
+
+    path_again, info_again = fetch_model(MODEL, "Production", str(tmp_path))
+    assert info_again["source"] == "cache"
+    assert path_again == path
+    assert info_again["checksum"] == info["checksum"]
+    assert registry["downloads"] == [f"models:/{MODEL}/3"]
+
+
+def test_clave_por_version_y_artefacto(registry, tmp_path):
+    fetch_model(MODEL, "Production", str(tmp_path))
+    registry["version"] = "4"
+    _, info = fetch_model(MODEL, "Production", str(tmp_path))
+
+    assert info["source"] == "network"
+    assert info["version"] == "4"
+    # Cada versión y cada artefacto tienen su propia entrada
+    assert cached_model(MODEL, "3", str(tmp_path)) is not None
+    assert cached_model(MODEL, "4", str(tmp_path)) is not None
+    assert cached_model(MODEL, "4", str(tmp_path), artifact="compiled") is None
+
+    fetch_model(MODEL, "Production", str(tmp_path), artifact="compiled")
+    assert registry["downloads"][-1] == "runs:/run-4/compiled"
+
+
+def test_checksum_invalido_vuelve_a_descargar(registry, tmp_path):
+    path, _ = fetch_model(MODEL, "Production", str(tmp_path))
+    with open(os.path.join(path, "model.pkl"), "a") as f:
+        f.write("corrupto")
+
+    assert cached_model(MODEL, "3", str(tmp_path)) is None
+    path_again, info = fetch_model(MODEL, "Production", str(tmp_path))
+    assert info["source"] == "network"
+    assert len(registry["downloads"]) == 2
+    with open(os.path.join(path_again, "model.pkl")) as f:
+        assert f.read() == f"models:/{MODEL}/3"
+
+
+def test_registry_caido_usa_la_ultima_version_del_stage(registry, tmp_path):
+    path, _ = fetch_model(MODEL, "Production", str(tmp_path))
+    registry["down"] = True
+
+    path_again, info = fetch_model(MODEL, "Production", str(tmp_path))
+    assert path_again == path
+    assert info["source"] == "cache"
+    assert "registry inaccesible" in info["registry_error"]
+
+
+def test_registry_caido_con_cache_corrupto_falla(registry, tmp_path):
+    path, _ = fetch_model(MODEL, "Production", str(tmp_path))
+    os.remove(os.path.join(path, "model.pkl"))
+    registry["down"] = True
+
+    with pytest.raises(ConnectionError):
+        fetch_model(MODEL, "Production", str(tmp_path))
+
+
+def test_resolve_version_timeout_solo_durante_la_llamada(monkeypatch):
+    seen = {}
+
+    class _Client:
+        def __init__(self, registry_uri=None):
+            seen["registry_uri"] = registry_uri
+
+        def get_latest_versions(self, name, stages):
+            seen["timeout"] = os.environ.get("MLFLOW_HTTP_REQUEST_TIMEOUT")
+            seen["retries"] = os.environ.get("MLFLOW_HTTP_REQUEST_MAX_RETRIES")
+            return [SimpleNamespace(version="7", run_id="run-7")]
+
+    monkeypatch.setattr(mlflow.tracking, "MlflowClient", _Client)
+    monkeypatch.setenv("MLFLOW_HTTP_REQUEST_TIMEOUT", "120")
+    monkeypatch.delenv("MLFLOW_HTTP_REQUEST_MAX_RETRIES", raising=False)
+
+    version = resolve_version(MODEL, "Production", timeout=2, registry_uri="http://registry:5000")
+
+    assert version.version == "7"
+    assert seen == {"registry_uri": "http://registry:5000", "timeout": "2", "retries": "0"}
+    # Los valores anteriores se restauran
+    assert os.environ["MLFLOW_HTTP_REQUEST_TIMEOUT"] == "120"
+    assert "MLFLOW_HTTP_REQUEST_MAX_RETRIES" not in os.environ
+
+
+def test_resolve_version_sin_versiones_en_el_stage(monkeypatch):
+    class _Client:
+        def __init__(self, registry_uri=None):
+            pass
+
+        def get_latest_versions(self, name, stages):
+            return []
+
+    monkeypatch.setattr(mlflow.tracking, "MlflowClient", _Client)
+    with pytest.raises(LookupError):
+        resolve_version(MODEL, "Production")
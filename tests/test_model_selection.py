@@ -0,0 +1,64 @@
+# tests/test_model_selection.py
+"""Selección de modelos antes de compare_models (src/model_selection.py)"""
+
+import numpy as np
+
+from src import model_selection
+from src.model_selection import compare_candidates, successive_halving
+
+PARAMS = {"metric": "Accuracy", "models_to_compare": ["lr", "rf", "knn"], "seed": 42}
+
+
+class _Experiment:
+    def __init__(self):
+        self.calls = []
+
+    def compare_models(self, **kwargs):
+        self.calls.append(kwargs)
+        return ["best"]
+
+
+def test_modo_compare_corre_compare_models_sin_presupuesto():
+    exp = _Experiment()
+    params = {**PARAMS, "model_selection": {"mode": "compare", "time_budget_min": 30}}
+
+    assert compare_candidates(exp, params) == ["best"]
+    assert exp.calls == [{"include": ["lr", "rf", "knn"], "sort": "Accuracy", "n_select": 3}]
+
+
+def test_sin_model_selection_es_modo_compare():
+    exp = _Experiment()
+    compare_candidates(exp, PARAMS)
+    assert "budget_time" not in exp.calls[0]
+
+
+def test_modo_halving_usa_los_sobrevivientes_y_el_resto_del_presupuesto(monkeypatch):
+    monkeypatch.setattr(model_selection, "select_models", lambda exp, params, selection: ["rf"])
+    exp = _Experiment()
+    params = {**PARAMS, "model_selection": {"mode": "halving", "time_budget_min": 30}}
+
+    compare_candidates(exp, params)
+    call = exp.calls[0]
+    assert call["include"] == ["rf"]
+    assert 29 < call["budget_time"] <= 30
+
+
+def test_modo_halving_sin_presupuesto(monkeypatch):
+    monkeypatch.setattr(model_selection, "select_models", lambda exp, params, selection: ["rf"])
+    exp = _Experiment()
+    compare_candidates(exp, {**PARAMS, "model_selection": {"mode": "halving", "time_budget_min": 0}})
+    assert exp.calls[0]["budget_time"] is None
+
+
+def test_successive_halving_conserva_los_mejores():
+    from sklearn.dummy import DummyClassifier
+    from sklearn.linear_model import LogisticRegression
+
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(400, 3))
+    y = (X[:, 0] > 0).astype(int)
+    candidates = {"lr": LogisticRegression(), "dummy": DummyClassifier(strategy="most_frequent")}
+
+    survivors, history = successive_halving(candidates, X, y, n_jobs=1, min_rows=100, keep=1, cv_folds=2)
+    assert survivors == ["lr"]
+    assert {entry["model"] for entry in history} == {"lr", "dummy"}
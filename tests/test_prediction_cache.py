@@ -0,0 +1,101 @@
+# tests/test_prediction_cache.py
+"""Caché de predicciones LRU + TTL (src/api/prediction_cache.py)"""
+
+import pytest
+
+from src.api import app as api
+from src.api import prediction_cache as prediction_cache_module
+from src.api.prediction_cache import PredictionCache
+
+CUSTOMER = {"customer_id": "C1", "age": 40, "gender": "Male", "monthly_charge": 70.5}
+
+
+def test_clave_ignora_customer_id_y_el_orden_de_los_campos():
+    other = {"monthly_charge": 70.5, "gender": "Male", "age": 40, "customer_id": "C2"}
+    assert PredictionCache.key(CUSTOMER, "3") == PredictionCache.key(other, "3")
+
+
+def test_clave_cambia_con_las_features_y_con_la_version_del_modelo():
+    key = PredictionCache.key(CUSTOMER, "3")
+    assert PredictionCache.key({**CUSTOMER, "age": 41}, "3") != key
+    assert PredictionCache.key(CUSTOMER, "4") != key
+    assert PredictionCache.key(CUSTOMER, None) != key
+
+
+def test_lru_descarta_la_entrada_menos_usada():
+    cache = PredictionCache(max_entries=2, ttl_seconds=60)
+    cache.put("a", 0)
+    cache.put("b", 1)
+    assert cache.get("a") == 0
+    cache.put("c", 1)
+
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (0, 1)
+    assert cache.stats()["evictions"] == 1
+
+
+def test_entrada_vencida_no_se_devuelve(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(prediction_cache_module.time, "monotonic", lambda: now[0])
+    cache = PredictionCache(max_entries=10, ttl_seconds=5)
+    cache.put("a", 1)
+
+    now[0] += 4
+    assert cache.get("a") == 1
+    now[0] += 2
+    assert cache.get("a") is None
+    assert cache.stats()["entries"] == 0
+
+
+class _Model:
+    def __init__(self, version, prediction):
+        self.info = {"version": version}
+        self.prediction = prediction
+        self.calls = 0
+
+    def predict_records(self, records):
+        self.calls += len(records)
+        return [self.prediction] * len(records)
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = PredictionCache(max_entries=100, ttl_seconds=60)
+    monkeypatch.setattr(api, "prediction_cache", cache)
+    return cache
+
+
+def test_api_reutiliza_la_prediccion_de_la_misma_version(monkeypatch, cache):
+    model = _Model("1", 0)
+    monkeypatch.setattr(api, "model", model)
+
+    assert api.predict_records([CUSTOMER]) == [0]
+    assert api.predict_records([{**CUSTOMER, "customer_id": "C9"}]) == [0]
+    assert model.calls == 1
+    assert cache.stats()["hits"] == 1
+
+
+def test_api_no_usa_predicciones_de_otra_version_del_modelo(monkeypatch, cache):
+    monkeypatch.setattr(api, "model", _Model("1", 0))
+    assert api.predict_records([CUSTOMER]) == [0]
+
+    # Nueva versión (aunque el caché no se haya vaciado todavía): otra clave
+    new_model = _Model("2", 1)
+    monkeypatch.setattr(api, "model", new_model)
+    assert api.predict_records([CUSTOMER]) == [1]
+    assert new_model.calls == 1
+
+
+def test_api_vacia_el_cache_al_recargar_una_version_nueva(monkeypatch, cache):
+    monkeypatch.setattr(api, "model", _Model("1", 0))
+    monkeypatch.setattr(api, "model_info", {})
+    api.predict_records([CUSTOMER])
+    assert cache.stats()["entries"] == 1
+
+    new_model = _Model("2", 1)
+    new_model.info["load_seconds"] = 0.0
+    monkeypatch.setattr(api, "resolve_version", lambda name, stage: type("Version", (), {"version": "2"}))
+    monkeypatch.setattr(api, "_load_and_warm_up", lambda stage=None: new_model)
+
+    assert api.reload_model()["status"] == "reloaded"
+    assert cache.stats()["entries"] == 0
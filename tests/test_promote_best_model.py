@@ -0,0 +1,100 @@
+# tests/test_promote_best_model.py
+"""Presupuestos de latencia, tamaño y memoria al promover (src/promote_best_model.py)"""
+
+import math
+
+import pandas as pd
+import pytest
+
+from src import promote_best_model
+from src.promote_best_model import budget_violations
+
+BUDGETS = {"max_latency_p99_ms": 10, "max_model_size_mb": 50}
+
+
+def _run(run_id, accuracy, **metrics):
+    return {"run_id": run_id, "metrics.final_accuracy": accuracy, **{f"metrics.{k}": v for k, v in metrics.items()}}
+
+
+class _Chosen(Exception):
+    """Corta promote_best_model después de elegir el run (antes del registry)"""
+
+
+@pytest.fixture
+def search(monkeypatch):
+    """Runs devueltos por mlflow.search_runs, ya ordenados por final_accuracy"""
+    state = {"runs": [], "budgets": BUDGETS}
+
+    def client():
+        raise _Chosen()
+
+    monkeypatch.setattr(promote_best_model, "load_params", lambda: {"promotion": {"budgets": state["budgets"]}})
+    monkeypatch.setattr(promote_best_model, "setup_mlflow", lambda params: None)
+    monkeypatch.setattr(promote_best_model.mlflow, "search_runs", lambda **kwargs: pd.DataFrame(state["runs"]))
+    monkeypatch.setattr(promote_best_model, "MlflowClient", client)
+    monkeypatch.delenv("SHADOW_REPORT", raising=False)
+    return state
+
+
+def test_run_dentro_de_los_presupuestos():
+    assert budget_violations(pd.Series(_run("a", 0.9, latency_p99_ms=8.0, model_size_mb=12.0)), BUDGETS) == []
+
+
+def test_cada_presupuesto_excedido_es_una_violacion():
+    run = pd.Series(_run("a", 0.9, latency_p99_ms=15.0, model_size_mb=80.0))
+    assert budget_violations(run, BUDGETS) == ["latency_p99_ms = 15.00 > 10", "model_size_mb = 80.00 > 50"]
+
+
+def test_presupuesto_sin_medicion_se_omite_con_aviso(capsys):
+    run = pd.Series(_run("a", 0.9, latency_p99_ms=math.nan, model_size_mb=12.0))
+    assert budget_violations(run, BUDGETS) == []
+    assert "a no tiene latency_p99_ms: no se controla max_latency_p99_ms" in capsys.readouterr().out
+
+
+def test_presupuestos_vacios_o_en_cero_no_se_controlan():
+    run = pd.Series(_run("a", 0.9, latency_p99_ms=500.0, model_size_mb=900.0))
+    assert budget_violations(run, {}) == []
+    assert budget_violations(run, {"max_latency_p99_ms": 0, "max_model_size_mb": None}) == []
+
+
+def test_se_promueve_el_mejor_que_entra_en_los_presupuestos(search, capsys):
+    search["runs"] = [
+        _run("rapido-no", 0.95, latency_p99_ms=30.0, model_size_mb=10.0),
+        _run("pesado", 0.93, latency_p99_ms=5.0, model_size_mb=200.0),
+        _run("elegido", 0.90, latency_p99_ms=5.0, model_size_mb=10.0),
+        _run("peor", 0.80, latency_p99_ms=1.0, model_size_mb=1.0),
+    ]
+    with pytest.raises(_Chosen):
+        promote_best_model.promote_best_model()
+
+    out = capsys.readouterr().out
+    assert "Descartado rapido-no (final_accuracy = 0.9500): latency_p99_ms = 30.00 > 10" in out
+    assert "Descartado pesado (final_accuracy = 0.9300): model_size_mb = 200.00 > 50" in out
+    assert "Mejor run encontrado: elegido" in out
+    assert "peor" not in out
+
+
+def test_run_sin_mediciones_de_costo_se_puede_promover(search, capsys):
+    """Runs evaluados antes de que evaluate.py midiera costos"""
+    search["runs"] = [_run("viejo", 0.9, latency_p99_ms=math.nan, model_size_mb=math.nan)]
+    with pytest.raises(_Chosen):
+        promote_best_model.promote_best_model()
+    assert "Mejor run encontrado: viejo" in capsys.readouterr().out
+
+
+def test_ningun_run_en_los_presupuestos_falla(search, capsys):
+    search["runs"] = [
+        _run("a", 0.95, latency_p99_ms=30.0, model_size_mb=10.0),
+        _run("b", 0.90, latency_p99_ms=5.0, model_size_mb=200.0),
+    ]
+    with pytest.raises(SystemExit) as exit_info:
+        promote_best_model.promote_best_model()
+    assert exit_info.value.code == 1
+    assert "ERROR: Ningún run con 'final_accuracy' entra en los presupuestos" in capsys.readouterr().out
+
+
+def test_sin_runs_evaluados_falla(search):
+    search["runs"] = []
+    with pytest.raises(SystemExit) as exit_info:
+        promote_best_model.promote_best_model()
+    assert exit_info.value.code == 1
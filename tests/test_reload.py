@@ -0,0 +1,128 @@
+# tests/test_reload.py
+"""Recarga del modelo sin reiniciar (POST /admin/reload)"""
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src.api import app as api
+
+CUSTOMER = api.CustomerData.Config.schema_extra["example"]
+TOKEN = "secreto"
+
+
+class _Model:
+    def __init__(self, version, prediction, on_predict=None):
+        self.info = {"version": version, "load_seconds": 0.0}
+        self.prediction = prediction
+        self.on_predict = on_predict
+
+    def predict_records(self, records):
+        if self.on_predict is not None:
+            self.on_predict()
+        return [self.prediction] * len(records)
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    """Stage con la versión `version` del registry; `loads` cuenta las cargas"""
+    state = {"version": "1", "loads": 0, "next": None, "error": None}
+
+    def load_and_warm_up(stage=None):
+        state["loads"] += 1
+        if state["error"] is not None:
+            raise state["error"]
+        return state["next"]
+
+    monkeypatch.setattr(api, "resolve_version", lambda name, stage: type("Version", (), {"version": state["version"]}))
+    monkeypatch.setattr(api, "_load_and_warm_up", load_and_warm_up)
+    monkeypatch.setattr(api, "model", _Model("1", 0))
+    monkeypatch.setattr(api, "model_info", {"version": "1", "status": "loaded"})
+    monkeypatch.setattr(api, "ADMIN_TOKEN", TOKEN)
+    monkeypatch.setattr(api, "CHALLENGER_STAGE", "")
+    monkeypatch.setattr(api, "prefork_master", None)
+    monkeypatch.setattr(api, "prediction_cache", None)
+    monkeypatch.setattr(api, "batcher", None)
+    monkeypatch.setattr(api, "shadow", None)
+    return state
+
+
+@pytest.fixture
+def client():
+    # Sin `with`: no corre el startup (no carga el modelo de MLflow)
+    return TestClient(api.app, raise_server_exceptions=False)
+
+
+def _reload(client, force=False, token=TOKEN):
+    headers = {"X-Admin-Token": token} if token is not None else {}
+    return client.post("/admin/reload", params={"force": str(force).lower()}, headers=headers)
+
+
+def _predict(client):
+    return client.post("/predict", json=CUSTOMER).json()["churn_prediction"]
+
+
+def test_misma_version_no_recarga(registry, client):
+    response = _reload(client)
+    assert response.status_code == 200
+    assert response.json()["reload"]["status"] == "unchanged"
+    assert registry["loads"] == 0
+    assert api.model_info["last_reload"]["status"] == "unchanged"
+
+
+def test_forzada_recarga_aunque_no_cambie_la_version(registry, client):
+    registry["next"] = _Model("1", 1)
+    response = _reload(client, force=True)
+    assert response.json()["reload"]["status"] == "reloaded"
+    assert registry["loads"] == 1
+    assert api.model is registry["next"]
+
+
+def test_version_nueva_se_activa(registry, client):
+    assert _predict(client) == 0
+    registry["version"] = "2"
+    registry["next"] = _Model("2", 1)
+
+    body = _reload(client).json()
+    assert body["reload"]["status"] == "reloaded"
+    assert (body["reload"]["previous_version"], body["reload"]["version"]) == ("1", "2")
+    assert body["model"]["version"] == "2"
+    assert _predict(client) == 1
+
+
+def test_error_al_cargar_mantiene_el_modelo_anterior(registry, client):
+    previous = api.model
+    registry["version"] = "2"
+    registry["error"] = RuntimeError("artefacto corrupto")
+
+    response = _reload(client)
+    assert response.status_code == 500
+    reload_status = response.json()["detail"]["reload"]
+    assert reload_status["status"] == "error"
+    assert reload_status["version"] == "1"
+    assert "artefacto corrupto" in reload_status["error"]
+
+    assert api.model is previous
+    assert _predict(client) == 0
+
+
+def test_cambio_atomico_con_pedidos_en_curso(registry, client):
+    """Un pedido que ya tomó el modelo anterior termina con él aunque se recargue en medio"""
+    registry["version"] = "2"
+    registry["next"] = _Model("2", 1)
+    statuses = []
+    # El modelo anterior recibe la recarga mientras predice
+    api.model = _Model("1", 0, on_predict=lambda: statuses.append(api.reload_model()["status"]))
+
+    assert _predict(client) == 0
+    assert statuses == ["reloaded"]
+    assert api.model is registry["next"]
+    assert _predict(client) == 1
+
+
+def test_token_requerido(registry, client, monkeypatch):
+    assert _reload(client, token=None).status_code == 401
+    assert _reload(client, token="otro").status_code == 401
+
+    monkeypatch.setattr(api, "ADMIN_TOKEN", None)
+    assert _reload(client).status_code == 403
+    assert registry["loads"] == 0
@@ -0,0 +1,119 @@
+# tests/test_score_store.py
+"""Score store precalculado por customer_id (src/api/score_store.py)"""
+
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from src.api import app as api
+from src.api.score_store import ScoreStore, fingerprint, open_store, stale_reason
+
+CUSTOMER = api.CustomerData.Config.schema_extra["example"]
+
+
+def _entry(model_version="3", seen_at=None):
+    return {"customer_id": "C1", "prediction": 1, "model_version": model_version, "seen_at": seen_at or time.time()}
+
+
+def test_stale_reason_score_vigente():
+    assert stale_reason(_entry(), "3", max_age_seconds=3600) is None
+
+
+def test_stale_reason_otra_version_del_modelo():
+    assert stale_reason(_entry("2"), "3", max_age_seconds=3600) == "model_version"
+
+
+def test_stale_reason_no_visto_recientemente():
+    entry = _entry(seen_at=time.time() - 7200)
+    assert stale_reason(entry, "3", max_age_seconds=3600) == "expired"
+    # max_age 0: sin vencimiento por antigüedad
+    assert stale_reason(entry, "3", max_age_seconds=0) is None
+
+
+def test_fingerprint_normaliza_numeros_e_ignora_customer_id():
+    assert fingerprint({"customer_id": "C1", "tenure_months": 6}) == fingerprint({"customer_id": "C2", "tenure_months": 6.0})
+    assert fingerprint({"tenure_months": 6}) != fingerprint({"tenure_months": 7})
+
+
+def test_reconstruccion_incremental(tmp_path):
+    path = str(tmp_path / "store.sqlite")
+    store = ScoreStore(path, readonly=False)
+    store.upsert([("C1", "fp1", 0, "3", 100.0, 100.0), ("C2", "fp2", 1, "3", 100.0, 100.0)])
+    store.set_meta({"model_version": "3", "rows": 2})
+    store.commit()
+
+    # Segunda pasada: C1 sigue en la tabla, C2 ya no
+    store.touch(["C1"], 200.0)
+    assert store.delete_unseen(200.0) == 1
+    store.commit()
+    assert store.fingerprints(["C1", "C2"]) == {"C1": ("fp1", "3")}
+    store.close()
+
+    reader = open_store(path)
+    assert reader.get("C1")["seen_at"] == 200.0
+    assert reader.get("C2") is None
+    assert reader.stats()["model_version"] == "3"
+    reader.close()
+
+
+def test_open_store_sin_archivo(tmp_path):
+    assert open_store(str(tmp_path / "no_existe.sqlite")) is None
+    assert open_store("") is None
+
+
+class _Model:
+    def __init__(self, version):
+        self.info = {"version": version}
+
+    def predict_records(self, records):
+        return [0] * len(records)
+
+
+@pytest.fixture
+def store_api(monkeypatch, tmp_path):
+    store = ScoreStore(str(tmp_path / "store.sqlite"), readonly=False)
+    store.upsert([(CUSTOMER["customer_id"], fingerprint(CUSTOMER), 1, "3", time.time(), time.time())])
+    store.commit()
+    monkeypatch.setattr(api, "score_store", store)
+    monkeypatch.setattr(api, "prediction_cache", None)
+    yield store
+    store.close()
+
+
+def _request(method, path, **kwargs):
+    async def scenario():
+        transport = httpx.ASGITransport(app=api.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.request(method, path, **kwargs)
+    return asyncio.run(scenario())
+
+
+def test_api_sirve_el_score_vigente_del_store(monkeypatch, store_api):
+    monkeypatch.setattr(api, "model", _Model("3"))
+    response = _request("GET", f"/score/{CUSTOMER['customer_id']}")
+    assert response.status_code == 200
+    assert response.json()["source"] == "store"
+    assert response.json()["churn_prediction"] == 1
+
+
+@pytest.mark.parametrize(
+    "version, changes, reason",
+    [("4", {}, "model_version"), ("3", {"tenure_months": 40}, "changed")],
+)
+def test_api_predice_en_linea_si_el_score_no_sirve(monkeypatch, store_api, version, changes, reason):
+    monkeypatch.setattr(api, "model", _Model(version))
+    monkeypatch.setattr(api, "limiter", None)
+
+    response = _request("POST", f"/score/{CUSTOMER['customer_id']}", json={**CUSTOMER, **changes})
+    body = response.json()
+    assert response.status_code == 200
+    assert (body["source"], body["reason"], body["model_version"]) == ("live", reason, version)
+    assert body["churn_prediction"] == 0
+
+    if reason == "model_version":
+        # GET no predice: informa el motivo con 404
+        response = _request("GET", f"/score/{CUSTOMER['customer_id']}")
+        assert response.status_code == 404
+        assert response.json()["detail"]["reason"] == "model_version"
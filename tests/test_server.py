@@ -0,0 +1,115 @@
+# tests/test_server.py
+"""Servidor pre-fork (src/api/server.py): workers, reinicio gradual y apagado"""
+
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+import pytest
+
+pytestmark = pytest.mark.skipif(
+    not sys.platform.startswith("linux"),
+    reason="usa os.fork y /proc para encontrar los workers"
+)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _children(pid):
+    """Procesos hijos vivos de `pid` (los workers del master)"""
+    children = set()
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # pid (comm) state ppid ...
+                fields = f.read().rsplit(")", 1)[1].split()
+        except OSError:
+            continue
+        if int(fields[1]) == pid and fields[0] != "Z":
+            children.add(int(entry))
+    return children
+
+
+def _wait_for(condition, timeout=60.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        value = condition()
+        if value:
+            return value
+        time.sleep(0.2)
+    raise AssertionError("condición no cumplida a tiempo")
+
+
+def _get(url):
+    try:
+        return httpx.get(url, timeout=5)
+    except httpx.TransportError:
+        return None
+
+
+@pytest.fixture
+def server(tmp_path):
+    port = _free_port()
+    env = {
+        **os.environ,
+        # Registro vacío: la API arranca sin modelo, alcanza para probar el ciclo de los workers
+        "MLFLOW_TRACKING_URI": f"file:{tmp_path / 'mlruns'}",
+        "SCORE_STORE_PATH": str(tmp_path / "score_store.sqlite"),
+        "METRICS_DIR": str(tmp_path / "metrics"),
+        "METRICS_SNAPSHOT_INTERVAL": "0.2",
+        "MODEL_RELOAD_INTERVAL": "0",
+        "CHALLENGER_STAGE": "",
+    }
+    os.makedirs(env["METRICS_DIR"])
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "src.api.server", "--host", "127.0.0.1", "--port", str(port), "--workers", "2", "--graceful-timeout", "5"],
+        cwd=ROOT,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        yield proc, f"http://127.0.0.1:{port}"
+    finally:
+        if proc.poll() is None:
+            proc.kill()
+            proc.wait()
+
+
+def test_reinicio_gradual_y_apagado(server):
+    proc, url = server
+
+    workers = _wait_for(lambda: len(_children(proc.pid)) == 2 and _children(proc.pid))
+    response = _wait_for(lambda: _get(f"{url}/health"))
+    assert response.status_code == 200
+
+    # /metrics en cualquier worker expone las series de los dos
+    def metrics_workers():
+        response = _get(f"{url}/metrics")
+        return response is not None and all(f'worker="{pid}"' in response.text for pid in workers)
+    _wait_for(metrics_workers, timeout=15)
+
+    # SIGHUP: workers nuevos, los anteriores se apagan
+    proc.send_signal(signal.SIGHUP)
+    replaced = _wait_for(lambda: (lambda pids: len(pids) == 2 and not pids & workers and pids)(_children(proc.pid)))
+    assert proc.poll() is None
+    # El master recoge a los anteriores (terminan sin pedidos en curso)
+    _wait_for(lambda: not any(os.path.exists(f"/proc/{pid}") for pid in workers), timeout=15)
+    assert _wait_for(lambda: _get(f"{url}/health")).status_code == 200
+
+    # SIGTERM: apagado gradual, sin workers huérfanos
+    proc.send_signal(signal.SIGTERM)
+    assert proc.wait(timeout=30) == 0
+    assert not any(os.path.exists(f"/proc/{pid}") for pid in replaced)
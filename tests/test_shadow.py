@@ -0,0 +1,98 @@
+# tests/test_shadow.py
+"""Scoring en sombra (src/api/shadow.py) y su gate de promoción"""
+
+import time
+
+from src.api.shadow import ShadowScorer, read_log, summarize
+from src.promote_best_model import shadow_violations
+
+RECORD = {"tenure_months": 6}
+
+
+class _Model:
+    def __init__(self, version, prediction=1, delay=0.0):
+        self.info = {"version": version, "run_id": f"run-{version}"}
+        self.prediction = prediction
+        self.delay = delay
+        self.calls = 0
+
+    def predict_records(self, records):
+        self.calls += 1
+        time.sleep(self.delay)
+        return [self.prediction] * len(records)
+
+
+def test_latencias_de_ambos_modelos_medidas_igual(tmp_path):
+    """El champion se vuelve a medir en sombra: su latencia no incluye la del pedido"""
+    champion = _Model("1", delay=0.02)
+    challenger = _Model("2", delay=0.0)
+    log_path = str(tmp_path / "shadow.jsonl")
+    scorer = ShadowScorer(challenger, sample_rate=1.0, log_path=log_path)
+
+    for _ in range(4):
+        assert scorer.submit(RECORD, 1, champion)
+    scorer.shutdown()
+
+    assert champion.calls == challenger.calls == 4
+    records = read_log(log_path)
+    assert len(records) == 4
+    assert all(r["champion_ms"] >= 20 for r in records)
+    assert all(r["challenger_ms"] < 20 for r in records)
+
+    report = summarize(records)
+    assert report["champion"]["version"] == "1"
+    assert report["challenger"]["version"] == "2"
+    assert report["latency_ms"]["champion"]["count"] == 4
+
+
+def test_acuerdo_usa_la_prediccion_devuelta_al_pedido(tmp_path):
+    champion = _Model("1", prediction=1)
+    challenger = _Model("2", prediction=0)
+    scorer = ShadowScorer(challenger, sample_rate=1.0)
+    scorer.submit(RECORD, 0, champion)
+    scorer.shutdown()
+    assert scorer.report()["agreed"] == 1
+
+
+def test_error_del_champion_en_sombra_no_cuenta_comparacion():
+    class _Broken(_Model):
+        def predict_records(self, records):
+            raise RuntimeError("falla")
+
+    scorer = ShadowScorer(_Model("2"), sample_rate=1.0)
+    scorer.submit(RECORD, 1, _Broken("1"))
+    scorer.shutdown()
+    assert scorer.errors == 1
+    assert scorer.report()["comparisons"] == 0
+
+
+def _report(champion_p99, challenger_p99, run_id="run-2"):
+    return {
+        "challenger": {"run_id": run_id},
+        "comparisons": 500,
+        "agreement_rate": 0.99,
+        "latency_ms": {"champion": {"p99": champion_p99}, "challenger": {"p99": challenger_p99}},
+    }
+
+
+def test_gate_ratio_de_latencia_p99_cumplido():
+    shadow = {"max_latency_p99_ratio": 1.5}
+    assert shadow_violations("run-2", _report(10.0, 15.0), shadow) == []
+
+
+def test_gate_ratio_de_latencia_p99_excedido():
+    shadow = {"max_latency_p99_ratio": 1.5}
+    violations = shadow_violations("run-2", _report(10.0, 15.5), shadow)
+    assert len(violations) == 1
+    assert "latencia p99" in violations[0]
+
+
+def test_gate_ratio_sin_latencia_del_champion_no_bloquea():
+    shadow = {"max_latency_p99_ratio": 1.5}
+    assert shadow_violations("run-2", _report(None, 50.0), shadow) == []
+
+
+def test_gate_otro_run_sin_evidencia():
+    shadow = {"max_latency_p99_ratio": 1.5, "required": True}
+    assert shadow_violations("run-9", _report(10.0, 50.0), shadow) == ["sin evidencia de scoring en sombra"]
+    assert shadow_violations("run-9", _report(10.0, 50.0), {"max_latency_p99_ratio": 1.5}) == []
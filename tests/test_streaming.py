@@ -0,0 +1,94 @@
+# tests/test_streaming.py
+"""Lectura NDJSON de /predict/stream (src/api/streaming.py)"""
+
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from src.api import app as api
+from src.api.streaming import LineTooLongError, iter_ndjson, ndjson_line
+
+CUSTOMER = api.CustomerData.Config.schema_extra["example"]
+
+
+async def _chunks(*chunks):
+    for chunk in chunks:
+        yield chunk
+
+
+def _read(chunks, max_line_bytes=1024):
+    async def collect():
+        return [item async for item in iter_ndjson(_chunks(*chunks), max_line_bytes)]
+    return asyncio.run(collect())
+
+
+def test_lineas_partidas_entre_bloques_y_ultima_sin_salto():
+    records = _read([b'{"a": 1}\n{"a"', b': 2}\n\n{"a": 3}'])
+    assert records == [(1, {"a": 1}), (2, {"a": 2}), (4, {"a": 3})]
+
+
+def test_json_invalido_se_devuelve_como_error_de_esa_linea():
+    records = _read([b'{"a": 1}\n{roto\n{"a": 3}\n'])
+    assert records[0] == (1, {"a": 1})
+    assert records[1][0] == 2 and isinstance(records[1][1], ValueError)
+    assert records[2] == (3, {"a": 3})
+
+
+def test_linea_completa_demasiado_larga():
+    with pytest.raises(LineTooLongError, match="Línea 2"):
+        _read([b'{"a": 1}\n' + b'{"a": "' + b"x" * 100 + b'"}\n'], max_line_bytes=64)
+
+
+def test_linea_sin_terminar_demasiado_larga_no_se_acumula_en_memoria():
+    # Nunca llega el salto de línea: se corta apenas el buffer supera el máximo
+    async def endless():
+        yield b'{"a": 1}\n{"a": "'
+        while True:
+            yield b"x" * 32
+
+    async def collect():
+        return [item async for item in iter_ndjson(endless(), 64)]
+
+    with pytest.raises(LineTooLongError, match="Línea 2"):
+        asyncio.run(collect())
+
+
+def test_ndjson_line():
+    assert ndjson_line({"b": "ñ", "a": 1}) == '{"b": "ñ", "a": 1}\n'.encode()
+
+
+class _Model:
+    info = {"version": "1"}
+
+    def predict_records(self, records):
+        return [1] * len(records)
+
+
+def test_api_responde_las_lineas_previas_y_el_error_de_linea_larga(monkeypatch):
+    monkeypatch.setattr(api, "model", _Model())
+    monkeypatch.setattr(api, "prediction_cache", None)
+    monkeypatch.setattr(api, "STREAM_MAX_LINE_BYTES", 512)
+
+    body = b"".join([
+        json.dumps({**CUSTOMER, "customer_id": "C1"}).encode() + b"\n",
+        b"[1, 2]\n",
+        json.dumps({**CUSTOMER, "customer_id": "C3", "region": "x" * 1000}).encode() + b"\n",
+        json.dumps({**CUSTOMER, "customer_id": "C4"}).encode() + b"\n",
+    ])
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=api.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post("/predict/stream", content=body, headers={"content-type": "application/x-ndjson"})
+
+    response = asyncio.run(scenario())
+    lines = [json.loads(line) for line in response.text.splitlines()]
+
+    assert response.status_code == 200
+    assert lines[0]["line"] == 1 and lines[0]["churn_prediction"] == 1
+    assert lines[1] == {"line": 2, "error": "Datos inválidos", "message": "Se esperaba un objeto JSON"}
+    assert lines[2]["error"] == "Línea demasiado larga" and "Línea 3" in lines[2]["message"]
+    # Después de una línea demasiado larga no se sigue leyendo
+    assert len(lines) == 3
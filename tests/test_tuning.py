@@ -0,0 +1,119 @@
+# tests/test_tuning.py
+"""Búsqueda con Optuna (src/tuning.py): estudio persistente y poda de trials"""
+
+import numpy as np
+import pytest
+
+optuna = pytest.importorskip("optuna")
+from optuna.distributions import IntDistribution
+from optuna.trial import TrialState
+from sklearn.datasets import make_classification
+from sklearn.tree import DecisionTreeClassifier
+
+from src import tuning
+from src.tuning import _objective, _pruner, _storage, optuna_search
+
+SPACE = {"max_depth": IntDistribution(1, 8), "min_samples_leaf": IntDistribution(1, 20)}
+STUDY = "dt-test"
+
+
+@pytest.fixture
+def data():
+    X, y = make_classification(n_samples=200, n_features=6, random_state=0)
+    return X, y
+
+
+def _config(tmp_path, n_trials):
+    return {
+        "storage": str(tmp_path / "optuna.sqlite"),
+        "n_trials": n_trials,
+        "n_jobs": 2,
+        "timeout_min": 0,
+        "pruner": "median",
+        "cv_folds": 3,
+    }
+
+
+def _finished(tmp_path):
+    study = optuna.load_study(study_name=STUDY, storage=_storage(str(tmp_path / "optuna.sqlite")))
+    return [t for t in study.get_trials(deepcopy=False) if t.state in (TrialState.COMPLETE, TrialState.PRUNED)]
+
+
+def test_primer_trial_son_los_hiperparametros_actuales(tmp_path, data):
+    estimator = DecisionTreeClassifier(max_depth=3, min_samples_leaf=5, random_state=0)
+    best = optuna_search(estimator, SPACE, *data, STUDY, _config(tmp_path, 3), "accuracy", seed=0)
+
+    trials = sorted(_finished(tmp_path), key=lambda t: t.number)
+    assert trials[0].params == {"max_depth": 3, "min_samples_leaf": 5}
+    assert set(best) == set(SPACE)
+
+
+def test_estudio_se_retoma_hasta_completar_n_trials(tmp_path, data):
+    estimator = DecisionTreeClassifier(random_state=0)
+    optuna_search(estimator, SPACE, *data, STUDY, _config(tmp_path, 4), "accuracy", seed=0)
+    assert len(_finished(tmp_path)) == 4
+    numbers = {t.number for t in _finished(tmp_path)}
+
+    # Misma corrida repetida: no hay trials nuevos
+    optuna_search(estimator, SPACE, *data, STUDY, _config(tmp_path, 4), "accuracy", seed=0)
+    assert len(_finished(tmp_path)) == 4
+
+    # Más trials pedidos: continúa desde los ya hechos
+    optuna_search(estimator, SPACE, *data, STUDY, _config(tmp_path, 6), "accuracy", seed=0)
+    finished = _finished(tmp_path)
+    assert len(finished) == 6
+    assert numbers < {t.number for t in finished}
+
+
+def test_trial_interrumpido_no_cuenta(tmp_path, data):
+    estimator = DecisionTreeClassifier(random_state=0)
+    study = optuna.create_study(study_name=STUDY, storage=_storage(str(tmp_path / "optuna.sqlite")), direction="maximize")
+    # Un trial quedó RUNNING (corrida interrumpida)
+    study.ask()
+
+    optuna_search(estimator, SPACE, *data, STUDY, _config(tmp_path, 3), "accuracy", seed=0)
+    assert len(_finished(tmp_path)) == 3
+
+
+class _Trial:
+    """Trial mínimo: sugiere valores fijos y pide la poda desde el paso `prune_at`"""
+
+    def __init__(self, prune_at):
+        self.prune_at = prune_at
+        self.reports = []
+
+    def suggest_int(self, name, low, high, step=1, log=False):
+        return low
+
+    def report(self, value, step):
+        self.reports.append((step, value))
+
+    def should_prune(self):
+        return self.reports[-1][0] >= self.prune_at
+
+
+def test_objective_poda_despues_del_fold_indicado(data, monkeypatch):
+    X, y = data
+    monkeypatch.setattr(tuning, "_worker", {
+        "estimator": DecisionTreeClassifier(random_state=0), "space": SPACE, "X": X, "y": y,
+        "scoring": "accuracy", "cv_folds": 5, "seed": 0,
+    })
+
+    trial = _Trial(prune_at=1)
+    with pytest.raises(optuna.TrialPruned):
+        _objective(trial)
+    # Se informó el promedio parcial de los dos primeros folds y no se siguió
+    assert [step for step, _ in trial.reports] == [0, 1]
+
+    trial = _Trial(prune_at=99)
+    score = _objective(trial)
+    assert len(trial.reports) == 5
+    assert score == pytest.approx(trial.reports[-1][1])
+    assert 0 <= score <= 1 and not np.isnan(score)
+
+
+def test_pruners():
+    assert isinstance(_pruner("median"), optuna.pruners.MedianPruner)
+    assert isinstance(_pruner("asha"), optuna.pruners.SuccessiveHalvingPruner)
+    with pytest.raises(ValueError):
+        _pruner("hyperband")
@@ -0,0 +1,98 @@
+# tests/test_utils.py
+"""Partición train / hold-out compartida y su caché (src/utils.py)"""
+
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src import utils
+from src.utils import holdout_split, load_split, split_key
+
+pytest.importorskip("pyarrow")
+
+
+def _dataset(n, start=0, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "customer_id": [f"C{i}" for i in range(start, start + n)],
+        "tenure_months": rng.integers(1, 72, n),
+        "churn": rng.integers(0, 2, n),
+    })
+
+
+@pytest.fixture
+def params(tmp_path):
+    path = tmp_path / "data.parquet"
+    _dataset(2000).to_parquet(path)
+    return {
+        "data_processed": str(path),
+        "seed": 42,
+        "train_size": 0.8,
+        "split": {"cache_dir": str(tmp_path / "splits")},
+    }
+
+
+def _rewrite(params, df):
+    """Reescribe el dataset (con otra fecha de modificación, aunque el tamaño coincida)"""
+    path = params["data_processed"]
+    previous = os.stat(path).st_mtime_ns
+    df.to_parquet(path)
+    os.utime(path, ns=(previous + 10**9, previous + 10**9))
+
+
+def test_particion_deterministica(params):
+    train_df, holdout_df = load_split(params)
+    again_train, again_holdout = load_split(params)
+
+    assert train_df["customer_id"].tolist() == again_train["customer_id"].tolist()
+    assert holdout_df["customer_id"].tolist() == again_holdout["customer_id"].tolist()
+    assert not set(train_df["customer_id"]) & set(holdout_df["customer_id"])
+    assert len(train_df) + len(holdout_df) == 2000
+    # train_size en expectativa, también dentro de cada clase
+    assert abs(len(train_df) / 2000 - 0.8) < 0.05
+    for label in (0, 1):
+        in_class = (train_df["churn"] == label).sum() + (holdout_df["churn"] == label).sum()
+        assert abs((train_df["churn"] == label).sum() / in_class - 0.8) < 0.07
+
+
+def test_otra_semilla_otra_particion(params):
+    _, holdout_df = load_split(params)
+    _, other_holdout = load_split({**params, "seed": 7})
+    assert set(holdout_df["customer_id"]) != set(other_holdout["customer_id"])
+
+
+def test_particion_guardada_se_reutiliza(params, monkeypatch):
+    train_idx, _ = holdout_split(params)
+    assert os.path.isdir(os.path.join(params["split"]["cache_dir"], split_key(params)))
+
+    def compute_again(*args):
+        raise AssertionError("la partición ya estaba guardada")
+
+    monkeypatch.setattr(utils, "_compute_split", compute_again)
+    cached_idx, _ = holdout_split(params)
+    assert isinstance(cached_idx, np.memmap)
+    assert np.array_equal(train_idx, cached_idx)
+
+
+def test_datos_nuevos_invalidan_la_particion(params):
+    key = split_key(params)
+    train_df, holdout_df = load_split(params)
+
+    # Clientes nuevos: otra clave (hash del archivo), los existentes no cambian de lado
+    _rewrite(params, pd.concat([_dataset(2000), _dataset(500, start=5000, seed=1)], ignore_index=True))
+    assert split_key(params) != key
+
+    new_train, new_holdout = load_split(params)
+    assert len(new_train) + len(new_holdout) == 2500
+    assert set(train_df["customer_id"]) <= set(new_train["customer_id"])
+    assert set(holdout_df["customer_id"]) <= set(new_holdout["customer_id"])
+    # Las dos particiones quedan guardadas, cada una con su clave
+    assert len(os.listdir(params["split"]["cache_dir"])) == 2
+
+
+def test_dataset_reescrito_se_vuelve_a_leer(params):
+    assert len(utils.load_dataset(params)) == 2000
+    _rewrite(params, _dataset(1500))
+    assert len(utils.load_dataset(params)) == 1500